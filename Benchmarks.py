@@ -0,0 +1,914 @@
+#import libraries
+import numpy as np
+import pandas as pd
+import os, sys, time, tempfile, subprocess
+
+##Costume Library to manipulate data and add indicators
+from Libraries.ForexMonkey import Data, FrameCache, indicatorRegistry
+import talib
+from Libraries.Utils import DataHandler
+from Libraries.StreamingIndicators import IndicatorEngine
+from Libraries.Datasets import WindowDataset
+from Libraries.FileWatcher import FileWatcher
+from Libraries.SharedMemory import SharedBarRing, EASimulator, getRecordArrays
+from Libraries.BarHistory import BarHistory, getBarArrays
+from Libraries.SignalServer import SignalServer, SignalClient
+from tests.helpers import makeMinuteData, makeTickData, addIndicatorsNoDrop, candlePatternsRowWise, getLabelsLoop, windowsLoop, makeLSTMModel
+
+
+def timeIt(function, repeat=3):
+    """
+        Returns the best wall time in seconds of running function repeat times.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best == None or elapsed < best:
+            best = elapsed
+    return best
+
+def benchmarkCSVCache(rows=3000000):
+    """
+        Compares loading a minute csv with pandas against loading the columnar cache
+        that Data.readCSVCached builds next to it.
+    """
+    print("CSV vs columnar cache,", rows, "rows")
+    with tempfile.TemporaryDirectory() as folder:
+        csvPath = os.path.join(folder, 'EURUSD.csv')
+        makeMinuteData(rows).to_csv(csvPath)
+        dataMonkey = Data()
+
+        csvTime = timeIt(lambda: pd.read_csv(csvPath, index_col=['DateTime'], parse_dates=['DateTime']), 1)
+        start = time.perf_counter()
+        dataMonkey.readCSVCached(csvPath)   # First read parses the csv and builds the cache
+        buildTime = time.perf_counter() - start
+        cacheTime = timeIt(lambda: dataMonkey.readCSVCached(csvPath))
+
+    print("\tread_csv:        %.3f s" % csvTime)
+    print("\tFirst read:      %.3f s (parse + write cache)" % buildTime)
+    print("\tCached read:     %.3f s (%.0fx faster)" % (cacheTime, csvTime/cacheTime))
+
+##Run by benchmarkTickStream in a fresh interpreter that only imports pandas and ForexMonkey (not Benchmarks,
+##TensorFlow or sklearn), so its peak memory is the resampling. A chunkSize of 0 uses the in memory path,
+##-1 only imports the modules and gives the memory every run starts from.
+tickWorkerCode = """
+import os, sys, time
+import pandas as pd
+from Libraries.ForexMonkey import Data
+folder, timeFrame, chunkSize = sys.argv[1], sys.argv[2], int(sys.argv[3])
+start = time.perf_counter()
+rows = 0
+if chunkSize > 0:
+    rows = Data(useCache=False).writeTickBars('EURUSD', timeFrame, os.path.join(folder, 'bars.csv'), chunkSize, folder+'/')
+elif chunkSize == 0:
+    data = pd.read_csv(os.path.join(folder, 'EURUSD.csv'), index_col=['DateTime'], parse_dates=['DateTime'])
+    data = data.resample(timeFrame).agg({'Bid': 'ohlc', 'Volume': 'sum'}).dropna()
+    rows = len(data)
+if os.path.exists('/proc/self/status'):
+    with open('/proc/self/status') as status:
+        peak = [int(line.split()[1])/1024 for line in status if line.startswith('VmHWM')][0]
+else:
+    import psutil
+    peak = psutil.Process().memory_info().peak_wset/1024**2
+print("%d %.3f %.1f" % (rows, time.perf_counter()-start, peak))
+"""
+
+def benchmarkTickStream(rows=5000000, timeFrame='5Min', chunkSizes=(100000, 1000000)):
+    """
+        Reports the time and peak memory of the streamed tick resampler and of the in memory path,
+        every run is done in its own process.
+    """
+    print("Streaming tick resampler,", rows, "ticks to", timeFrame, "bars")
+    with tempfile.TemporaryDirectory() as folder:
+        makeTickData(rows).to_csv(os.path.join(folder, 'EURUSD.csv'))
+
+        base = None
+        for chunkSize in (-1, 0)+tuple(chunkSizes):
+            out = subprocess.run([sys.executable, '-c', tickWorkerCode, folder, timeFrame, str(chunkSize)],
+                                 capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+            if chunkSize < 0:
+                base = float(out[2])
+                print("\t%-14s peak RSS %s MB" % ("imports only:", out[2]))
+                continue
+            name = "chunk %d" % chunkSize if chunkSize else "full file"
+            print("\t%-14s %s bars  %s s  peak RSS %s MB (+%.1f MB)" % (name+":", out[0], out[1], out[2], float(out[2]) - base))
+
+def benchmarkMultiTimeFrame(rows=3000000, timeFrames=('1Min', '5Min', '15Min', '30Min', '1H', '1D')):
+    """
+        Compares building every time frame with getDataCSV against one getMultiTimeFrameData call.
+        The raw minute data is put straight in the frame cache so only resampling is timed.
+    """
+    print("Multi time frame bar builder,", rows, "minute bars")
+    raw = makeMinuteData(rows)
+    raw.columns = raw.columns.str.lower()
+
+    def separate():
+        dataMonkey = Data(frameCache=FrameCache())
+        dataMonkey.frameCache.put(('EURUSD', None, False), raw)
+        return {timeFrame: dataMonkey.getDataCSV('EURUSD', timeFrame, True) for timeFrame in timeFrames}
+
+    def together():
+        dataMonkey = Data(frameCache=FrameCache())
+        dataMonkey.frameCache.put(('EURUSD', None, False), raw)
+        return dataMonkey.getMultiTimeFrameData('EURUSD', timeFrames, True)
+
+    separateTime = timeIt(separate)
+    togetherTime = timeIt(together)
+    print("\tOne resample per time frame: %.3f s" % separateTime)
+    print("\tSingle pass:                 %.3f s (%.1fx faster)" % (togetherTime, separateTime/togetherTime))
+
+def benchmarkIndicatorEngine(bars=500, windowSize=159):
+    """
+        Compares the per bar latency of the incremental IndicatorEngine, seeded with the windowSize bars
+        the EA sends then fed bars more like the live path, against addAllIndicators on the window the EA sends.
+    """
+    print("Incremental indicator engine,", bars, "bars")
+    data = makeMinuteData(windowSize + bars)
+    data.columns = data.columns.str.lower()
+    data = data[['open', 'high', 'low', 'close']]
+    dataHandler = DataHandler(verbose=0)
+
+    engine = IndicatorEngine(historySize=bars)
+    engine.seed(data.iloc[:windowSize])
+    start = time.perf_counter()
+    for i in range(windowSize, windowSize+bars):
+        engine.update(data.index[i], *data.iloc[i].values)
+    engineTime = (time.perf_counter()-start)/bars
+
+    start = time.perf_counter()
+    for i in range(windowSize, windowSize+bars):
+        dataHandler.addAllIndicators(data.iloc[i-windowSize:i].copy())
+    batchTime = (time.perf_counter()-start)/bars
+    print("\taddAllIndicators on %d bars: %.2f ms per bar" % (windowSize, batchTime*1000))
+    print("\tIndicatorEngine.update:       %.2f ms per bar (%.0fx faster)" % (engineTime*1000, batchTime/engineTime))
+
+def benchmarkIndicatorMatrix(rows=1000000):
+    """
+        Compares adding the indicators column by column to a DataFrame against writing them into
+        one preallocated array with Data.getIndicatorMatrix. Candle patterns are left out as both
+        paths compute them the same way.
+    """
+    print("Indicator matrix vs DataFrame columns,", rows, "bars")
+    data = makeMinuteData(rows)
+    data.columns = data.columns.str.lower()
+    data = data[['open', 'high', 'low', 'close']]
+    dataHandler = DataHandler(verbose=0)
+    names = [name for columns, _, _, _ in indicatorRegistry for name in columns]
+
+    def columns():
+        df = data.copy()
+        addIndicatorsNoDrop(dataHandler, df, False)
+        df.dropna(inplace=True)
+        return df
+
+    def matrix():
+        prices = [data[col].values for col in ['open', 'high', 'low', 'close']]
+        values = np.empty((rows, 4+len(names)), dtype=np.float64, order='F')
+        values[:, :4] = data.values
+        dataHandler.dataMonkey.getIndicatorMatrix(*prices, out=values[:, 4:])
+        return dataHandler.matrixToDataFrame(values, data.index, list(data.columns)+names)
+
+    columnsTime = timeIt(columns, 1)
+    matrixTime = timeIt(matrix, 1)
+    print("\tOne DataFrame column per indicator: %.3f s" % columnsTime)
+    print("\tPreallocated indicator matrix:      %.3f s (%.1fx faster)" % (matrixTime, columnsTime/matrixTime))
+
+def benchmarkCandlePatterns(rows=200000):
+    """
+        Compares the row wise candle pattern encoding against the vectorized one.
+    """
+    print("Candle pattern encoding,", rows, "bars")
+    data = makeMinuteData(rows)
+    prices = [data[col].values for col in ['Open', 'High', 'Low', 'Close']]
+    dataMonkey = Data()
+
+    start = time.perf_counter()
+    candlePatternsRowWise(*prices)
+    rowWiseTime = time.perf_counter() - start
+    start = time.perf_counter()
+    dataMonkey.getCandlePatternCodes(*prices)
+    vectorTime = time.perf_counter() - start
+    print("\tRow wise apply: %.3f s" % rowWiseTime)
+    print("\tVectorized:     %.3f s (%.0fx faster)" % (vectorTime, rowWiseTime/vectorTime))
+
+def benchmarkParallelIndicators(rows=1000000, maxWorkers=None):
+    """
+        Times the indicator and candle pattern stage with 1 to maxWorkers threads.
+    """
+    maxWorkers = maxWorkers or os.cpu_count()
+    print("Parallel indicators,", rows, "bars, up to", maxWorkers, "threads")
+    data = makeMinuteData(rows)
+    prices = [data[col].values for col in ['Open', 'High', 'Low', 'Close']]
+
+    serialTime = None
+    for workers in range(1, maxWorkers+1):
+        dataMonkey = Data(workers=workers)
+        start = time.perf_counter()
+        dataMonkey.getIndicatorMatrix(*prices)
+        dataMonkey.getCandlePatternCodes(*prices)
+        elapsed = time.perf_counter() - start
+        serialTime = serialTime or elapsed
+        print("\t%2d threads: %.3f s (%.1fx)" % (workers, elapsed, serialTime/elapsed))
+
+def benchmarkLabels(rows=1000000, maxTradeCandles=3):
+    """
+        Compares the per bar labeling loop against the vectorized DataHandler.getLabels.
+    """
+    print("Label generation,", rows, "bars")
+    data = makeMinuteData(rows)
+    prices = [data[col].values for col in ['High', 'Low', 'Close']]
+    atr = talib.ATR(*prices, timeperiod=20)
+    dataHandler = DataHandler(verbose=0)
+
+    start = time.perf_counter()
+    getLabelsLoop(*prices, atr, maxTradeCandles)
+    loopTime = time.perf_counter() - start
+    start = time.perf_counter()
+    dataHandler.getLabels(*prices, atr, maxTradeCandles)
+    vectorTime = time.perf_counter() - start
+    print("\tPython loop: %.3f s" % loopTime)
+    print("\tVectorized:  %.3f s (%.0fx faster)" % (vectorTime, loopTime/vectorTime))
+
+
+def benchmarkLabelSweep(rows=1000000, slMultiples=(1, 1.5, 2, 3), tpMultiples=(1.5, 2, 3, 4), maxTradeCandles=(3, 6, 12)):
+    """
+        Compares labeling every (SL, TP, trade length) combination with its own getLabels run
+        against the single pass DataHandler.labelSweep.
+    """
+    print("Label sweep,", rows, "bars,", len(slMultiples)*len(tpMultiples)*len(maxTradeCandles), "combinations")
+    data = makeMinuteData(rows)
+    data.columns = [col.lower() for col in data.columns]
+    data["ATR Label"] = talib.ATR(data.high.values, data.low.values, data.close.values, timeperiod=20)
+    dataHandler = DataHandler(verbose=0)
+
+    start = time.perf_counter()
+    labels, combos = dataHandler.labelSweep(data, slMultiples, tpMultiples, maxTradeCandles)
+    sweepTime = time.perf_counter() - start
+    start = time.perf_counter()
+    for slMultiple, tpMultiple, tradeLength in combos:
+        dataHandler.getLabels(data.high.values, data.low.values, data.close.values,
+                              data["ATR Label"].values, tradeLength, slMultiple, tpMultiple)
+    singleTime = time.perf_counter() - start
+    print("\tOne run per combination: %.3f s" % singleTime)
+    print("\tSingle pass sweep:       %.3f s (%.1fx faster, %.1f MB of labels)" % (sweepTime, singleTime/sweepTime, labels.nbytes/1e6))
+
+
+def benchmarkWindowDataset(rows=50000, features=40, lookBack=96):
+    """
+        Compares building the look back windows as a list of slices against the strided WindowDataset
+        and the DataHandler.preprocess_df built on it.
+    """
+    print("Look back windows,", rows, "bars,", features, "features, look back", lookBack)
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((rows, features)), columns=["f%d" % i for i in range(features)])
+    df["Actual Direction"] = rng.integers(0, 3, rows)
+    df["Direction"] = rng.integers(0, 3, rows)
+    dataHandler = DataHandler(verbose=0)
+    with tempfile.TemporaryDirectory() as folder:
+        cwd = os.getcwd()
+        os.chdir(folder)
+        os.mkdir("Scalers")
+        try:
+            start = time.perf_counter()
+            dataset = dataHandler.preprocess_df(df, 'EURUSD', '1Min', lookBack, windowed=True)
+            windowedTime = time.perf_counter() - start
+            start = time.perf_counter()
+            x, y, acc_dir = dataHandler.preprocess_df(df, 'EURUSD', '1Min', lookBack)
+            arrayTime = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+
+    start = time.perf_counter()
+    expected = windowsLoop(dataset.x, df["Direction"].values, df["Actual Direction"].values, lookBack)
+    loopTime = time.perf_counter() - start
+    print("\tList of slices:    %.3f s, %.0f MB" % (loopTime, expected[0].nbytes/1024**2))
+    print("\tpreprocess_df:     %.3f s, %.0f MB" % (arrayTime, x.nbytes/1024**2))
+    print("\tWindowDataset:     %.3f s, %.0f MB (%.0fx faster)" % (windowedTime, dataset.x.nbytes/1024**2, loopTime/windowedTime))
+
+
+def benchmarkBalancedEpochs(rows=200000, features=40, lookBack=96, epochs=3):
+    """
+        Reports the memory of oversampling by duplicating windows against the per epoch index arrays
+        of WindowDataset.epochIndices, and the holds undersampled epochs get to see.
+    """
+    print("Balanced epochs,", rows, "bars, holds dominating")
+    rng = np.random.default_rng(0)
+    y = rng.choice(3, rows, p=[0.1, 0.15, 0.75])
+    dataset = WindowDataset(rng.random((rows, features)), y, y, lookBack, balance="over")
+    largest = max(len(indices) for indices in dataset.classIndices)
+
+    start = time.perf_counter()
+    for _ in range(epochs):
+        indices = dataset.epochIndices()
+    epochTime = (time.perf_counter() - start)/epochs
+    smallest = min(len(indices) for indices in dataset.classIndices)
+    holdsSeen = set()
+    for _ in range(epochs):
+        under = dataset.epochIndices("under")
+        holdsSeen.update(under[dataset.y[under]==2].tolist())
+
+    duplicated = 3*largest*lookBack*features*8
+    print("\tDuplicated windows: %.0f MB" % (duplicated/1024**2))
+    print("\tEpoch indices:      %.1f MB, %.3f s per epoch" % (indices.nbytes/1024**2, epochTime))
+    print("\tUndersampling, holds seen in %d epochs: %d (%d per epoch)" % (epochs, len(holdsSeen), smallest))
+
+
+def benchmarkInputPipeline(rows=200000, features=40, lookBack=96, batchSize=64, batches=500):
+    """
+        Compares materializing all windows before training against the samples per second
+        the WindowPipeline feeds from the strided window views.
+    """
+    from Libraries.KerasCustom import WindowPipeline
+    print("Input pipeline,", rows, "bars,", features, "features, look back", lookBack)
+    rng = np.random.default_rng(0)
+    y = rng.choice(3, rows, p=[0.1, 0.15, 0.75])
+    dataset = WindowDataset(rng.random((rows, features)), y, y, lookBack, balance="over")
+    pipeline = WindowPipeline(dataset, batchSize)
+    materialized = len(dataset.epochIndices())*lookBack*features*8
+    pipeline.measure(10)    # Builds the pipeline once
+    rate = pipeline.measure(batches)
+    print("\tMaterialized epoch: %.0f MB before the first step" % (materialized/1024**2))
+    print("\tWindowPipeline:     %.0f samples/sec, %.1f ms to load a batch" % (rate, pipeline.loadTime/pipeline.loadCount*1000))
+
+
+def benchmarkShards(rows=500000, features=40, lookBack=96, shardSamples=100000, batchSize=64):
+    """
+        Times saving a WindowDataset as shards, opening them and reading random batches
+        from the memory-mapped shards.
+    """
+    from sklearn.preprocessing import MinMaxScaler
+    from Libraries.Datasets import saveShards, loadShards
+    print("Window shards,", rows, "bars,", features, "features, look back", lookBack)
+    rng = np.random.default_rng(0)
+    raw = rng.random((rows, features))
+    scaler = MinMaxScaler()
+    y = rng.choice(3, rows, p=[0.1, 0.15, 0.75])
+    dataset = WindowDataset(scaler.fit_transform(raw), y, y, lookBack, scaler=scaler)
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        saveShards(folder, dataset, ["f%d" % i for i in range(features)], "source", shardSamples, pair='EURUSD')
+        saveTime = time.perf_counter() - start
+        start = time.perf_counter()
+        shards = loadShards(folder, "source")
+        openTime = time.perf_counter() - start
+        indices = shards.getIndices()[:1000*batchSize]
+        start = time.perf_counter()
+        for first in range(0, len(indices), batchSize):
+            shards.getBatch(indices[first:first+batchSize])
+        readTime = time.perf_counter() - start
+        del shards
+    print("\tSave:  %.3f s, %d shards" % (saveTime, -(-len(dataset.y)//shardSamples)))
+    print("\tOpen:  %.4f s" % openTime)
+    print("\tRead:  %.0f random samples/sec" % (1000*batchSize/readTime))
+
+
+def benchmarkFeatureDtype(rows=200000, lookBack=96, samples=2000):
+    """
+        Builds the scaled training features in float64, float32 and float16 (shard storage) and
+        reports their size and how far the predictions of an LSTM on them are from the float64 ones.
+    """
+    from Libraries.Datasets import saveShards, loadShards
+    print("Feature dtype,", rows, "bars, look back", lookBack)
+    data = makeMinuteData(rows)
+    data.columns = [col.lower() for col in data.columns]
+    features = {}
+    with tempfile.TemporaryDirectory() as folder:
+        cwd = os.getcwd()
+        os.chdir(folder)
+        os.mkdir("Scalers")
+        try:
+            for dtype in [np.float64, np.float32]:
+                dataHandler = DataHandler(verbose=0, dtype=dtype)
+                df = dataHandler.addAllIndicators(data[['open', 'high', 'low', 'close']], dataHandler.getModelFeatures())
+                dataHandler.addLabels(df, 3)
+                dataHandler.featureSelection(df)
+                start = time.perf_counter()
+                features[dtype] = dataHandler.preprocess_df(df, 'EURUSD', '1Min', lookBack, windowed=True)
+                buildTime = time.perf_counter() - start
+                print("\t%-8s features %.0f MB, scaled in %.3f s" % (np.dtype(dtype).name, features[dtype].x.nbytes/1024**2, buildTime))
+            saveShards("Shards", features[np.float32], df.columns[:-2], storageDtype=np.float16)
+            features[np.float16] = loadShards("Shards")
+
+            indices = features[np.float64].getIndices()[:samples]
+            expected = features[np.float64].getBatch(indices)[0]
+            model = makeLSTMModel(*expected.shape[1:])
+            reference = model.predict(expected, verbose=0)
+            for dtype in [np.float32, np.float16]:
+                x = features[dtype].getBatch(indices)[0]
+                prediction = model.predict(x, verbose=0)
+                agreement = (prediction.argmax(axis=1) == reference.argmax(axis=1)).mean()
+                print("\t%-8s max feature error %.2e, max probability error %.2e, same class %.2f%%" %
+                      (np.dtype(dtype).name, np.abs(x - expected).max(), np.abs(prediction - reference).max(), agreement*100))
+            del features[np.float16]
+        finally:
+            os.chdir(cwd)
+
+
+def benchmarkScalerCache(lookBack=96, features=30, calls=2000):
+    """
+        Compares loading the pickled scaler for every prediction against the artifact cache
+        and its fused transform.
+    """
+    from pickle import dump, load
+    from sklearn.preprocessing import MinMaxScaler
+    from Libraries.Artifacts import sharedArtifactCache
+    print("Scaler per prediction,", calls, "calls")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((lookBack, features)))
+    dataHandler = DataHandler(verbose=0)
+    with tempfile.TemporaryDirectory() as folder:
+        cwd = os.getcwd()
+        os.chdir(folder)
+        os.mkdir("Scalers")
+        try:
+            scaler = MinMaxScaler().fit(rng.random((10000, features)).astype(np.float32)*2)
+            with open('Scalers/EURUSD_1Min.pkl', 'wb') as scalerFile:
+                dump(scaler, scalerFile)
+            sharedArtifactCache.clear()
+
+            def pickleEveryCall():
+                for _ in range(calls):
+                    load(open('Scalers/EURUSD_1Min.pkl', 'rb')).transform(df.to_numpy(dtype=np.float32))
+            def cached():
+                for _ in range(calls):
+                    dataHandler.preprocess_df(df, 'EURUSD', '1Min')
+            pickleTime = timeIt(pickleEveryCall, 1)
+            cacheTime = timeIt(cached, 1)
+            stats = sharedArtifactCache.getStats()
+        finally:
+            os.chdir(cwd)
+    print("\tPickle every call: %.1f us per call" % (pickleTime/calls*1e6))
+    print("\tArtifact cache:    %.1f us per call (%.0fx faster), %s" % (cacheTime/calls*1e6, pickleTime/cacheTime, stats))
+
+
+def latencies(function, windows):
+    """
+        Returns the p50 and p99 latency in ms of calling function on every window.
+    """
+    times = []
+    for x in windows:
+        start = time.perf_counter()
+        function(x)
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, 50)*1000, np.percentile(times, 99)*1000
+
+def benchmarkInferenceSession(lookBack=96, features=30, bars=300):
+    """
+        Compares the per bar latency of model.predict on one window against the warmed up InferenceSession.
+    """
+    from Libraries.Inference import InferenceSession
+    print("Per bar prediction latency,", bars, "bars")
+    model = makeLSTMModel(lookBack, features)
+    windows = np.random.default_rng(0).random((bars, lookBack, features)).astype(np.float32)
+    start = time.perf_counter()
+    session = InferenceSession(model)
+    loadTime = time.perf_counter() - start
+
+    predictP50, predictP99 = latencies(lambda x: model.predict(x[np.newaxis], verbose=0)[0], windows)
+    sessionP50, sessionP99 = latencies(session.predict, windows)
+    print("\tmodel.predict:    p50 %.2f ms, p99 %.2f ms" % (predictP50, predictP99))
+    print("\tInferenceSession: p50 %.2f ms, p99 %.2f ms (%.0fx faster p50), %.2f s warm up at load" % (sessionP50, sessionP99, predictP50/sessionP50, loadTime))
+
+
+##Run by benchmarkTFLite in a fresh interpreter that only imports numpy before the clock starts, so the
+##startup is the backend import plus loading and warming up the model, then the resident memory and latency.
+inferenceWorkerCode = """
+import os, sys, time
+import numpy as np
+path, backend, bars = sys.argv[1], sys.argv[2], int(sys.argv[3])
+start = time.perf_counter()
+if backend == "tflite":
+    from Libraries.Inference import TFLiteSession
+    session = TFLiteSession(path[:-3]+".tflite")
+else:
+    from Libraries.Inference import InferenceSession
+    from tensorflow.keras.models import load_model
+    session = InferenceSession(load_model(path, compile=False))
+startup = time.perf_counter() - start
+if os.path.exists('/proc/self/status'):
+    with open('/proc/self/status') as status:
+        rss = [int(line.split()[1])/1024 for line in status if line.startswith('VmRSS')][0]
+else:
+    import psutil
+    rss = psutil.Process().memory_info().rss/1024**2
+windows = np.random.default_rng(0).random((bars, session.lookBack, session.features)).astype(np.float32)
+times = []
+for x in windows:
+    tick = time.perf_counter()
+    session.predict(x)
+    times.append(time.perf_counter() - tick)
+print("%.3f %.0f %.3f %.3f" % (startup, rss, np.percentile(times, 50)*1000, np.percentile(times, 99)*1000))
+"""
+
+def benchmarkTFLite(lookBack=96, features=30):
+    """
+        Exports an LSTM like ForexModels trains with ExportModels.py and compares the InferenceSession
+        and TFLiteSession of the keras and tflite backends, every backend is started in its own process.
+    """
+    import ExportModels
+    print("Keras vs TFLite backend, look back", lookBack, "features", features)
+    with tempfile.TemporaryDirectory() as folder:
+        os.mkdir(os.path.join(folder, "Models"))
+        path = os.path.join(folder, "Models", "EURUSD_1Min.h5")
+        makeLSTMModel(lookBack, features).save(path)
+
+        def worker(name, backend, bars=300):
+            out = subprocess.run([sys.executable, '-c', inferenceWorkerCode, path, backend, str(bars)], capture_output=True, text=True,
+                                 check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()[-4:]
+            print("\t%-13s startup %s s, RSS %s MB, p50 %s ms, p99 %s ms" % (name+":", *out))
+
+        worker("keras", "keras")
+        for quantize in [None, "int8"]:
+            error, agreement = ExportModels.exportModel(path, quantize)
+            print("\ttflite %s: max probability error %.1e, same class %.1f%%, %.0f KB" %
+                  (quantize or "float32", error, agreement*100, os.path.getsize(path[:-3]+".tflite")/1024))
+            worker("tflite "+(quantize or "float32"), "tflite")
+
+
+def simulateEA(path, bars, barInterval):
+    """
+        Writes a BackTestData.csv like file every barInterval seconds, like the MT5 EA during a backtest.
+    """
+    text = "DateTime\topen\thigh\tlow\tclose\tvolume\n"
+    for bar in range(bars):
+        time.sleep(barInterval)
+        text += "2020.01.01 00:%02d:00\t1.1\t1.2\t1.0\t1.1\t100\n" % (bar % 60)
+        with open(path, 'w', encoding='utf-16') as dataFile:
+            dataFile.write(text)
+
+def benchmarkFileWatcher(bars=50, barInterval=0.02, idle=1.0):
+    """
+        Compares the CPU use, wakeups and detection latency of the busy loop StrategyConnectMT5.run used
+        to read the shared data file with, against the FileWatcher with events and with polling.
+        A thread writes bars like the EA then stays idle for idle seconds.
+    """
+    import threading
+    print("Shared file watching,", bars, "bars every", barInterval, "s then", idle, "s idle")
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'BackTestData.csv')
+
+        def busyLoop(duration):
+            stamp, wakeups, latencies = None, 0, []
+            end = time.perf_counter() + duration
+            while time.perf_counter() < end:
+                wakeups += 1
+                if os.path.exists(path):
+                    with open(path, 'rb') as dataFile:
+                        dataFile.read()
+                    newStamp = os.stat(path).st_mtime_ns
+                    if newStamp != stamp:
+                        stamp = newStamp
+                        latencies.append(time.time() - stamp/1e9)
+            return {'mode': 'busy loop', 'wakeups': wakeups, 'changes': len(latencies),
+                    'meanLatency': np.mean(latencies), 'maxLatency': np.max(latencies)}
+
+        def watch(duration, useEvents):
+            watcher = FileWatcher([path], useEvents=useEvents)
+            end = time.perf_counter() + duration
+            while time.perf_counter() < end:
+                watcher.wait(min(watcher.maxInterval, max(end - time.perf_counter(), 0)))
+            watcher.stop()
+            return watcher.getStats()
+
+        for name, consumer in [("busy", busyLoop), ("events", lambda d: watch(d, True)), ("polling", lambda d: watch(d, False))]:
+            if os.path.exists(path):
+                os.remove(path)
+            writer = threading.Thread(target=simulateEA, args=(path, bars, barInterval))
+            start, startCPU = time.perf_counter(), time.process_time()
+            writer.start()
+            stats = consumer(bars*barInterval + idle)
+            writer.join()
+            cpu = (time.process_time() - startCPU)/(time.perf_counter() - start)
+            print("\t%-9s CPU %5.1f%% of a core, %7d wakeups, %3d changes seen, latency mean %.2f ms, max %.2f ms" %
+                  (stats['mode']+":", cpu*100, stats['wakeups'], stats['changes'], stats['meanLatency']*1000, stats['maxLatency']*1000))
+
+
+def benchmarkChangeDetection(bars=5000, repeat=50):
+    """
+        Compares reading BackTestData.csv and comparing it with the previous data, like StrategyConnectMT5.run
+        did on every loop, against DataHandler.getNewData which checks the size, modification time and
+        last bar time of the file before parsing it.
+    """
+    print("Shared data change detection,", bars, "bars")
+    with tempfile.TemporaryDirectory() as folder:
+        dataHandler = DataHandler(isMT5=True, verbose=0)
+        dataHandler.dataMonkey.mt5Path = folder + os.sep
+        path = dataHandler.getMT5DataPath()
+        data = makeMinuteData(bars + 1)
+        data.columns = [column.lower() for column in data.columns]
+
+        def write(rows):
+            data.iloc[:rows].to_csv(path, sep='\t', encoding='utf-16')
+
+        def parseEquals():
+            return not dataHandler.getFullData('EURUSD').equals(old)
+
+        write(bars)
+        old = dataHandler.getFullData('EURUSD')
+        dataHandler.getNewData('EURUSD')
+        unchangedParse = timeIt(parseEquals, repeat)
+        unchangedCheck = timeIt(lambda: dataHandler.getNewData('EURUSD'), repeat)
+
+        def rewrite(function):      # the EA writes the same bars again
+            write(bars)
+            start = time.perf_counter()
+            function()
+            return time.perf_counter() - start
+        rewriteParse = min(rewrite(parseEquals) for _ in range(5))
+        rewriteCheck = min(rewrite(lambda: dataHandler.getNewData('EURUSD')) for _ in range(5))
+
+        write(bars + 1)
+        start = time.perf_counter()
+        dataHandler.getNewData('EURUSD')
+        newBar = time.perf_counter() - start
+
+        print("\tunchanged file:  parse and compare %.2f ms, getNewData %.4f ms" % (unchangedParse*1000, unchangedCheck*1000))
+        print("\trewritten file:  parse and compare %.2f ms, getNewData %.4f ms" % (rewriteParse*1000, rewriteCheck*1000))
+        print("\tnew bar:         getNewData %.2f ms, %d checks, %d parses" % (newBar*1000, dataHandler.dataChecks, dataHandler.dataParses))
+
+
+def fileResponder(folder):
+    """
+        Answers the bars of the file transport with a hold, like StrategyConnectMT5.run without a model.
+    """
+    dataHandler = DataHandler(isMT5=True, verbose=0)
+    dataHandler.dataMonkey.mt5Path = folder
+    watcher = FileWatcher([dataHandler.getMT5DataPath(), dataHandler.getDonePath()], settle=0)
+    open(dataHandler.getReadyPath(), 'w').close()
+    while not dataHandler.isBacktestDone():
+        watcher.wait(watcher.maxInterval)
+        if dataHandler.getNewData('EURUSD') is not None:
+            with open(dataHandler.getWriteStrategyPath(), 'a') as stratFile:
+                stratFile.write("2\n")
+
+def ringResponder(path, windowSize=159):
+    """
+        Answers the bars of a SharedBarRing with a hold, like StrategyConnectMT5.runShared without a model.
+    """
+    ring = SharedBarRing(path)
+    ring.setReady()
+    while not ring.isDone():
+        seq = ring.waitRequest(0.25)
+        if seq != None:
+            ring.getBars(seq, windowSize)
+            ring.respond(seq, 2)
+    ring.close()
+
+def strategyRingWorker(folder, incremental):
+    """
+        Runs the shared transport loop of a StrategyConnectMT5 on folder/Models/EURUSD_1Min.
+    """
+    from Libraries.ConnectMT5 import StrategyConnectMT5
+    os.chdir(folder)
+    strategy = StrategyConnectMT5('EURUSD', '1Min', incremental=incremental, transport="shared")
+    strategy.dataHandler.dataMonkey.mt5Path = folder + os.sep
+    strategy.runShared()
+
+def benchmarkSharedTransport(bars=200, history=159, lookBack=96, features=30):
+    """
+        Round trip of one bar between a simulated EA and a Python process answering with a constant
+        direction, over the shared files (159 bars written as UTF-16 text, Strat.txt polled for a new line)
+        and over a SharedBarRing. The simulated EA waits with the same spin and backoff in both cases.
+        Then the same over the ring with StrategyConnectMT5.runShared predicting with a model, with
+        incremental indicators and with addAllIndicators on the last history bars.
+    """
+    from pickle import dump
+    from sklearn.preprocessing import MinMaxScaler
+    print("EA to Python round trip,", bars, "bars")
+    data = makeMinuteData(history + bars)
+    data.columns = [column.lower() for column in data.columns]
+    with tempfile.TemporaryDirectory() as folder:
+        folder += os.sep
+        responder = subprocess.Popen([sys.executable, '-c', "import Benchmarks; Benchmarks.fileResponder(%r)" % folder])
+        ring = SharedBarRing(os.path.join(folder, 'unused.ring'), capacity=1, create=True)   # only used for its waits
+        while not os.path.exists(folder+'Ready.txt'):
+            time.sleep(0.01)
+        stratPath = folder+'Strat.txt'
+        open(stratPath, 'a').close()
+        roundTrips = []
+        for position in range(history, history + bars):
+            size = os.path.getsize(stratPath)
+            start = time.perf_counter()
+            text = "DateTime\topen\thigh\tlow\tclose\n" + "".join(
+                "%s\t%.5f\t%.5f\t%.5f\t%.5f\n" % (index.strftime('%Y.%m.%d %H:%M'), *bar)
+                for index, bar in zip(data.index[position-history+1:position+1],
+                                      data.iloc[position-history+1:position+1, :4].to_numpy()))
+            with open(folder+'BackTestData.csv', 'w', encoding='utf-16') as dataFile:
+                dataFile.write(text)
+            ring.waitFor(lambda: os.path.getsize(stratPath) != size)
+            roundTrips.append(time.perf_counter() - start)
+        with open(folder+'Done.txt', 'w') as doneFile:
+            doneFile.write("1")
+        responder.wait()
+        ring.close()
+        filesTrips = np.array(roundTrips)
+
+        path = os.path.join(folder, 'LazyEA.ring')
+        SharedBarRing(path, create=True).close()
+        responder = subprocess.Popen([sys.executable, '-c', "import Benchmarks; Benchmarks.ringResponder(%r)" % path])
+        simulator = EASimulator(path, data, history)
+        simulator.run(timeout=30)
+        responder.wait()
+        ringTrips = np.array(simulator.roundTrips)
+
+        # the memory operations of one round trip in one process, without waiting for the other side
+        eaRing, pythonRing = SharedBarRing(path, create=True), SharedBarRing(path)
+        protocolTrips = []
+        for position in range(bars):
+            start = time.perf_counter()
+            simulator.sendBar(eaRing, position)
+            eaRing.header['requestSeq'] = eaRing.getWriteSeq()
+            seq = pythonRing.waitRequest(0)
+            pythonRing.getRecords(seq-1, seq)
+            pythonRing.respond(seq, 2)
+            protocolTrips.append(time.perf_counter() - start)
+        eaRing.close()
+        pythonRing.close()
+
+        # the ring answered by a model, the data is long enough for the BarHistory to hold more than history bars
+        os.mkdir(os.path.join(folder, "Models"))
+        os.mkdir(os.path.join(folder, "Scalers"))
+        makeLSTMModel(lookBack, features).save(os.path.join(folder, "Models", "EURUSD_1Min.h5"))
+        with open(os.path.join(folder, "Scalers", "EURUSD_1Min.pkl"), 'wb') as scalerFile:
+            dump(MinMaxScaler().fit(np.random.default_rng(0).random((1000, features))*100), scalerFile)
+        modelTrips = {}
+        for incremental in [True, False]:
+            if os.path.exists(path):
+                os.remove(path)
+            responder = subprocess.Popen([sys.executable, '-c', "import Benchmarks; Benchmarks.strategyRingWorker(%r, %r)" % (folder, incremental)])
+            ring = None
+            while ring is None:                 # runShared creates the ring after loading the model
+                try:
+                    ring = SharedBarRing(path)
+                except (OSError, ValueError):
+                    time.sleep(0.01)
+            ring.close()
+            simulator = EASimulator(path, data, history)
+            simulator.run(timeout=120)
+            responder.wait()
+            modelTrips[incremental] = np.array(simulator.roundTrips)
+
+    for name, trips in [("files", filesTrips), ("shared ring", ringTrips), ("ring memory", np.array(protocolTrips)),
+                        ("incremental", modelTrips[True]), ("full window", modelTrips[False])]:
+        print("\t%-12s p50 %8.1f us, p99 %8.1f us" % (name+":", np.percentile(trips, 50)*1e6, np.percentile(trips, 99)*1e6))
+    print("\tthe shared ring round trip is mostly the sleeps of the two waiting processes on", os.cpu_count(), "CPU(s)")
+    print("\tincremental and full window answer with a model, full window runs addAllIndicators on", history, "bars")
+
+
+def benchmarkBarHistory(bars=1000, history=159, capacity=1024):
+    """
+        Bytes read and data handling time per bar of the three ways the bars reach the IndicatorEngine:
+        the 159 bars of BackTestData.csv parsed every bar, every bar of the SharedBarRing read every bar,
+        and only the new bar plus its anchor read from the ring into a BarHistory.
+        The indicators are left out (features=[]), they cost the same in the three cases.
+    """
+    import io
+    print("Bars to the IndicatorEngine,", bars, "bars")
+    data = makeMinuteData(history + bars)
+    data.columns = [column.lower() for column in data.columns]
+    data = data[['open', 'high', 'low', 'close']]
+
+    def csvText(position):
+        return ("DateTime\topen\thigh\tlow\tclose\n" + "".join("%s\t%.5f\t%.5f\t%.5f\t%.5f\n" %
+                (index.strftime('%Y.%m.%d %H:%M'), *bar) for index, bar in
+                zip(data.index[position-history+1:position+1], data.iloc[position-history+1:position+1].to_numpy()))).encode('utf-16')
+
+    def feedNew(engine, stockData):         # the re-indexing StrategyConnectMT5.getIndicators did before BarHistory
+        lastTime = engine.getLastTime()
+        engine.seed(stockData if lastTime == None else stockData[stockData.index > lastTime])
+
+    texts = [csvText(position) for position in range(history, history + bars)]
+    engine = IndicatorEngine(features=[])
+    start = time.perf_counter()
+    for text in texts:
+        feedNew(engine, pd.read_csv(io.BytesIO(text), sep='\t', encoding='utf-16', index_col=['DateTime'], parse_dates=['DateTime']))
+    filesTime, filesBytes = (time.perf_counter() - start)/bars, np.mean([len(text) for text in texts])
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'LazyEA.ring')
+        eaRing, ring = SharedBarRing(path, capacity, create=True), SharedBarRing(path)
+        simulator = EASimulator(path, data, history)
+        for position in range(history):
+            simulator.sendBar(eaRing, position)
+
+        engine = IndicatorEngine(features=[])
+        fullTime = 0.0
+        for position in range(history, history + bars):
+            simulator.sendBar(eaRing, position)
+            start = time.perf_counter()
+            feedNew(engine, ring.getBars())
+            fullTime += time.perf_counter() - start
+        fullBytes = min(history + bars, capacity)*ring.records.itemsize
+
+        eaRing.close(); ring.close()
+        eaRing, ring = SharedBarRing(path, capacity, create=True), SharedBarRing(path)   # the same bars again through a new ring
+        for position in range(history):
+            simulator.sendBar(eaRing, position)
+        barHistory = BarHistory(capacity, features=[])
+        barHistory.seed(*getRecordArrays(ring.getRecords(0, history)))
+        lastSeq = history
+        deltaTime = 0.0
+        for position in range(history, history + bars):
+            simulator.sendBar(eaRing, position)
+            start = time.perf_counter()
+            seq = ring.getWriteSeq()
+            barHistory.update(*getRecordArrays(ring.getRecords(lastSeq-1, seq)))
+            lastSeq = seq
+            deltaTime += time.perf_counter() - start
+        deltaBytes = 2*ring.records.itemsize
+        eaRing.close(); ring.close()
+
+    print("\tBackTestData.csv: %6.0f bytes, %7.1f us per bar" % (filesBytes, filesTime*1e6))
+    print("\tring, all bars:   %6.0f bytes, %7.1f us per bar" % (fullBytes, fullTime/bars*1e6))
+    print("\tring, delta:      %6.0f bytes, %7.1f us per bar" % (deltaBytes, deltaTime/bars*1e6))
+
+
+def signalServerWorker(folder, maxBatch, batchWindow=0.0):
+    """
+        Serves the models of folder/Models with a SignalServer on a free local port and prints the port.
+    """
+    os.chdir(folder)
+    server = SignalServer(maxBatch=maxBatch, batchWindow=batchWindow)
+    errors = server.loadChannels()
+    if errors:
+        raise RuntimeError(errors)
+    print(server.address[1], flush=True)
+    server.serve()
+
+def benchmarkSignalServer(charts=(1, 4, 8), bars=100, lookBack=96, features=30):
+    """
+        Directions per second and round trip of charts clients, one per model (pair) with the same
+        architecture, served by one SignalServer process without batching (maxBatch 1), batching
+        the windows queued while the previous batch ran (maxBatch 64) and also waiting up to 5 ms for
+        the windows being prepared (batchWindow).
+    """
+    import threading
+    from pickle import dump
+    from sklearn.preprocessing import MinMaxScaler
+    print("Signal server,", bars, "bars per chart")
+    pairs = ['EURUSD', 'GBPUSD', 'USDJPY', 'USDCHF', 'AUDUSD', 'NZDUSD', 'USDCAD', 'EURGBP'][:max(charts)]
+    rng = np.random.default_rng(0)
+    data = makeMinuteData(300 + bars)
+    data.columns = [column.lower() for column in data.columns]
+    with tempfile.TemporaryDirectory() as folder:
+        os.mkdir(os.path.join(folder, "Models"))
+        os.mkdir(os.path.join(folder, "Scalers"))
+        for position, pair in enumerate(pairs):
+            model = makeLSTMModel(lookBack, features)
+            model.set_weights([weight*(1 + 0.05*position) for weight in model.get_weights()])
+            model.save(os.path.join(folder, "Models", pair+"_1Min.h5"))
+            with open(os.path.join(folder, "Scalers", pair+"_1Min.pkl"), 'wb') as scalerFile:
+                dump(MinMaxScaler().fit(rng.random((1000, features))*100), scalerFile)
+
+        for maxBatch, batchWindow in [(1, 0.0), (64, 0.0), (64, 0.005)]:
+            code = "import Benchmarks; Benchmarks.signalServerWorker(%r, %d, %r)" % (folder, maxBatch, batchWindow)
+            server = subprocess.Popen([sys.executable, '-c', code], stdout=subprocess.PIPE, text=True)
+            address = ('127.0.0.1', int(server.stdout.readline()))
+            try:
+                for count in charts:
+                    clients = [SignalClient(address, pair+"_1Min") for pair in pairs[:count]]
+                    before = clients[0].getStats()
+                    threads = [threading.Thread(target=client.run, args=(data,)) for client in clients]
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+                    after = clients[0].getStats()
+                    trips = np.concatenate([client.roundTrips for client in clients])
+                    meanBatch = (after['predictions'] - before['predictions'])/max(after['batches'] - before['batches'], 1)
+                    print("	max batch %2d, wait %.0f ms, %d charts: %6.1f directions/s, round trip p50 %6.1f ms, p99 %6.1f ms, mean batch %.1f" %
+                          (maxBatch, batchWindow*1e3, count, count*bars/elapsed, np.percentile(trips, 50)*1e3, np.percentile(trips, 99)*1e3, meanBatch))
+                    for client in clients:
+                        client.close()
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    benchmarkCSVCache()
+    benchmarkTickStream()
+    benchmarkMultiTimeFrame()
+    benchmarkIndicatorEngine()
+    benchmarkIndicatorMatrix()
+    benchmarkCandlePatterns()
+    benchmarkParallelIndicators()
+    benchmarkLabels()
+    benchmarkLabelSweep()
+    benchmarkWindowDataset()
+    benchmarkBalancedEpochs()
+    benchmarkInputPipeline()
+    benchmarkShards()
+    benchmarkFeatureDtype()
+    benchmarkScalerCache()
+    benchmarkInferenceSession()
+    benchmarkTFLite()
+    benchmarkFileWatcher()
+    benchmarkChangeDetection()
+    benchmarkSharedTransport()
+    benchmarkBarHistory()
+    benchmarkSignalServer()
@@ -0,0 +1,71 @@
+#import libraries
+import numpy as np
+import os, glob
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # or any {'0', '1', '2'}
+
+##Costume Library to run the exported models
+from Libraries.KerasCustom import *
+from Libraries.Inference import InferenceSession, TFLiteSession
+
+##Artificial Intelligence Library
+from tensorflow.keras.models import load_model
+import tensorflow as tf
+
+
+def convertModel(model, quantize=None):
+    """
+        Converts a Keras model to a TFLite model that predicts one window at a time.
+
+        Parameters:
+            model (Model): the Keras model.
+            quantize (str): None keeps float32 weights, "float16" stores the weights as float16,
+                            "int8" quantizes the weights to int8 (dynamic range quantization).
+
+        Returns:
+            (bytes): the TFLite model.
+    """
+    lookBack, features = model.input_shape[1:]
+    function = tf.function(lambda x: model(x, training=False),
+                           input_signature=[tf.TensorSpec((1, lookBack, features), tf.float32)])
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([function.get_concrete_function()], model)
+    if quantize == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif quantize != None:
+        raise ValueError("Unknown quantization: "+str(quantize))
+    return converter.convert()
+
+def exportModel(path, quantize=None, samples=200):
+    """
+        Exports Models/<PAIR>_<TF>.h5 to Models/<PAIR>_<TF>.tflite, next to it,
+        and checks the TFLite model predicts like the Keras model on random windows.
+
+        Parameters:
+            path (str): the .h5 model.
+            quantize (str): see convertModel.
+            samples (int): number of windows the predictions are compared on.
+
+        Returns:
+            error (float): largest difference of a predicted probability.
+            agreement (float): share of windows where both models predict the same class.
+    """
+    model = load_model(path, custom_objects={'winRatio': winMetric([],[]), 'NoTradesInBatch':  TradeFrequency([],[])})
+    outPath = os.path.splitext(path)[0]+'.tflite'
+    with open(outPath, 'wb') as modelFile:
+        modelFile.write(convertModel(model, quantize))
+
+    keras = InferenceSession(model)
+    lite = TFLiteSession(outPath)
+    windows = np.random.default_rng(0).random((samples, keras.lookBack, keras.features)).astype(np.float32)
+    expected = np.array([keras.predict(x) for x in windows])
+    predicted = np.array([lite.predict(x) for x in windows])
+    return np.abs(predicted - expected).max(), (predicted.argmax(axis=1) == expected.argmax(axis=1)).mean()
+
+
+if __name__ == "__main__":
+    quantize = None     # None, "float16" or "int8"
+    for path in sorted(glob.glob("Models/*.h5")):
+        error, agreement = exportModel(path, quantize)
+        print(path, "-> .tflite, max probability error %.2e, same class %.1f%%" % (error, agreement*100))
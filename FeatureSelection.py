@@ -23,7 +23,7 @@ class FS:
     
     def collectForexData(self):
         df = self.dataHandler.getFullData(self.pair, self.timeFrame)
-        self.dataHandler.addAllIndicators(df)
+        df = self.dataHandler.addAllIndicators(df)
         self.dataHandler.addLabels(df, self.trade_length)
         self.dataHandler.printDirectionAmount(df)
         return df
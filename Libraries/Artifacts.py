@@ -0,0 +1,99 @@
+##Import libraries
+import numpy as np
+from pickle import load
+import os, time
+
+class ArtifactCache:
+    def __init__(self, checkInterval=1.0):
+        """
+            Process wide cache of the artifacts read from disk (scalers, models).
+            An artifact is loaded once and handed out from memory after that, its file is
+            checked for changes (size and modification time) at most every checkInterval
+            seconds and the artifact is loaded again when it changed, e.g. after retraining.
+
+            Parameters:
+                checkInterval (float): seconds between two checks of the same file.
+        """
+        self.checkInterval = checkInterval
+        self.artifacts = {}     # key -> (artifact, file stamp, time of the last check)
+        self.loads = 0
+        self.reloads = 0
+        self.hits = 0
+
+    def get(self, path, loader, key=None):
+        """
+            Returns the artifact of a file, loading it with loader(path) if it is not cached or the file changed.
+
+            Parameters:
+                path (str): the file the artifact is loaded from.
+                loader (function): loads the artifact from path.
+                key: identifies the artifact if the same file is loaded in different ways, path by default.
+        """
+        key = path if key is None else key
+        now = time.monotonic()
+        if key in self.artifacts:
+            artifact, stamp, checked = self.artifacts[key]
+            if now - checked < self.checkInterval:
+                self.hits += 1
+                return artifact
+            if self.getStamp(path) == stamp:
+                self.artifacts[key] = (artifact, stamp, now)
+                self.hits += 1
+                return artifact
+            self.reloads += 1
+
+        stamp = self.getStamp(path)
+        artifact = loader(path)
+        self.loads += 1
+        self.artifacts[key] = (artifact, stamp, now)
+        return artifact
+
+    def getStamp(self, path):
+        stat = os.stat(path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def remove(self, key):
+        self.artifacts.pop(key, None)
+
+    def clear(self):
+        self.artifacts.clear()
+
+    def getStats(self):
+        return {'loads': self.loads, 'reloads': self.reloads, 'hits': self.hits, 'artifacts': len(self.artifacts)}
+
+##One cache shared by every DataHandler and StrategyConnectMT5 in the process
+sharedArtifactCache = ArtifactCache()
+
+class ScalerTransform:
+    def __init__(self, scaler, dtype=np.float32):
+        """
+            The transform of a fitted MinMaxScaler as its precomputed scale and offset vectors,
+            applied in place without the input validation of scaler.transform.
+            Gives the same values as scaler.transform.
+
+            Parameters:
+                scaler (MinMaxScaler): the fitted scaler.
+                dtype: float type of the scaled features.
+        """
+        self.scaler = scaler
+        self.scale = scaler.scale_
+        self.offset = scaler.min_
+        self.dtype = dtype
+
+    def transform(self, x):
+        """
+            Returns x*scale + offset in a new array of dtype.
+        """
+        x = np.array(x, dtype=self.dtype)
+        x *= self.scale
+        x += self.offset
+        if getattr(self.scaler, 'clip', False):
+            np.clip(x, *self.scaler.feature_range, out=x)
+        return x
+
+def loadPickle(path):
+    """
+        Loads a pickled object, closing the file.
+    """
+    with open(path, 'rb') as pickleFile:
+        return load(pickleFile)
@@ -0,0 +1,119 @@
+##Import libraries
+from Libraries.StreamingIndicators import IndicatorEngine
+import numpy as np
+import pandas as pd
+
+##Columns of the bars kept by a BarHistory
+barColumns = ['open', 'high', 'low', 'close']
+
+def getBarArrays(data):
+    """
+        Returns the bar times (int64 nanoseconds) and the open, high, low, close matrix of a DataFrame of bars.
+    """
+    times = data.index.values.astype('datetime64[ns]').astype(np.int64)
+    return times, data[barColumns].to_numpy(dtype=np.float64)
+
+class BarHistory:
+    def __init__(self, capacity=1024, features=None):
+        """
+            The bars of one symbol kept in memory between two bars of the EA, with the IndicatorEngine
+            fed from them. It is seeded once with the history of the symbol and then only takes the
+            new bars (deltas), so the bars already seen are not copied, indexed or fed again.
+            A delta must start with the last bar already kept (its anchor), a delta that does not,
+            or whose anchor has a different close, means bars were missed or the EA sent other data:
+            update returns None and the history has to be seeded again (resync).
+            The bars are kept in arrays of twice the capacity, when the end is reached the last
+            capacity bars are moved to the start, so appending costs O(1) and the kept bars are
+            always one contiguous slice.
+
+            Parameters:
+                capacity (int): number of bars kept.
+                features (list): feature names of the model, see IndicatorEngine.
+        """
+        self.capacity = capacity
+        self.features = features
+        self.times = np.zeros(2*capacity, dtype=np.int64)
+        self.bars = np.zeros((2*capacity, len(barColumns)), dtype=np.float64)
+        self.start = 0
+        self.end = 0
+        self.engine = None
+        self.updates = 0        # deltas taken
+        self.appended = 0       # new bars taken from deltas
+        self.resyncs = 0        # times the history was seeded
+
+    def __len__(self):
+        return self.end - self.start
+
+    def getLastTime(self):
+        return int(self.times[self.end-1]) if len(self) else None
+
+    def append(self, times, bars):
+        if len(times) >= self.capacity:
+            times, bars = times[-self.capacity:], bars[-self.capacity:]
+            self.start = self.end = 0
+        elif self.end + len(times) > len(self.times):      # move the last bars to the start
+            keep = min(len(self), self.capacity - len(times))
+            self.times[:keep] = self.times[self.end-keep:self.end]
+            self.bars[:keep] = self.bars[self.end-keep:self.end]
+            self.start, self.end = 0, keep
+        self.times[self.end:self.end+len(times)] = times
+        self.bars[self.end:self.end+len(times)] = bars
+        self.end += len(times)
+        self.start = max(self.start, self.end - self.capacity)
+        for time, (o, h, l, c) in zip(times, bars):
+            self.engine.update(time, o, h, l, c)
+
+    def seed(self, times, bars):
+        """
+            Replaces the history with the given bars and seeds a new IndicatorEngine with them.
+
+            Parameters:
+                times (array): int64 bar times in nanoseconds, increasing.
+                bars (array): open, high, low, close of every bar.
+        """
+        self.start = self.end = 0
+        self.engine = IndicatorEngine(features=self.features)
+        self.resyncs += 1
+        self.append(np.asarray(times, dtype=np.int64), np.asarray(bars, dtype=np.float64))
+
+    def update(self, times, bars):
+        """
+            Takes a delta, the last bar already kept followed by the new bars.
+
+            Parameters:
+                times (array): int64 bar times in nanoseconds, increasing.
+                bars (array): open, high, low, close of every bar.
+
+            Returns:
+                new (int): number of new bars, None if the delta does not continue the history and it must be seeded again.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        lastTime = self.getLastTime()
+        if lastTime == None or len(times) == 0:
+            return None
+        anchor = np.searchsorted(times, lastTime, side='right') - 1    # last bar of the delta already kept
+        if anchor < 0 or times[anchor] != lastTime or bars[anchor][3] != self.bars[self.end-1, 3]:
+            return None
+        new = len(times) - anchor - 1
+        if new:
+            self.append(times[anchor+1:], np.asarray(bars[anchor+1:], dtype=np.float64))
+        self.updates += 1
+        self.appended += new
+        return new
+
+    def getData(self, count=None):
+        """
+            Returns the last count bars (all kept bars by default) as a DataFrame like DataHandler.getFullData.
+        """
+        start = self.start if count == None else max(self.start, self.end - count)
+        index = pd.DatetimeIndex(self.times[start:self.end].astype('datetime64[ns]'), name='DateTime')
+        return pd.DataFrame(self.bars[start:self.end].copy(), index=index, columns=barColumns)
+
+    def getFeatures(self, rows=None, columns=None):
+        """
+            Returns the indicators of the last rows bars, see IndicatorEngine.getFeatures.
+        """
+        return self.engine.getFeatures(rows, columns)
+
+    def getStats(self):
+        return {'bars': len(self), 'updates': self.updates, 'appended': self.appended, 'resyncs': self.resyncs}
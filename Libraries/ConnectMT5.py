@@ -1,21 +1,27 @@
 # Import libraries
 from Libraries.Utils import DataHandler
-from Libraries.KerasCustom import *
-import tensorflow as tf
-from tensorflow.keras.models import load_model
-import random, os
+from Libraries.BarHistory import BarHistory, getBarArrays
+from Libraries.Artifacts import sharedArtifactCache
+from Libraries.Inference import InferenceSession, TFLiteSession
+from Libraries.FileWatcher import FileWatcher
+from Libraries.SharedMemory import SharedBarRing, getRecordArrays
+import random, os, time
 import pandas as pd
 import numpy as np
-import tensorflow.keras.backend as K
+# TensorFlow is only imported by the keras backend, see StrategyConnectMT5.getModel
 
-# Check if you have any number of GPUs to run the model calculations 
-physical_devices = tf.config.experimental.list_physical_devices('GPU')
-for i in range(len(physical_devices)):
-    tf.config.experimental.set_memory_growth(physical_devices[i], True)
+def assignGPU():
+    """
+        Check if you have any number of GPUs to run the model calculations
+    """
+    import tensorflow as tf
+    physical_devices = tf.config.experimental.list_physical_devices('GPU')
+    for i in range(len(physical_devices)):
+        tf.config.experimental.set_memory_growth(physical_devices[i], True)
 
 
 class StrategyConnectMT5:
-    def __init__(self, pair, tf):
+    def __init__(self, pair, tf, incremental=True, backend="keras", transport="files", windowSize=159):
         """ 
             This class connects the Python Code to the MT5 Expert Advisor
             It takes the desire pair and time frame and loads the model for that.
@@ -28,26 +34,132 @@ class StrategyConnectMT5:
             Parameters:
                 pair (str): the currency pair you want to trade
                 tf (str): the time framea you want to trade on
+                incremental (bool): update the indicators bar by bar with an IndicatorEngine
+                                    instead of recomputing them on the whole window every bar.
+                backend (str): "keras" runs Models/<pair>_<tf>.h5 on TensorFlow,
+                               "tflite" runs Models/<pair>_<tf>.tflite (see ExportModels.py) without TensorFlow.
+                transport (str): "files" exchanges the bars and directions through BackTestData.csv and Strat.txt,
+                                 "shared" through a memory-mapped SharedBarRing (see Libraries/SharedMemory.py).
+                                 Only "shared" reads just the new bars: with "files" the EA still writes the last
+                                 windowSize bars every bar and they are all read and parsed, the BarHistory then
+                                 only skips the bars it already holds.
+                windowSize (int): bars the EA sends with every bar, the bars the indicators are recomputed on
+                                  when incremental is false.
         """
         self.dataHandler = DataHandler(isMT5=True, verbose=0)
         self.pair = pair
         self.timeFrame = tf
-        self.model = load_model("Models/"+self.pair+"_"+self.timeFrame+".h5", custom_objects={'winRatio': winMetric([],[]), 'NoTradesInBatch':  TradeFrequency([],[])})
+        self.backend = backend
+        self.transport = transport
+        self.modelPath = "Models/"+self.pair+"_"+self.timeFrame+(".tflite" if backend=="tflite" else ".h5")
+        self.session = self.getSession()
         self.oldStockData = None
         self.stockData = None
+        self.incremental = incremental
+        self.windowSize = windowSize                # bars of the window addAllIndicators runs on when not incremental
+        self.histories = {}                         # BarHistory (bars and indicator state) of every symbol, seeded from the first data sent by the EA
+        self.lookBack = self.session.lookBack       # bars the model looks at
+        self.features = self.dataHandler.getModelFeatures() # only the indicators the model uses are computed
+        self.watcher = None                         # waits for the EA to write the shared files, see run
+        self.latencies = []                         # seconds from the EA writing the data to the prediction being written
+        self.ring = None                            # shared memory ring of the "shared" transport
     
     def getPrediction(self, stockData):
         """
             Returns model prediction
         """
-        df = stockData.copy()
-        self.dataHandler.addAllIndicators(df)
-        self.dataHandler.featureSelection(df)
-        x = self.dataHandler.preprocess_df(df, self.pair, self.timeFrame)
-        prediction = self.model.predict(np.array([x]))[0]
+        if self.incremental:
+            df = self.getIndicators(stockData)
+        else:
+            df = self.dataHandler.addAllIndicators(stockData, self.features)
+        return self.predictFeatures(df)
+
+    def predictFeatures(self, df):
+        """
+            Returns model prediction from the indicators of the last bars
+        """
+        x = self.getWindow(df)
+        self.session = self.getSession()
+        prediction = self.session.predict(x)
         a = self.predictionThreshold(prediction)
         return str(a)   #str(random.choices([0,1,2], weights=[0.02, 0.02, 0.96])[0])
     
+    def getWindow(self, df):
+        """
+            Returns the scaled model input of the indicators of the last lookBack bars,
+            the sessions take windows of exactly lookBack bars.
+
+            Parameters:
+                df: the DataFrame of DataHandler.addAllIndicators, or the model feature rows
+                    of an IndicatorEngine (see getIndicators).
+        """
+        if isinstance(df, pd.DataFrame):
+            self.dataHandler.featureSelection(df)
+            return self.dataHandler.preprocess_df(df.iloc[-self.lookBack:], self.pair, self.timeFrame)
+        return self.dataHandler.getScaler(self.pair, self.timeFrame).transform(df[-self.lookBack:].astype(self.dataHandler.dtype))
+
+    def getModel(self, path):
+        from Libraries.KerasCustom import winMetric, TradeFrequency
+        from tensorflow.keras.models import load_model
+        assignGPU()
+        return load_model(path, custom_objects={'winRatio': winMetric([],[]), 'NoTradesInBatch':  TradeFrequency([],[])})
+
+    def loadSession(self, path):
+        if self.backend == "tflite":
+            return TFLiteSession(path)
+        return InferenceSession(self.getModel(path), self.dataHandler.dtype)
+
+    def getSession(self):
+        """
+            Returns the warmed up session (InferenceSession or TFLiteSession) of the pair's model through
+            the process wide artifact cache, the model is only loaded again when its file changes (e.g. after retraining).
+        """
+        return sharedArtifactCache.get(self.modelPath, self.loadSession, (self.modelPath, np.dtype(self.dataHandler.dtype).name))
+
+    def getHistory(self, symbol=None):
+        """
+            Returns the BarHistory of a symbol, the pair of the strategy by default.
+        """
+        symbol = self.pair if symbol == None else symbol
+        if symbol not in self.histories:
+            self.histories[symbol] = BarHistory(features=self.features)
+        return self.histories[symbol]
+
+    def addBars(self, times, bars, symbol=None):
+        """
+            Feeds bars to the BarHistory of a symbol. They are taken as a delta (the last bar
+            already seen followed by the new ones), if they do not continue the bars already
+            seen (first call, gap or resync) the history is seeded again from them.
+
+            Parameters:
+                times (array): int64 bar times in nanoseconds.
+                bars (array): open, high, low, close of every bar.
+                symbol (str): the symbol of the bars, the pair of the strategy by default.
+
+            Returns:
+                history (BarHistory): the history of the symbol.
+        """
+        history = self.getHistory(symbol)
+        if history.update(times, bars) == None:
+            history.seed(times, bars)
+        return history
+
+    def getIndicators(self, stockData):
+        """
+            Feeds the bars the indicator engine has not seen yet and returns the
+            indicators of the last lookBack bars.
+            If the data does not continue the bars already seen (first call or a gap)
+            the engine is seeded again from the data.
+
+            Parameters:
+                stockData (DataFrame): bars sent by the EA.
+
+            Returns:
+                features (array): the model features of the last lookBack bars, in the column
+                                  order featureSelection leaves, no DataFrame is built.
+        """
+        return self.addBars(*getBarArrays(stockData)).getFeatures(self.lookBack, self.features)
+
     def predictionThreshold(self, prediction, threshold = 0):
         maxValue = max(prediction)
         if maxValue >= threshold:
@@ -105,13 +217,16 @@ class StrategyConnectMT5:
         donePath = self.dataHandler.getDonePath()
         stratPath = self.dataHandler.getWriteStrategyPath()
         pathReady = self.dataHandler.getReadyPath()
-        paths = [pathReady, dataPath, donePath, stratPath]
+        ringPath = self.dataHandler.getRingPath()
+        paths = [pathReady, dataPath, donePath, stratPath, ringPath]
 
         for path in paths:
             try:
                 if os.path.exists(path): os.remove(path)
             except:
                 print(path)
+        self.dataHandler.dataStamp = None       # Forget the bars already parsed
+        self.dataHandler.lastBarTime = None
 
     def isThreadRunning(self, thread):
         """
@@ -127,12 +242,33 @@ class StrategyConnectMT5:
             return thread.running
         return True
 
+    def getStats(self):
+        """
+            Returns the statistics of the last run: the FileWatcher stats (wakeups, idle CPU and detection latency),
+            the number of data file checks and parses, the number of predictions and the mean and largest latency
+            from the data write to the prediction write.
+        """
+        stats = self.watcher.getStats() if self.watcher != None else {}
+        if self.ring != None:
+            stats.update(self.ring.getStats())
+        if self.pair in self.histories:
+            stats.update(self.histories[self.pair].getStats())
+        latencies = self.latencies or [0.0]
+        stats.update(dataChecks=self.dataHandler.dataChecks, dataParses=self.dataHandler.dataParses,
+                     predictions=len(self.latencies), meanPredictionLatency=sum(latencies)/len(latencies),
+                     maxPredictionLatency=max(latencies))
+        return stats
+
     def run(self, thread = None):
         """
             The run function combines all of these previous functions.
             It first resets the shared files then starts a loop that is only
             broken if the EA is removed from the MT5 chart, if the EA completes
             it's backtesting or the thread was stopped from running.
+            The loop sleeps in a FileWatcher until the EA writes the data or done file,
+            it wakes up at least every watcher.maxInterval seconds to check the thread.
+            A data file change without a new bar is checked once more after the settle time,
+            the change can be reported while the EA is still writing the file.
 
             Parameters:
                 thread: This function can be run in a thread, this is the thread it will run in.
@@ -141,24 +277,90 @@ class StrategyConnectMT5:
             self.dataHandler.createFileFolder()
         else:
             return False
+        if self.transport == "shared":
+            return self.runShared(thread)
 
         self.reset()                                                # Reset files
+        dataPath = self.dataHandler.getMT5DataPath()
+        donePath = self.dataHandler.getDonePath()
+        self.watcher = FileWatcher([dataPath, donePath])            # Wakes the loop when the EA writes a shared file
+        self.latencies = []
         done = self.dataHandler.isBacktestDone()                    # Get done status of EA
-        self.stockData = self.dataHandler.getFullData(self.pair)    # Get the stock data if it is available in shared files
-        self.oldStockData = self.stockData                          # Save previous data
+        self.stockData = self.dataHandler.getNewData(self.pair)     # Get the stock data if it is available in shared files
+        self.oldStockData = self.stockData                          # Save previous data, its last bar is not traded
         self.isReady()                                              # Signal to EA that the python code is ready
         threadRunning = self.isThreadRunning(thread)                # Check if the thread is still running
 
         while not done and threadRunning:                           # While EA is not done backtesting and thread is still running
-            self.stockData = self.dataHandler.getFullData(self.pair)# Get currency data from mt5
-            done = self.dataHandler.isBacktestDone()                # Check if EA is done backtesting
+            changed = self.watcher.wait(self.watcher.maxInterval)   # Sleep until the data or done file changes
             threadRunning = self.isThreadRunning(thread)            # Check if thread is still running
+            if donePath in changed:
+                done = self.dataHandler.isBacktestDone()            # Check if EA is done backtesting
+            if dataPath not in changed:
+                continue
+            stockData = self.dataHandler.getNewData(self.pair)      # Get currency data from mt5, only parsed if a new bar arrived
+            if stockData is None:                                   # The EA may have paused mid write, check once more after it settled
+                time.sleep(max(self.watcher.settle, self.watcher.minInterval))
+                stockData = self.dataHandler.getNewData(self.pair)
             
-            # If the new data has changed from what it used to be then trade
-            if not self.stockData.equals(self.oldStockData) and not self.stockData.equals(pd.DataFrame([])):        
-                self.oldStockData = self.stockData                  # Set old data to new data
+            # If a new bar arrived then trade
+            if stockData is not None:
+                self.oldStockData = self.stockData                  # Set old data to the previous data
+                self.stockData = stockData
                 direction = self.getPrediction(self.stockData)      # Get AI prediction
                 self.writeTradeToFile(direction)                    # send prediction to MT5 EA
+                self.latencies.append(time.time() - self.watcher.getWriteTime(dataPath))
 
+        self.watcher.stop()
         self.reset() # Reset files
-        return True
\ No newline at end of file
+        return True
+
+    def runShared(self, thread = None):
+        """
+            The run loop of the "shared" transport. The EA writes every bar to a SharedBarRing and
+            asks for its direction, the loop waits for a request, reads only the bars written since
+            the last request (plus the last bar already seen, the anchor of the delta) into the
+            BarHistory of the pair, predicts and writes the direction to the response slot of the ring.
+            The history is seeded again from every bar in the ring on the first request, or when
+            bars were overwritten before they were read or the delta does not continue the history.
+            If the EA overwrote bars while the ring was read for that, the request is skipped and
+            the next one seeds the history.
+
+            Parameters:
+                thread: This function can be run in a thread, this is the thread it will run in.
+        """
+        self.reset()                                                # Reset files
+        self.ring = SharedBarRing(self.dataHandler.getRingPath(), create=True)
+        self.latencies = []
+        self.histories = {}
+        lastSeq = 0                                                 # bars of the ring already in the history
+        self.ring.setReady()                                        # Signal to EA that the python code is ready
+        threadRunning = self.isThreadRunning(thread)
+
+        while not self.ring.isDone() and threadRunning:             # While EA is not done backtesting and thread is still running
+            seq = self.ring.waitRequest(0.25)                       # Sleep until the EA asks for a direction
+            threadRunning = self.isThreadRunning(thread)
+            if seq == None:
+                continue
+            start = time.perf_counter()
+            records = self.ring.getRecords(lastSeq-1, seq) if lastSeq else None    # The anchor and the new bars
+            if records is None or self.getHistory().update(*getRecordArrays(records)) == None:
+                records = self.ring.getRecords(max(seq-self.ring.capacity, 0), seq)  # Resync from every bar in the ring
+                if records is None:                                 # The EA wrote over the bars while they were copied
+                    lastSeq = 0
+                    continue
+                self.getHistory().seed(*getRecordArrays(records))
+            lastSeq = seq
+            history = self.getHistory()
+            if self.incremental:
+                df = history.getFeatures(self.lookBack, self.features)
+            else:
+                df = self.dataHandler.addAllIndicators(history.getData(self.windowSize), self.features).iloc[-self.lookBack:]
+            direction = int(self.predictFeatures(df))
+            self.ring.respond(seq, direction)                       # send prediction to MT5 EA
+            self.latencies.append(time.perf_counter() - start)
+
+        self.ring.setReady(False)
+        self.ring.close()
+        self.reset() # Reset files
+        return True
@@ -0,0 +1,249 @@
+##Import libraries
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.preprocessing import MinMaxScaler
+import os, json
+
+##MinMaxScaler attributes saved in the shard manifest
+scalerParams = ['min_', 'scale_', 'data_min_', 'data_max_', 'data_range_']
+
+class WindowDataset:
+    def __init__(self, x, y, acc_dir, lookBack, isBool=False, balance=None, scaler=None):
+        """
+            The LSTM training samples of a scaled feature matrix without copying them.
+            Sample i is the window x[i:i+lookBack] labeled with y[i+lookBack] and acc_dir[i+lookBack],
+            the windows are strided views of x so the dataset takes the memory of the feature
+            matrix once instead of lookBack times. Samples are picked with index arrays and
+            only the batches that are used are copied out of the views.
+
+            Parameters:
+                x (array): scaled feature matrix, one row per bar.
+                y (array): labels, one per bar.
+                acc_dir (array): actual directions, one per bar.
+                lookBack (int): number of bars in a window.
+                isBool (bool): only use the buy and sell samples, not the holds.
+                balance (str): default class balancing of epochIndices, None, "over" or "under".
+                scaler (MinMaxScaler): the scaler x was scaled with, saved with the shards.
+        """
+        self.x = np.ascontiguousarray(x)
+        self.lookBack = lookBack
+        self.features = self.x.shape[1]
+        self.dtype = self.x.dtype
+        self.scaler = scaler
+        self.windows = sliding_window_view(self.x, (lookBack, self.features))[:, 0]   # (bars-lookBack+1, lookBack, features) view
+        self.setLabels(np.asarray(y)[lookBack:], np.asarray(acc_dir)[lookBack:], isBool, balance)
+
+    def setLabels(self, y, acc_dir, isBool, balance):
+        """
+            Sets the labels of the samples and the sample positions used for training.
+        """
+        self.y = y                  # label of every sample
+        self.acc_dir = acc_dir      # actual direction of every sample
+        self.isBool = isBool
+        if isBool:
+            self.indices = np.flatnonzero(self.y != 2)
+        else:
+            self.indices = np.arange(len(self.y))
+        self.balance = balance
+        self.classIndices = [self.indices[self.y[self.indices]==label] for label in np.unique(self.y[self.indices])]
+
+    def __len__(self):
+        return len(self.indices)
+
+    @property
+    def shape(self):
+        """
+            Shape of the materialized samples, (samples, lookBack, features).
+        """
+        return (len(self.indices), self.lookBack, self.features)
+
+    def getIndices(self, shuffle=True):
+        """
+            Returns the positions of the samples of the dataset, in a random order if shuffle is true.
+        """
+        if shuffle:
+            return np.random.permutation(self.indices)
+        return self.indices.copy()
+
+    def epochIndices(self, balance="default"):
+        """
+            Returns the shuffled sample positions of one training epoch. The classes are balanced by
+            sampling positions instead of copying windows, so it costs no memory, and they are drawn
+            again on every call so each epoch sees a different selection of the samples.
+
+            Parameters:
+                balance (str): None keeps every sample once,
+                    "over" repeats the positions of every class up to the size of the largest one,
+                    the remainder is drawn without replacement,
+                    "under" draws the size of the smallest class from every class without replacement,
+                    by default the balance the dataset was created with.
+
+            Returns:
+                indices (array): sample positions for getBatch.
+        """
+        if balance == "default":
+            balance = self.balance
+        if balance == None or len(self.classIndices) == 0:
+            return self.getIndices()
+
+        if balance == "over":
+            size = max(len(indices) for indices in self.classIndices)
+        elif balance == "under":
+            size = min(len(indices) for indices in self.classIndices)
+        else:
+            raise ValueError("Unknown balance: "+str(balance))
+        epoch = []
+        for indices in self.classIndices:
+            repeats, remainder = divmod(size, len(indices))
+            epoch += [np.random.permutation(indices) for _ in range(repeats)]
+            epoch.append(np.random.choice(indices, remainder, replace=False))
+        return np.random.permutation(np.concatenate(epoch))
+
+    def getBatch(self, indices):
+        """
+            Copies the samples at the given positions out of the window views.
+
+            Parameters:
+                indices (array): sample positions, e.g. a slice of getIndices().
+
+            Returns:
+                x (array): windows with shape (len(indices), lookBack, features).
+                y (array): labels.
+                acc_dir (array): actual directions.
+        """
+        return self.windows[indices], self.y[indices], self.acc_dir[indices]
+
+    def getArrays(self, indices=None, dtype=np.float64):
+        """
+            Materializes samples like the original preprocess_df output, all samples in order when indices is None.
+
+            Returns:
+                x (array): windows with shape (len(indices), lookBack, features).
+                y (array): uint8 labels.
+                acc_dir (array): uint8 actual directions.
+        """
+        if indices is None:
+            indices = self.indices
+        x, y, acc_dir = self.getBatch(indices)
+        return x.astype(dtype, copy=False), y.astype(np.uint8), acc_dir.astype(np.uint8)
+
+    def getScaler(self):
+        """
+            Returns the scaler of the features, None if it is not known.
+        """
+        return self.scaler
+
+class ShardedDataset(WindowDataset):
+    def __init__(self, folder, balance=None):
+        """
+            A WindowDataset saved by saveShards, the feature shards are memory-mapped so only
+            the pages of the windows that are used are read from disk and datasets larger
+            than RAM can be trained on. The labels are small and kept in memory.
+
+            Parameters:
+                folder (str): folder of the shards and manifest.json.
+                balance (str): default class balancing of epochIndices, None, "over" or "under".
+        """
+        self.folder = folder
+        with open(os.path.join(folder, 'manifest.json'), 'r') as manifestFile:
+            self.manifest = json.load(manifestFile)
+        self.lookBack = self.manifest['lookBack']
+        self.features = len(self.manifest['features'])
+        self.shardSamples = self.manifest['shardSamples']
+        self.shards = [np.load(os.path.join(folder, name), mmap_mode='r') for name in self.manifest['shards']]
+        self.dtype = np.dtype(self.manifest['dtype'])   # shards stored in a smaller float type are converted when read
+        self.windows = [sliding_window_view(shard, (self.lookBack, self.features))[:, 0] for shard in self.shards]
+        self.setLabels(np.load(os.path.join(folder, 'y.npy')), np.load(os.path.join(folder, 'acc_dir.npy')),
+                       self.manifest['isBool'], balance)
+
+    def getBatch(self, indices):
+        """
+            Copies the samples at the given positions out of the memory-mapped shards.
+        """
+        indices = np.asarray(indices)
+        shards, positions = np.divmod(indices, self.shardSamples)
+        x = np.empty((len(indices), self.lookBack, self.features), dtype=self.dtype)
+        for shard in np.unique(shards):
+            inShard = shards == shard
+            x[inShard] = self.windows[shard][positions[inShard]]
+        return x, self.y[indices], self.acc_dir[indices]
+
+    def getScaler(self):
+        """
+            Rebuilds the scaler of the features from the manifest.
+        """
+        params = self.manifest['scaler']
+        if params is None:
+            return None
+        scaler = MinMaxScaler(feature_range=tuple(params['feature_range']))
+        for name in scalerParams:
+            setattr(scaler, name, np.array(params[name]))
+        scaler.n_features_in_ = self.features
+        scaler.n_samples_seen_ = params['n_samples_seen_']
+        return scaler
+
+def saveShards(folder, dataset, features, fingerprint=None, shardSamples=1000000, storageDtype=None, **info):
+    """
+        Writes a WindowDataset to folder as .npy shards of the scaled features plus the labels
+        and a manifest.json, to be opened again with loadShards.
+        Every shard holds the bars of shardSamples windows, it overlaps the next one by lookBack
+        bars so no window is split between shards.
+        The manifest is written last so a half written folder is never used.
+
+        Parameters:
+            folder (str): folder to write to, it is created if needed.
+            dataset (WindowDataset): the windows to save.
+            features (list): names of the feature columns.
+            fingerprint (str): identifies the source data and settings the dataset was built from.
+            shardSamples (int): number of windows in a shard.
+            storageDtype: optional float type of the shards on disk, e.g. np.float16 halves float32 shards,
+                          batches are still read in the dtype of the dataset.
+            info: other settings saved in the manifest, e.g. pair and timeFrame.
+    """
+    os.makedirs(folder, exist_ok=True)
+    manifestPath = os.path.join(folder, 'manifest.json')
+    if os.path.exists(manifestPath):
+        os.remove(manifestPath)
+
+    samples = len(dataset.y)
+    shards = []
+    for start in range(0, max(samples, 1), shardSamples):
+        name = 'x_%05d.npy' % len(shards)
+        shard = dataset.x[start:min(start+shardSamples, samples)+dataset.lookBack]
+        np.save(os.path.join(folder, name), shard if storageDtype is None else shard.astype(storageDtype))
+        shards.append(name)
+    np.save(os.path.join(folder, 'y.npy'), dataset.y.astype(np.uint8))
+    np.save(os.path.join(folder, 'acc_dir.npy'), dataset.acc_dir.astype(np.uint8))
+
+    scaler = dataset.getScaler()
+    if scaler is not None:
+        params = {name: getattr(scaler, name).tolist() for name in scalerParams}
+        params.update(feature_range=list(scaler.feature_range), n_samples_seen_=int(scaler.n_samples_seen_))
+        scaler = params
+    manifest = dict(info, lookBack=dataset.lookBack, features=list(features), isBool=dataset.isBool,
+                    samples=samples, shardSamples=shardSamples, shards=shards, dtype=str(dataset.dtype),
+                    storageDtype=str(np.dtype(storageDtype or dataset.dtype)),
+                    scaler=scaler, fingerprint=fingerprint)
+    with open(manifestPath, 'w') as manifestFile:
+        json.dump(manifest, manifestFile, indent=1)
+
+def loadShards(folder, fingerprint=None, balance=None):
+    """
+        Opens the shards saved in folder.
+
+        Parameters:
+            folder (str): folder of the shards.
+            fingerprint (str): if given the shards are only used if they were built from the same source and settings.
+            balance (str): default class balancing of epochIndices, None, "over" or "under".
+
+        Returns:
+            dataset (ShardedDataset): the saved windows, None if there are none or they are out of date.
+    """
+    manifestPath = os.path.join(folder, 'manifest.json')
+    if not os.path.exists(manifestPath):
+        return None
+    if fingerprint is not None:
+        with open(manifestPath, 'r') as manifestFile:
+            if json.load(manifestFile)['fingerprint'] != fingerprint:
+                return None
+    return ShardedDataset(folder, balance)
@@ -0,0 +1,163 @@
+##Import libraries
+import os, time, threading
+##watchdog gives file system notifications (inotify, ReadDirectoryChangesW, FSEvents) when it is installed,
+##without it the files are polled
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+def normPath(path):
+    return os.path.normcase(os.path.abspath(path))
+
+class ChangeHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        """
+            Wakes a FileWatcher up when an event touches one of its files.
+        """
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        for path in [event.src_path, getattr(event, 'dest_path', '')]:
+            if path and normPath(path) in self.watcher.watched:
+                self.watcher.event.set()
+                return
+
+class FileWatcher:
+    def __init__(self, paths, minInterval=0.001, maxInterval=0.25, settle=0.005, useEvents=True):
+        """
+            Waits for changes of a few files, e.g. the shared files the MT5 EA writes.
+            A file changed when its size or modification time changed, or it was created or deleted.
+            With watchdog installed the waiting thread sleeps until the operating system reports an
+            event in the folder of a file, the files are still checked every maxInterval in case an
+            event is missed. Without watchdog the files are polled, the poll interval starts at
+            minInterval after a change and doubles up to maxInterval while nothing changes, so bars
+            arriving quickly (backtests) are seen quickly and an idle watcher costs almost no CPU.
+            A change is only reported once the file was not modified for settle seconds, the first
+            event of a write comes before the writer is done and the file would be read half written.
+
+            Parameters:
+                paths (list): the files to watch, they do not need to exist yet but their folders do.
+                minInterval (float): seconds between two polls right after a change.
+                maxInterval (float): longest time between two polls.
+                settle (float): seconds a changed file must stay the same before the change is reported.
+                useEvents (bool): use watchdog notifications when it is installed.
+        """
+        self.paths = list(paths)
+        self.watched = {normPath(path) for path in self.paths}
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        self.settle = settle
+        self.interval = minInterval
+        self.stamps = {path: self.getStamp(path) for path in self.paths}
+        self.event = threading.Event()
+        self.observer = None
+        if useEvents and Observer is not None:
+            folders = {os.path.dirname(normPath(path)) for path in self.paths}
+            if all(os.path.isdir(folder) for folder in folders):
+                self.observer = Observer()
+                for folder in folders:
+                    self.observer.schedule(ChangeHandler(self), folder, recursive=False)
+                self.observer.start()
+        self.mode = 'polling' if self.observer is None else 'events'
+
+        self.wakeups = 0        # times the waiting thread woke up
+        self.changes = 0        # waits that returned a change
+        self.waitTime = 0.0     # wall time spent in wait
+        self.waitCPU = 0.0      # process CPU time spent while waiting
+        self.latencies = []     # seconds from the modification time of a file to the detection of the change
+
+    def getStamp(self, path):
+        """
+            Returns (size, modification time) of a file, None if it does not exist.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def getWriteTime(self, path):
+        """
+            Returns the modification time of a file as seen by the last wait, in seconds since the epoch.
+        """
+        stamp = self.stamps.get(path)
+        return None if stamp is None else stamp[1]/1e9
+
+    def getChanges(self, paths=None):
+        changed = []
+        for path in self.paths if paths is None else paths:
+            stamp = self.getStamp(path)
+            if stamp != self.stamps[path]:
+                self.stamps[path] = stamp
+                changed.append(path)
+        return changed
+
+    def waitSettled(self, changed):
+        """
+            Waits until the changed files were not modified for settle seconds.
+        """
+        if self.settle:
+            time.sleep(self.settle)
+            while self.getChanges(changed):
+                time.sleep(self.settle)
+        now = time.time()
+        for path in changed:
+            if self.stamps[path] is not None:
+                self.latencies.append(max(now - self.stamps[path][1]/1e9, 0.0))
+
+    def wait(self, timeout=None):
+        """
+            Blocks until one of the files changes or timeout seconds passed.
+
+            Parameters:
+                timeout (float): longest time to wait, None waits until a change.
+
+            Returns:
+                changed (list): the paths that changed, empty if the wait timed out.
+        """
+        start = time.perf_counter()
+        startCPU = time.process_time()
+        deadline = None if timeout is None else start + timeout
+        while True:
+            self.event.clear()
+            changed = self.getChanges()
+            now = time.perf_counter()
+            if changed or (deadline is not None and now >= deadline):
+                break
+            if self.observer is not None:
+                sleep = self.maxInterval if deadline is None else min(self.maxInterval, deadline - now)
+                self.event.wait(sleep)
+            else:
+                sleep = self.interval if deadline is None else min(self.interval, deadline - now)
+                time.sleep(sleep)
+                self.interval = min(self.interval*2, self.maxInterval)
+            self.wakeups += 1
+
+        if changed:
+            self.waitSettled(changed)
+            self.changes += 1
+            self.interval = self.minInterval
+        self.waitTime += time.perf_counter() - start
+        self.waitCPU += time.process_time() - startCPU
+        return changed
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def getStats(self):
+        """
+            Returns:
+                stats (dict): mode ("events" or "polling"), wakeups, changes, idleCPU (share of a core the
+                              process used while waiting) and the mean and largest detection latency in seconds.
+        """
+        latencies = self.latencies or [0.0]
+        return {'mode': self.mode,
+                'wakeups': self.wakeups, 'changes': self.changes,
+                'idleCPU': self.waitCPU/self.waitTime if self.waitTime else 0.0,
+                'meanLatency': sum(latencies)/len(latencies), 'maxLatency': max(latencies)}
@@ -1,42 +1,492 @@
 ##Import libraries
 import pandas as pd
 import talib
-import os
+import os, io, json
 from pathlib import Path
 from itertools import compress
 from Libraries.CandleRanking import candle_rankings
+from Libraries.OHLCStore import OHLCStore
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class FrameCache:
+    def __init__(self, maxBytes=1024**3):
+        """
+            Least recently used cache of DataFrames with a memory budget.
+            Frames are evicted, oldest use first, until the frames held fit in maxBytes.
+
+            Parameters:
+                maxBytes (int): memory budget in bytes for all cached frames.
+        """
+        self.maxBytes = maxBytes
+        self.frames = OrderedDict()
+        self.sizes = {}
+        self.bytes = 0          # memory currently held
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+            Returns the cached frame for key or None if it is not cached.
+        """
+        if key in self.frames:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return self.frames[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, frame):
+        """
+            Caches a frame, evicting the least recently used frames to stay within budget.
+            A frame larger than the whole budget is not cached.
+        """
+        self.remove(key)
+        size = int(frame.memory_usage(index=True).sum())
+        if size > self.maxBytes:
+            return
+        while self.bytes + size > self.maxBytes:
+            self.remove(next(iter(self.frames)))
+            self.evictions += 1
+        self.frames[key] = frame
+        self.sizes[key] = size
+        self.bytes += size
+
+    def remove(self, key):
+        if key in self.frames:
+            del self.frames[key]
+            self.bytes -= self.sizes.pop(key)
+
+    def clear(self):
+        self.frames.clear()
+        self.sizes.clear()
+        self.bytes = 0
+
+    def getStats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'bytes': self.bytes, 'maxBytes': self.maxBytes, 'frames': len(self.frames)}
+
+##One cache shared by every Data object in the process
+sharedFrameCache = FrameCache()
+
+##Candle patterns used by candlePatterns, the excluded ones are not found in the patternsite.com
+candleNames = [candle for candle in talib.get_function_groups()['Pattern Recognition'] if candle not in
+               ('CDLCOUNTERATTACK', 'CDLLONGLINE', 'CDLSHORTLINE', 'CDLSTALLEDPATTERN', 'CDLKICKINGBYLENGTH')]
+##Rank of every pattern for a bear, no and bull signal (columns), no pattern ranks after every real one
+candleRankTable = np.array([[candle_rankings[candle+'_Bear'], np.iinfo(np.int16).max, candle_rankings[candle+'_Bull']]
+                            for candle in candleNames], dtype=np.int16)
+
+def encodeCandleSignals(signals):
+    """
+        Returns the code of the best ranked pattern of every row of a signal matrix, see Data.getCandlePatternCodes.
+
+        Parameters:
+            signals (array): int8 signal of every pattern of candleNames (columns) for every bar, -1 bear, 0 no pattern, 1 bull.
+    """
+    ranks = candleRankTable[np.arange(len(candleNames)), signals.astype(np.intp)+1]
+    best = ranks.argmin(axis=1)
+    bestSignal = signals[np.arange(len(signals)), best]
+    return np.where(bestSignal > 0, best+1, np.where(bestSignal < 0, best+2, 0))
+
+##Every indicator added by DataHandler.addAllIndicators, in column order:
+##(column names, TA-Lib function, inputs from 'ohlc', parameters)
+indicatorRegistry = [
+    (['BBANDS UB 5_2', 'BBANDS 5_2', 'BBANDS Lb 5_2'], 'BBANDS', 'c', {'timeperiod': 5, 'nbdevup': 2, 'nbdevdn': 2, 'matype': 0}),
+    (['DEMA 14'], 'DEMA', 'c', {'timeperiod': 14}),
+    (['EMA 14'], 'EMA', 'c', {'timeperiod': 14}),
+    (['KAMA 14'], 'KAMA', 'c', {'timeperiod': 14}),
+    (['MAMA 0.5_0.05', 'FAMA 0.5_0.05'], 'MAMA', 'c', {'fastlimit': 0.5, 'slowlimit': 0.05}),
+    (['SAR 0.02_0.2'], 'SAR', 'hl', {'acceleration': 0.02, 'maximum': 0.2}),
+    (['SMA 14'], 'SMA', 'c', {'timeperiod': 14}),
+    (['TEMA 14'], 'TEMA', 'c', {'timeperiod': 14}),
+    (['TRIMA 14'], 'TRIMA', 'c', {'timeperiod': 14}),
+    (['WMA 14'], 'WMA', 'c', {'timeperiod': 14}),
+    (['ADXR 14'], 'ADXR', 'hlc', {'timeperiod': 14}),
+    (['AROONOSC 14'], 'AROONOSC', 'hl', {'timeperiod': 14}),
+    (['BOP'], 'BOP', 'ohlc', {}),
+    (['CCI 14'], 'CCI', 'hlc', {'timeperiod': 14}),
+    (['CMO 14'], 'CMO', 'c', {'timeperiod': 14}),
+    (['DX 14'], 'DX', 'hlc', {'timeperiod': 14}),
+    (['MACD 12_26_9', 'MACD Signal 12_26_9', 'MACD Hist12_26_9'], 'MACD', 'c', {'fastperiod': 12, 'slowperiod': 26, 'signalperiod': 9}),
+    (['MINUS_DI 14'], 'MINUS_DI', 'hlc', {'timeperiod': 14}),
+    (['MINUS_DM 14'], 'MINUS_DM', 'hl', {'timeperiod': 14}),
+    (['MOM 10'], 'MOM', 'c', {'timeperiod': 10}),
+    (['PLUS_DI 14'], 'PLUS_DI', 'hlc', {'timeperiod': 14}),
+    (['PLUS_DM 14'], 'PLUS_DM', 'hl', {'timeperiod': 14}),
+    (['PPO 12_26'], 'PPO', 'c', {'fastperiod': 12, 'slowperiod': 26, 'matype': 0}),
+    (['ROC 1'], 'ROC', 'c', {'timeperiod': 1}),
+    (['RSI 14'], 'RSI', 'c', {'timeperiod': 14}),
+    (['Slow_K', 'Slow_D'], 'STOCH', 'hlc', {'fastk_period': 5, 'slowk_period': 3, 'slowk_matype': 0, 'slowd_period': 3, 'slowd_matype': 0}),
+    (['Fast_K', 'Fast_D'], 'STOCHRSI', 'c', {'timeperiod': 14, 'fastk_period': 5, 'fastd_period': 3, 'fastd_matype': 0}),
+    (['ULTOSC 7_14_28'], 'ULTOSC', 'hlc', {'timeperiod1': 7, 'timeperiod2': 14, 'timeperiod3': 28}),
+    (['WILLR 14'], 'WILLR', 'hlc', {'timeperiod': 14}),
+    (['HT_DCPERIOD'], 'HT_DCPERIOD', 'c', {}),
+    (['HT_DCPHASE'], 'HT_DCPHASE', 'c', {}),
+    (['HT_PHASOR_inPhase', 'HT_PHASOR_quadrature'], 'HT_PHASOR', 'c', {}),
+    (['HT_SINE', 'HT_SINE_lead'], 'HT_SINE', 'c', {}),
+    (['HT_TRENDMODE'], 'HT_TRENDMODE', 'c', {}),
+    (['ATR Label'], 'ATR', 'hlc', {'timeperiod': 20}),
+]
 
 class Data:
-    def __init__(self):
-        self.rawTickData = {}
+    def __init__(self, useCache=True, frameCache=None, workers=1):
+        self.workers = workers      # threads computing indicators and candle patterns, TA-Lib releases the GIL
+        self.frameCache = frameCache if frameCache is not None else sharedFrameCache # bounded LRU cache of raw and resampled frames
         self.mt5Path = str(Path.home())+"\AppData\Roaming\MetaQuotes\Terminal\Common\Files\\"
+        self.useCache = useCache    # keep a binary columnar copy of each csv next to it for fast reloads
+        self.stores = {}            # open memory-mapped OHLC stores by path
+
+    def getCachePath(self, csvPath):
+        """
+            Returns the folder holding the columnar cache of a csv file.
+            e.g. ../Data/Minute/EURUSD.csv -> ../Data/Minute/EURUSD.cache/
+        """
+        return os.path.splitext(csvPath)[0] + '.cache/'
+
+    def readCSVCached(self, csvPath):
+        """
+            Reads a price csv indexed by a DateTime column.
+            The first read parses the csv and writes a columnar cache next to it
+            (one .npy file per column, timestamps as int64 nanoseconds, plus a meta.json).
+            Later reads load the .npy files instead of parsing text, the cache is rebuilt
+            whenever the size or modification time of the csv changes.
+
+            Parameters:
+                csvPath (str): path to the csv file.
+
+            Returns:
+                data (DataFrame): the csv data with a DatetimeIndex.
+        """
+        if not self.useCache:
+            return pd.read_csv(csvPath, index_col=['DateTime'], parse_dates=['DateTime'])
+
+        cachePath = self.getCachePath(csvPath)
+        stat = os.stat(csvPath)
+        source = {'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+        # Load the cache if it was built from this exact version of the csv
+        try:
+            with open(cachePath+'meta.json', 'r') as metaFile:
+                meta = json.load(metaFile)
+            if meta['source'] == source:
+                index = pd.DatetimeIndex(np.load(cachePath+'DateTime.npy').view('datetime64[ns]'), name='DateTime')
+                columns = {col: np.load(cachePath+str(i)+'.npy') for i, col in enumerate(meta['columns'])}
+                return pd.DataFrame(columns, index=index)
+        except (OSError, ValueError, KeyError):
+            pass
+
+        data = pd.read_csv(csvPath, index_col=['DateTime'], parse_dates=['DateTime'])
+        self.writeCSVCache(data, cachePath, source)
+        return data
+
+    def writeCSVCache(self, data, cachePath, source):
+        """
+            Writes the columnar cache read by readCSVCached. Only numeric data with a
+            timezone naive DatetimeIndex is cached, anything else is simply re-read from csv.
+            meta.json is written last so a half written cache is never used.
+        """
+        if not isinstance(data.index, pd.DatetimeIndex) or data.index.tz is not None:
+            return
+        if not all(np.issubdtype(dtype, np.number) for dtype in data.dtypes):
+            return
+        try:
+            if not os.path.exists(cachePath):
+                os.makedirs(cachePath)
+            if os.path.exists(cachePath+'meta.json'):
+                os.remove(cachePath+'meta.json')
+            np.save(cachePath+'DateTime.npy', data.index.values.astype('datetime64[ns]').view(np.int64))
+            for i, col in enumerate(data.columns):  # columns saved by position so any column name is a valid file name
+                np.save(cachePath+str(i)+'.npy', data[col].values)
+            with open(cachePath+'meta.json', 'w') as metaFile:
+                json.dump({'source': source, 'columns': list(data.columns)}, metaFile)
+        except OSError:
+            print('Error: Writing csv cache. ' + cachePath)
     
-    def getDataCSV(self, ForexPair, timeFrame, volume_in=False, tickData = False): #TF is either 1H or 1M
+    def getSourceFingerprint(self, ForexPair, tickData=False):
+        """
+            Identifies the csv file a currency pair is read from by its size and modification time,
+            used to tell if data built from it (e.g. training shards) is out of date.
+        """
+        csvPath = '../Data/' + ('Tick/' if tickData else 'Minute/') + ForexPair + '.csv'
+        stat = os.stat(csvPath)
+        return {'path': csvPath, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+    def getDataCSV(self, ForexPair, timeFrame, volume_in=False, tickData = False, chunkSize=None): #TF is either 1H or 1M
         path = '../Data/'
         if tickData: path +='Tick/'
         else: path +='Minute/'
-            
-        if ForexPair not in self.rawTickData.keys():
-            data = pd.read_csv(path+ForexPair+'.csv', index_col=['DateTime'], parse_dates=['DateTime']) 
-            self.rawTickData[ForexPair] = data
-        else:
-            data = self.rawTickData[ForexPair]
 
-        ##Resample data
+        ##Resampled bars are cached so looping over pairs and time frames only resamples once
+        key = (ForexPair, timeFrame, tickData)
+        data = self.frameCache.get(key)
+        if data is None and tickData and chunkSize:
+            ##Tick files larger than RAM are streamed in chunks of ticks
+            data = pd.concat(list(self.streamTickBars(ForexPair, timeFrame, chunkSize, path)))
+            self.frameCache.put(key, data)
+        elif data is None:
+            data = self.resampleRaw(self.getRawData(ForexPair, path, tickData), timeFrame, tickData)
+            self.frameCache.put(key, data)
+
+        ## Rename Columns
+        if volume_in==False:
+            return data.loc[:,['open','high', 'low', 'close']]
+        return data.copy()  # callers add indicators in place so never hand out the cached frame
+
+    def getMultiTimeFrameData(self, ForexPair, timeFrames, volume_in=False, tickData=False):
+        """
+            Builds several time frames of the same currency pair in one pass over the raw data.
+            Only the finest time frame is resampled from the raw minute or tick data, every
+            coarser one is built from the coarsest finer bars it is a whole multiple of
+            (e.g. 1H from 30Min, 1D from 1H) which gives the same bars as resampling the raw data.
+
+            Parameters:
+                ForexPair (str): The currency pair you are trying to read.
+                timeFrames (list): The time frames you want e.g. ['1Min', '5Min', '1H', '1D'].
+
+            Returns:
+                bars (dict): time frame -> DataFrame, as getDataCSV would return it.
+        """
+        path = '../Data/'
+        if tickData: path +='Tick/'
+        else: path +='Minute/'
+
+        built = {}
+        for timeFrame in sorted(set(timeFrames), key=self.timeFrameSortKey):
+            key = (ForexPair, timeFrame, tickData)
+            data = self.frameCache.get(key)
+            if data is None:
+                base = self.getBaseTimeFrame(timeFrame, built)
+                if base is None:
+                    data = self.resampleRaw(self.getRawData(ForexPair, path, tickData), timeFrame, tickData)
+                else:
+                    data = self.resampleBars(built[base], timeFrame)
+                self.frameCache.put(key, data)
+            built[timeFrame] = data
+
+        bars = {}
+        for timeFrame in timeFrames:
+            if volume_in==False:
+                bars[timeFrame] = built[timeFrame].loc[:,['open','high', 'low', 'close']]
+            else:
+                bars[timeFrame] = built[timeFrame].copy()
+        return bars
+
+    def getStore(self, ForexPair, timeFrame, tickData=False):
+        """
+            Returns the memory-mapped OHLCStore of a currency pair and time frame.
+            The store lives in ../Data/Store/ and is built from the csv data the first time.
+        """
+        path = '../Data/Store/'+ForexPair+'_'+timeFrame+('_Tick' if tickData else '')+'.ohlc'
+        if path not in self.stores:
+            if not os.path.exists('../Data/Store/'):
+                os.makedirs('../Data/Store/')
+            store = OHLCStore(path)
+            if len(store) == 0:
+                store.append(self.getDataCSV(ForexPair, timeFrame, True, tickData))
+            self.stores[path] = store
+        return self.stores[path]
+
+    def updateStore(self, ForexPair, timeFrame, tickData=False):
+        """
+            Appends the bars that arrived in the csv since the store was last updated.
+            Only the csv rows from the start of the last stored bar on are read and resampled,
+            that bar is rebuilt with all of its rows since it may have been incomplete when stored.
+            Calendar time frames (weeks, months) have no fixed length and re-read the whole csv.
+
+            Returns:
+                added (int): number of new bars.
+        """
+        store = self.getStore(ForexPair, timeFrame, tickData)
+        self.frameCache.remove((ForexPair, None, tickData))     # the cached frames of the csv are out of date
+        self.frameCache.remove((ForexPair, timeFrame, tickData))
+        lastTime = store.getLastTime()
+        if lastTime is None or self.getTimeFrameLength(timeFrame) is None:
+            return store.append(self.getDataCSV(ForexPair, timeFrame, True, tickData))
+
+        csvPath = '../Data/' + ('Tick/' if tickData else 'Minute/') + ForexPair + '.csv'
+        data = self.readCSVTail(csvPath, lastTime)
+        if len(data) == 0:
+            return 0
+        if not tickData:
+            data.columns= data.columns.str.lower()
+        # bins are anchored at midnight of the first row of the csv, like the bars already stored
+        origin = pd.read_csv(csvPath, nrows=1, index_col=['DateTime'], parse_dates=['DateTime']).index[0].normalize()
+        return store.append(self.resampleRaw(data, timeFrame, tickData, origin))
+
+    def readCSVTail(self, csvPath, since, blockSize=1<<20):
+        """
+            Reads the rows of a csv sorted by its DateTime column from the first row at or after since.
+            The file is searched backwards from its end in blocks, the rows before are never parsed.
+
+            Parameters:
+                csvPath (str): path to the csv file.
+                since: time of the first row wanted.
+                blockSize (int): bytes stepped back at a time.
+
+            Returns:
+                data (DataFrame): the rows with a DatetimeIndex.
+        """
+        since = pd.Timestamp(since)
+        with open(csvPath, 'rb') as csvFile:
+            header = csvFile.readline()
+            column = header.decode().strip().split(',').index('DateTime')
+            first = csvFile.tell()
+            start = first
+            position = csvFile.seek(0, os.SEEK_END)
+            while position > first:
+                position = max(position-blockSize, first)
+                csvFile.seek(position)
+                if position > first:
+                    csvFile.readline()          # the block starts inside a row
+                rowStart = csvFile.tell()
+                row = csvFile.readline()
+                if row.strip() and pd.Timestamp(row.decode().split(',')[column]) < since:
+                    start = rowStart
+                    break
+            csvFile.seek(start)
+            tail = csvFile.read()
+        data = pd.read_csv(io.BytesIO(header+tail), index_col=['DateTime'], parse_dates=['DateTime'])
+        return data[data.index >= since]
+
+    def getDataStore(self, ForexPair, timeFrame, volume_in=False, tickData=False, start=None, end=None):
+        """
+            Returns the bars between start and end (inclusive, None for no limit) from the
+            OHLC store. The range is found with a binary search so no other bars are read.
+            The frame is a read only view of the store, see OHLCStore.getDataFrame.
+        """
+        return self.getStore(ForexPair, timeFrame, tickData).getDataFrame(start, end, volume_in)
+
+    def getTimeFrameLength(self, timeFrame):
+        """
+            Returns the length of a time frame as a Timedelta, or None for calendar
+            frequencies like weeks or months that do not have a fixed length.
+        """
+        try:
+            return pd.Timedelta(timeFrame)
+        except ValueError:
+            return None
+
+    def timeFrameSortKey(self, timeFrame):
+        length = self.getTimeFrameLength(timeFrame)
+        return (length is None, length if length is not None else pd.Timedelta(0))
+
+    def getBaseTimeFrame(self, timeFrame, built):
+        """
+            Returns the coarsest already built time frame that timeFrame can be derived from.
+            Both are anchored at midnight of the first day, so when timeFrame is a whole multiple
+            of the base every bar is made of complete base bars.
+        """
+        length = self.getTimeFrameLength(timeFrame)
+        if length is None:
+            return None
+        base = None
+        for other in built:
+            otherLength = self.getTimeFrameLength(other)
+            if otherLength is not None and otherLength <= length and length % otherLength == pd.Timedelta(0):
+                if base is None or otherLength > self.getTimeFrameLength(base):
+                    base = other
+        return base
+
+    def resampleRaw(self, data, timeFrame, tickData=False, origin='start_day'):
+        """
+            Resamples raw minute or tick data to OHLCV bars, empty bars are dropped.
+            origin anchors the bins like pandas resample, by default at midnight of the first row.
+        """
         if tickData:
-            data = data.resample(timeFrame).agg({'Bid': 'ohlc', 'Volume': 'sum'})
+            data = data.resample(timeFrame, origin=origin).agg({'Bid': 'ohlc', 'Volume': 'sum'})
             data.columns = data.columns.droplevel()
             data.columns= data.columns.str.lower()
-        else:
-            data.columns= data.columns.str.lower()
-            data = data.resample(timeFrame).agg({'open': 'first','high': 'max','low': 'min',
-                                                 'close': 'last', 'volume': 'sum'})
-        data = data.dropna()
-        ## Rename Columns
-        if volume_in==False:
-            data = data.loc[:,['open','high', 'low', 'close']]
+            return data.dropna()
+        return self.resampleBars(data, timeFrame, origin)
+
+    def resampleBars(self, data, timeFrame, origin='start_day'):
+        """
+            Resamples OHLCV bars to a coarser time frame, empty bars are dropped.
+        """
+        data = data.resample(timeFrame, origin=origin).agg({'open': 'first','high': 'max','low': 'min',
+                                             'close': 'last', 'volume': 'sum'})
+        return data.dropna()
+
+    def streamTickBars(self, ForexPair, timeFrame, chunkSize=1000000, path='../Data/Tick/'):
+        """
+            Resamples a tick csv to OHLCV bars without loading the whole file.
+            The csv is read chunkSize ticks at a time, the last bar of each chunk is held back
+            and merged with the first bar of the next chunk when the bar straddles the boundary,
+            so memory is bounded by the chunk size and the bars match getDataCSV exactly.
+
+            Parameters:
+                ForexPair (str): The currency pair you are trying to read.
+                timeFrame (str): The time frame you want to resample your data to.
+                chunkSize (int): Number of ticks read at a time.
+                path (str): Folder of the tick csv files.
+
+            Yields:
+                bars (DataFrame): Completed bars with open, high, low, close and volume columns.
+        """
+        origin = None   # bins are anchored like resample's default, at midnight of the first tick
+        carry = None    # last bar of the previous chunk, it may continue in the next chunk
+        chunks = pd.read_csv(path+ForexPair+'.csv', index_col=['DateTime'], parse_dates=['DateTime'],
+                             usecols=['DateTime', 'Bid', 'Volume'], chunksize=chunkSize)
+        for chunk in chunks:
+            if origin is None:
+                origin = chunk.index[0].normalize()
+            bars = chunk.resample(timeFrame, origin=origin).agg({'Bid': 'ohlc', 'Volume': 'sum'})
+            bars.columns = bars.columns.droplevel()
+            bars.columns= bars.columns.str.lower()
+            bars = bars.dropna()
+            if len(bars) == 0:
+                continue
+
+            if carry is not None:
+                if carry.index[0] == bars.index[0]:
+                    # Same bar on both sides of the chunk boundary
+                    first = bars.iloc[0]
+                    bars.iloc[0] = [carry.open.iloc[0], max(carry.high.iloc[0], first.high), min(carry.low.iloc[0], first.low),
+                                    first.close, carry.volume.iloc[0] + first.volume]
+                else:
+                    yield carry
+            carry = bars.iloc[-1:]
+            if len(bars) > 1:
+                yield bars.iloc[:-1]
+
+        if carry is not None:
+            yield carry
+
+    def writeTickBars(self, ForexPair, timeFrame, outPath, chunkSize=1000000, path='../Data/Tick/'):
+        """
+            Streams the bars of a tick csv straight to another csv with bounded memory.
+
+            Returns:
+                rows (int): number of bars written.
+        """
+        rows = 0
+        header = True
+        for bars in self.streamTickBars(ForexPair, timeFrame, chunkSize, path):
+            bars.to_csv(outPath, mode='w' if header else 'a', header=header, index_label='DateTime')
+            header = False
+            rows += len(bars)
+        return rows
+
+    def getRawData(self, ForexPair, path, tickData=False):
+        """
+            Returns the raw minute or tick data of a currency pair, through the frame cache.
+        """
+        key = (ForexPair, None, tickData)
+        data = self.frameCache.get(key)
+        if data is None:
+            data = self.readCSVCached(path+ForexPair+'.csv')
+            if not tickData:
+                data.columns= data.columns.str.lower()
+            self.frameCache.put(key, data)
         return data
+
+    def getCacheStats(self):
+        """
+            Returns the hit, miss, eviction and memory counters of the frame cache.
+        """
+        return self.frameCache.getStats()
       
     def getBackTestData(self, ForexPair, volume_in=False):
         csvFileName = 'BackTestData.csv'
@@ -48,7 +498,43 @@ class Data:
         except:
             pass
         return pd.DataFrame([])
-        
+
+    def getBackTestLastTime(self, tailBytes=256):
+        """
+            Returns the DateTime field of the last bar of BackTestData.csv, read from the end of the
+            UTF-16 file without parsing it, so a new bar can be detected without reading the whole file.
+
+            Parameters:
+                tailBytes (int): bytes read from the end of the file first, more are read if the last line is longer.
+
+            Returns:
+                lastTime (str): the DateTime text of the last bar, None if the file does not exist, has no bars
+                                or its last line is not complete yet (the EA is still writing it).
+        """
+        path = self.mt5Path + 'BackTestData.csv'
+        try:
+            with open(path, 'rb') as dataFile:
+                size = dataFile.seek(0, os.SEEK_END)
+                dataFile.seek(0)
+                bom = dataFile.read(2)
+                encoding = 'utf-16-be' if bom == b'\xfe\xff' else 'utf-16-le'
+                first = 2 if bom in (b'\xff\xfe', b'\xfe\xff') else 0
+                if (size - first) % 2:
+                    return None
+                while True:
+                    start = max(size - tailBytes, first)
+                    start += (start - first) % 2        # start on a whole UTF-16 code unit
+                    dataFile.seek(start)
+                    text = dataFile.read(size - start).decode(encoding, errors='replace')
+                    lines = text.rstrip('\r\n').rsplit('\n', 1)
+                    if len(lines) == 2 or start == first:
+                        break
+                    tailBytes *= 4
+        except OSError:
+            return None
+        if not text.endswith('\n') or len(lines) < 2:
+            return None
+        return lines[-1].split('\t', 1)[0].strip()
     
     def BBANDS(self, data, value=5, deviation=2):
         n = ['BBANDS UB '+str(value)+'_'+str(deviation), 'BBANDS '+str(value)+'_'+str(deviation), 'BBANDS Lb '+str(value)+'_'+str(deviation)]
@@ -170,29 +656,104 @@ class Data:
     def ATRLabel(self, data):
         data['ATR Label'] = talib.ATR(data.high.values, data.low.values, data.close.values, timeperiod=20)
 
+    def getIndicatorMatrix(self, openVal, high, low, close, registry=indicatorRegistry, out=None, features=None):
+        """
+            Computes every indicator of the registry straight into the columns of one
+            preallocated float array, instead of adding them to a DataFrame one by one.
+
+            Parameters:
+                openVal, high, low, close (array): float64 price arrays.
+                registry (list): indicators to compute, see indicatorRegistry.
+                out (array): optional (bars x columns) array to write into.
+                features (list): optional column names to keep, indicators with none
+                                 of their outputs in features are not computed at all.
+
+            Returns:
+                matrix (array): one column per indicator output.
+                names (list): the column names.
+        """
+        prices = {'o': openVal, 'h': high, 'l': low, 'c': close}
+        names = self.getIndicatorNames(registry, features)
+        if out is None:
+            out = np.empty((len(close), len(names)), dtype=np.float64)
+
+        def compute(col, function, inputs, parameters, keep):
+            outputs = getattr(talib, function)(*[prices[name] for name in inputs], **parameters)
+            if not isinstance(outputs, tuple):
+                outputs = (outputs,)
+            for output, isKept in zip(outputs, keep):
+                if isKept:
+                    out[:, col] = output
+                    col += 1
+
+        # every indicator writes its own columns so the result does not depend on the number of workers
+        tasks = []
+        col = 0
+        for columns, function, inputs, parameters in registry:
+            keep = [features is None or name in features for name in columns]
+            if any(keep):
+                tasks.append((col, function, inputs, parameters, keep))
+                col += sum(keep)
+        self.runTasks(compute, tasks)
+        return out, names
+
+    def getIndicatorNames(self, registry=indicatorRegistry, features=None):
+        """
+            Returns the column names getIndicatorMatrix computes, only the ones in features if given.
+        """
+        return [name for columns, _, _, _ in registry for name in columns if features is None or name in features]
+
+    def runTasks(self, function, tasks):
+        """
+            Calls function(*task) for every task, on a pool of self.workers threads when workers > 1.
+        """
+        if self.workers <= 1:
+            for task in tasks:
+                function(*task)
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(function, *task) for task in tasks]:
+                future.result()     # re-raise any exception of the task
+
+    def getCandlePatternCodes(self, openVal, high, low, close, blockSize=1000000):
+        """
+            Returns the encoded best candle pattern of every bar, see candlePatterns.
+            The signals of the 56 patterns are kept as one int8 matrix, each signal is mapped
+            to its rank in candle_rankings and the best ranked pattern of every bar is found
+            with argmin (ties go to the first pattern, like singleColumn).
+            The codes are the same as singleColumn's: 0 no pattern, index+1 bull, index+2 bear.
+
+            Parameters:
+                openVal, high, low, close (array): float64 price arrays.
+                blockSize (int): rows ranked at a time to bound memory.
+
+            Returns:
+                codes (array): int64 pattern code of every bar.
+        """
+        n = len(close)
+        signals = np.empty((n, len(candleNames)), dtype=np.int8)  # -1 bear, 0 no pattern, 1 bull
+
+        def compute(j, candle):
+            signals[:, j] = np.sign(getattr(talib, candle)(openVal, high, low, close))
+        self.runTasks(compute, list(enumerate(candleNames)))
+
+        codes = np.zeros(n, dtype=np.int64)
+        for start in range(0, n, blockSize):
+            codes[start:start+blockSize] = encodeCandleSignals(signals[start:start+blockSize])
+        return codes
+
     ## This function was taken from https://github.com/CanerIrfanoglu/medium/blob/master/candle_stick_recognition/identify_candlestick.py
     ## Heavy it was also heavily modified to increase its efficiency and running time on large datasets.
     ## The previous version took 5 hours to run on 6,666,612 data points,
     ## This version takes 217 seconds to do the same thing.
+    ## The encoding is now vectorized in getCandlePatternCodes and takes a few seconds.
     def candlePatterns(self, df):
         """
         Recognizes candlestick patterns and appends 2 additional columns to df;
         1st - Best Performance candlestick pattern matched by www.thepatternsite.com
         2nd - # of matched patterns
         """
-        candle_names = talib.get_function_groups()['Pattern Recognition']
-
-        # patterns not found in the patternsite.com
-        exclude_items = ('CDLCOUNTERATTACK', 'CDLLONGLINE', 'CDLSHORTLINE', 'CDLSTALLEDPATTERN', 'CDLKICKINGBYLENGTH')
-        candle_names = [candle for candle in candle_names if candle not in exclude_items]
-
-        # create columns for each candle
-        patternDF = pd.DataFrame(index=df.index)
-        for candle in candle_names:
-            patternDF[candle] = getattr(talib, candle)(df.open.values, df.high.values, df.low.values, df.close.values)
-        
-        #df['pattern_name'] = patternDF.apply (lambda row: singleColumn(row, patternDF.columns), axis=1)
-        df["pattern_name_encoded"] = patternDF.apply (lambda row: singleColumn(row, patternDF.columns,True), axis=1)
+        df["pattern_name_encoded"] = self.getCandlePatternCodes(df.open.values, df.high.values, df.low.values, df.close.values)
 
 def singleColumn(row, column_names, isNumber=False):
     indexesNonZeroColumns = np.flatnonzero(row.values)
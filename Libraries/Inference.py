@@ -0,0 +1,180 @@
+##Import libraries
+import numpy as np
+##The TFLite backend runs on the small tflite_runtime package when it is installed, TensorFlow is not imported
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    Interpreter = None
+
+class InferenceSession:
+    def __init__(self, model, dtype=np.float32):
+        """
+            Predicts one window at a time with a Keras model without the per call overhead of model.predict
+            (which builds a data adapter and prediction loop every call).
+            The forward pass is traced once as a tf.function with a fixed (1, lookBack, features)
+            input signature and run once on zeros when the session is created, so the graph
+            building cost is paid at load time and not on the first bar.
+
+            Parameters:
+                model (Model): the Keras model.
+                dtype: float type of the windows passed to predict.
+        """
+        import tensorflow as tf
+        self.model = model
+        self.dtype = dtype
+        self.lookBack, self.features = model.input_shape[1:]
+        self.function = tf.function(lambda x: model(x, training=False),
+                                    input_signature=[tf.TensorSpec((1, self.lookBack, self.features), tf.as_dtype(dtype))])
+        self.predict(np.zeros((self.lookBack, self.features), dtype=dtype))   # Warm up
+
+    def predict(self, x):
+        """
+            Returns the class probabilities of one window.
+
+            Parameters:
+                x (array): window with shape (lookBack, features).
+
+            Returns:
+                prediction (array): probability of every class.
+        """
+        return self.function(np.asarray(x, dtype=self.dtype)[np.newaxis]).numpy()[0]
+
+class TFLiteSession:
+    def __init__(self, path, threads=1):
+        """
+            Predicts one window at a time with a model exported by ExportModels.py,
+            on the TFLite interpreter instead of TensorFlow and Keras.
+            Has the same predict as InferenceSession.
+
+            Parameters:
+                path (str): the .tflite file.
+                threads (int): number of threads of the interpreter.
+        """
+        if Interpreter is None:
+            import tensorflow as tf
+            self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=threads)
+        else:
+            self.interpreter = Interpreter(model_path=path, num_threads=threads)
+        self.interpreter.allocate_tensors()
+        modelInput = self.interpreter.get_input_details()[0]
+        self.inputIndex = modelInput['index']
+        self.dtype = modelInput['dtype']
+        self.lookBack, self.features = modelInput['shape'][1:]
+        self.outputIndex = self.interpreter.get_output_details()[0]['index']
+        self.predict(np.zeros((self.lookBack, self.features), dtype=self.dtype))   # Warm up
+
+    def predict(self, x):
+        """
+            Returns the class probabilities of one window.
+
+            Parameters:
+                x (array): window with shape (lookBack, features).
+
+            Returns:
+                prediction (array): probability of every class.
+        """
+        self.interpreter.reset_all_variables()     # the converted LSTM layers keep their state between calls
+        self.interpreter.set_tensor(self.inputIndex, np.asarray(x, dtype=self.dtype)[np.newaxis])
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.outputIndex)[0]
+
+def getArchitecture(model):
+    """
+        Returns what identifies the architecture of a Keras model, the input shape and the type and
+        output shape of every layer. Models trained by the same code share it whatever their weights.
+    """
+    return (tuple(model.input_shape[1:]),) + tuple((layer.__class__.__name__, str(layer.output_shape)) for layer in model.layers)
+
+class BatchSession:
+    def __init__(self, models, dtype=np.float32):
+        """
+            Predicts the windows of several Keras models with the same architecture in one call.
+            The weights of every layer are stacked over the models, every window gathers the weights of
+            its model and all the windows run through the layers together as batched matrix products,
+            the LSTM steps unrolled in the graph, so a batch of windows of many models costs about one
+            prediction instead of one per window. Models with layers other than LSTM, Dense and Dropout
+            are run one after the other on their part of the batch in the same call instead.
+            The batch size is not part of the input signature so the function is traced once.
+
+            Parameters:
+                models (list): the Keras models, see getArchitecture.
+                dtype: float type of the windows passed to predict.
+        """
+        import tensorflow as tf
+        self.models = list(models)
+        self.dtype = dtype
+        self.lookBack, self.features = self.models[0].input_shape[1:]
+        self.layers = self.getStackedLayers()
+        windows = tf.TensorSpec((None, self.lookBack, self.features), tf.as_dtype(dtype))
+        if self.layers is None:
+            self.function = tf.function(self.runSplit, input_signature=[windows, tf.TensorSpec((len(self.models),), tf.int32)])
+        else:
+            self.function = tf.function(self.runStacked, input_signature=[windows, tf.TensorSpec((None,), tf.int32)])
+        self.predict(np.zeros((len(self.models), self.lookBack, self.features), dtype=dtype), range(len(self.models)))   # Warm up
+
+    def getStackedLayers(self):
+        """
+            Returns (layer, stacked weights) of every layer but the dropouts, None if a layer cannot be stacked.
+        """
+        import tensorflow as tf
+        layers = []
+        for position, layer in enumerate(self.models[0].layers):
+            if isinstance(layer, tf.keras.layers.Dropout):
+                continue
+            if isinstance(layer, tf.keras.layers.LSTM):
+                if layer.go_backwards or layer.stateful or not layer.use_bias:
+                    return None
+            elif not isinstance(layer, tf.keras.layers.Dense):
+                return None
+            weights = [model.layers[position].get_weights() for model in self.models]
+            layers.append((layer, [tf.constant(np.stack(weight).astype(self.dtype)) for weight in zip(*weights)]))
+        return layers
+
+    def runStacked(self, x, positions):
+        import tensorflow as tf
+        for layer, weights in self.layers:
+            weights = [tf.gather(weight, positions) for weight in weights]
+            if isinstance(layer, tf.keras.layers.LSTM):
+                kernel, recurrent, bias = weights
+                inputs = tf.einsum('ntf,nfg->ntg', x, kernel) + bias[:, tf.newaxis]
+                h = c = tf.zeros_like(inputs[:, 0, :layer.units])
+                outputs = []
+                for step in range(self.lookBack):
+                    gates = tf.split(inputs[:, step] + tf.einsum('nu,nug->ng', h, recurrent), 4, axis=-1)    # input, forget, cell, output
+                    c = layer.recurrent_activation(gates[1])*c + layer.recurrent_activation(gates[0])*layer.activation(gates[2])
+                    h = layer.recurrent_activation(gates[3])*layer.activation(c)
+                    outputs.append(h)
+                x = tf.stack(outputs, axis=1) if layer.return_sequences else h
+            else:
+                x = tf.einsum('n...f,nfg->n...g', x, weights[0])
+                if layer.use_bias:
+                    x += tf.reshape(weights[1], [-1] + [1]*(len(x.shape) - 2) + [weights[1].shape[-1]])
+                x = layer.activation(x)
+        return x
+
+    def runSplit(self, x, sizes):
+        import tensorflow as tf
+        parts = tf.split(x, sizes, num=len(self.models))
+        return tf.concat([model(part, training=False) for model, part in zip(self.models, parts)], axis=0)
+
+    def predict(self, windows, models):
+        """
+            Returns the class probabilities of a batch of windows.
+
+            Parameters:
+                windows (array): windows with shape (n, lookBack, features).
+                models (array): position in the models list of the model of every window.
+
+            Returns:
+                predictions (array): probability of every class for every window, in the order of windows.
+        """
+        windows = np.asarray(windows, dtype=self.dtype)
+        models = np.asarray(models, dtype=np.int32)
+        if self.layers is not None:
+            return self.function(windows, models).numpy()
+        order = np.argsort(models, kind='stable')
+        sizes = np.bincount(models, minlength=len(self.models)).astype(np.int32)
+        output = self.function(windows[order], sizes).numpy()
+        predictions = np.empty_like(output)
+        predictions[order] = output
+        return predictions
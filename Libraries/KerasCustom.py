@@ -1,5 +1,7 @@
 import tensorflow.keras.backend as K
 import tensorflow as tf
+import numpy as np
+import os, time
 
 def winMetric(acc_dir_train, acc_dir_test, threshold=0.6):
     m = tf.keras.metrics.Accuracy()
@@ -53,4 +55,143 @@ def TradeFrequency(acc_dir_train, acc_dir_test, threshold=0.6):
         return tf.size(trades_predicted)
    
     # Return a function
-    return NoTradesInBatch
\ No newline at end of file
+    return NoTradesInBatch
+
+class WindowPipeline:
+    def __init__(self, dataset, batchSize=64, parallelCalls=None, prefetch=tf.data.AUTOTUNE):
+        """
+            A tf.data input pipeline that produces the training batches of a WindowDataset on the fly.
+            Every epoch draws new shuffled (and balanced) sample positions with dataset.epochIndices,
+            the batches of positions are copied out of the window views by parallel map calls and
+            prefetched while the model trains, so the windows are never materialized as a whole.
+            The time spent producing batches and the moment each batch of the epoch is ready are
+            recorded for the ThroughputCallback.
+
+            Parameters:
+                dataset (WindowDataset): the training samples.
+                batchSize (int): number of samples in a batch.
+                parallelCalls (int): number of batches produced at once, by default the number of cpus.
+                prefetch (int): number of batches produced ahead of the model.
+        """
+        self.dataset = dataset
+        self.batchSize = batchSize
+        self.parallelCalls = parallelCalls or os.cpu_count()
+        self.prefetch = prefetch
+        self.loadTime = 0       # seconds spent producing batches, summed over the parallel calls
+        self.loadCount = 0      # number of batches produced
+        self.readyTimes = []    # perf_counter time at which each batch of the current epoch was ready
+        self.epochSize = len(dataset.epochIndices())   # balancing draws the same number of samples every epoch
+
+    def __len__(self):
+        """
+            Number of batches in one epoch.
+        """
+        return -(-self.epochSize//self.batchSize)
+
+    def epochBatches(self):
+        self.readyTimes = []
+        indices = self.dataset.epochIndices()
+        for start in range(0, len(indices), self.batchSize):
+            yield indices[start:start+self.batchSize]
+
+    def loadBatch(self, indices):
+        start = time.perf_counter()
+        x, y, _ = self.dataset.getBatch(indices)
+        oneHot = np.zeros((len(y), 3), dtype=np.float32)
+        oneHot[np.arange(len(y)), y] = 1
+        end = time.perf_counter()
+        self.loadTime += end - start
+        self.loadCount += 1
+        self.readyTimes.append(end)
+        return x, oneHot
+
+    def getDataset(self):
+        """
+            Returns the tf.data.Dataset of (windows, one hot labels) batches to pass to model.fit.
+        """
+        lookBack, features = self.dataset.shape[1:]
+        xType = tf.as_dtype(self.dataset.dtype)
+
+        def load(indices):
+            x, y = tf.numpy_function(self.loadBatch, [indices], [xType, tf.float32])
+            x.set_shape((None, lookBack, features))
+            y.set_shape((None, 3))
+            return x, y
+
+        pipeline = tf.data.Dataset.from_generator(self.epochBatches, output_signature=tf.TensorSpec((None,), tf.int64))
+        pipeline = pipeline.apply(tf.data.experimental.assert_cardinality(len(self)))
+        pipeline = pipeline.map(load, num_parallel_calls=self.parallelCalls, deterministic=False)
+        return pipeline.prefetch(self.prefetch)
+
+    def measure(self, batches=100):
+        """
+            Runs the pipeline alone for a number of batches.
+
+            Returns:
+                (float): samples per second the pipeline can feed.
+        """
+        start = time.perf_counter()
+        samples = 0
+        for x, _ in self.getDataset().take(batches):
+            samples += x.shape[0]
+        return samples/(time.perf_counter() - start)
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    def __init__(self, pipeline=None, verbose=1):
+        """
+            Reports the training throughput of every epoch: samples per second, time per step and,
+            given the WindowPipeline feeding the model, the time spent producing the input batches
+            and the time the training steps actually waited for them. The k-th step takes the k-th
+            batch that was ready, so its wait is how long after the step began that batch was done.
+            If the steps spent more time waiting for batches than computing, the data feed is the
+            bottleneck, otherwise the model is.
+
+            Parameters:
+                pipeline (WindowPipeline): the input pipeline of model.fit, optional.
+                verbose (int): print the report at the end of every epoch.
+        """
+        super().__init__()
+        self.pipeline = pipeline
+        self.verbose = verbose
+        self.history = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epochStart = time.perf_counter()
+        self.steps = 0
+        self.stepTime = 0
+        self.stepStarts = []
+        if self.pipeline != None:
+            self.loadTime, self.loadCount = self.pipeline.loadTime, self.pipeline.loadCount
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self.stepStart = time.perf_counter()
+        self.stepStarts.append(self.stepStart)
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.stepTime += time.perf_counter() - self.stepStart
+        self.steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.perf_counter() - self.epochStart
+        if self.pipeline != None:
+            samples = min(self.steps*self.pipeline.batchSize, self.pipeline.epochSize)
+        else:
+            samples = self.steps*(self.params.get('batch_size') or 32)
+        report = {'samples/sec': samples/elapsed, 'step time': self.stepTime/max(self.steps, 1)}
+        if self.pipeline != None:
+            batches = self.pipeline.loadCount - self.loadCount
+            loadTime = (self.pipeline.loadTime - self.loadTime)/max(batches, 1)
+            # The first step of training also traces the train function before it asks for a batch
+            skip = 0 if self.history else 1
+            pairs = list(zip(sorted(self.pipeline.readyTimes), self.stepStarts))[skip:]
+            inputWait = sum(max(ready - start, 0) for ready, start in pairs)/max(len(pairs), 1)
+            report['load time'] = loadTime
+            report['input wait'] = inputWait
+            report['input bound'] = inputWait > report['step time'] - inputWait
+        self.history.append(report)
+        if self.verbose:
+            text = "Throughput: %.0f samples/sec, %.1f ms per step" % (report['samples/sec'], report['step time']*1000)
+            if self.pipeline != None:
+                text += ", %.1f ms to load a batch, %.1f ms waiting for it (%s bound)" % (
+                    loadTime*1000, inputWait*1000, "input" if report['input bound'] else "model")
+            print(text)
@@ -0,0 +1,131 @@
+##Import libraries
+import numpy as np
+import pandas as pd
+import os
+
+##Every bar is stored as one fixed width record, timestamps are int64 nanoseconds
+recordType = np.dtype([('DateTime', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                       ('close', '<f8'), ('volume', '<f8')])
+
+class OHLCStore:
+    def __init__(self, path):
+        """
+            A persistent store of OHLCV bars for one currency pair and time frame.
+            The bars are fixed width records in a binary file which is memory-mapped,
+            so reading the whole history or any date range gives NumPy views of the file
+            without copying or parsing. New bars are appended to the end of the file.
+
+            Parameters:
+                path (str): path to the store file, it is created on the first append.
+        """
+        self.path = path
+        self.records = None
+        self.map()
+
+    def map(self):
+        """
+            Memory maps the store file (read only).
+        """
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        length = size//recordType.itemsize
+        if length == 0:
+            self.records = np.empty(0, dtype=recordType)
+        else:
+            self.records = np.memmap(self.path, dtype=recordType, mode='r', shape=(length,))
+
+    def unmap(self):
+        """
+            Drops the memory map before the file grows, map() is called again after the write.
+            The old map is not closed here: frames from getDataFrame may still be views of it,
+            it is released once the last of them is gone.
+        """
+        self.records = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def getLastTime(self):
+        """
+            Returns the timestamp of the last stored bar or None if the store is empty.
+        """
+        if len(self.records) == 0:
+            return None
+        return pd.Timestamp(int(self.records['DateTime'][-1]))
+
+    def append(self, data):
+        """
+            Appends the bars of data that are newer than the last stored bar.
+            If data contains the last stored bar again (it may have been incomplete when
+            stored) that one record is overwritten, the rest of the history is never rewritten.
+
+            Parameters:
+                data (DataFrame): bars indexed by DateTime with open, high, low, close and optionally volume.
+
+            Returns:
+                added (int): number of new bars appended.
+        """
+        times = data.index.values.astype('datetime64[ns]').view(np.int64)
+        last = int(self.records['DateTime'][-1]) if len(self.records) else None
+        start = 0 if last is None else int(np.searchsorted(times, last, side='left'))
+        if start == len(times):
+            return 0
+
+        new = np.zeros(len(times)-start, dtype=recordType)
+        new['DateTime'] = times[start:]
+        for col in ['open', 'high', 'low', 'close']:
+            new[col] = data[col].values[start:]
+        if 'volume' in data.columns:
+            new['volume'] = data['volume'].values[start:]
+
+        length = len(self.records)
+        self.unmap()
+        if last is not None and new['DateTime'][0] == last:
+            # Refresh the last stored bar then append the rest
+            with open(self.path, 'r+b') as storeFile:
+                storeFile.seek((length-1)*recordType.itemsize)
+                storeFile.write(new.tobytes())
+            added = len(new)-1
+        else:
+            with open(self.path, 'ab') as storeFile:
+                storeFile.write(new.tobytes())
+            added = len(new)
+        self.map()
+        return added
+
+    def getSlice(self, start=None, end=None):
+        """
+            Returns the record positions of a date range with a binary search on the timestamps.
+
+            Parameters:
+                start: first time included, None for the beginning of the store.
+                end: last time included, None for the end of the store.
+
+            Returns:
+                (slice): positions of the bars in the range.
+        """
+        times = self.records['DateTime']
+        first = 0 if start is None else int(np.searchsorted(times, pd.Timestamp(start).value, side='left'))
+        last = len(times) if end is None else int(np.searchsorted(times, pd.Timestamp(end).value, side='right'))
+        return slice(first, last)
+
+    def getRecords(self, start=None, end=None):
+        """
+            Returns a zero-copy view of the records in a date range, each field
+            (e.g. getRecords()['close']) is also a view of the mapped file.
+        """
+        return self.records[self.getSlice(start, end)]
+
+    def getDataFrame(self, start=None, end=None, volume_in=False):
+        """
+            Returns the bars in a date range as a DataFrame like Data.getDataCSV does.
+            The price columns are a view of the mapped file, nothing is copied. The frame is
+            read only: writing to its values raises a ValueError, take a copy() to modify them.
+            Adding columns (e.g. indicators) is fine, new columns get their own memory.
+        """
+        records = self.getRecords(start, end)
+        index = pd.DatetimeIndex(records['DateTime'].view('datetime64[ns]'), name='DateTime')
+        cols = ['open', 'high', 'low', 'close', 'volume'] if volume_in else ['open', 'high', 'low', 'close']
+        # every field is 8 bytes so the records are a (bars, 6) float64 matrix, column 0 holds the timestamps
+        values = records.view(np.float64).reshape(len(records), len(recordType.names))[:, 1:1+len(cols)]
+        values.flags.writeable = False
+        return pd.DataFrame(values, index=index, columns=cols, copy=False)
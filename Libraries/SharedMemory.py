@@ -0,0 +1,258 @@
+##Import libraries
+import numpy as np
+import pandas as pd
+import os, mmap, time
+
+##Binary layout of the shared ring, little endian, shared with the EA
+##Header, 64 bytes:
+##  0 magic u32, 4 version u16, 6 recordSize u16, 8 capacity u32, 12 ready u32 (Python is ready),
+##  16 done u32 (EA is done), 20 response i32 (direction), 24 writeSeq u64 (bars written),
+##  32 requestSeq u64 (bar the EA wants a direction for), 40 responseSeq u64 (bar the direction is for)
+##Record i of the ring, 56 bytes at 64 + i*56, holds bar seq-1 with seq = i + k*capacity + 1:
+##  0 seq u64 (written last), 8 time i64 (seconds since 1970), 16 open, 24 high, 32 low, 40 close, 48 volume f64
+ringMagic = 0x41455a4c    # "LZEA"
+ringVersion = 1
+headerDtype = np.dtype({'names': ['magic', 'version', 'recordSize', 'capacity', 'ready', 'done', 'response',
+                                  'writeSeq', 'requestSeq', 'responseSeq'],
+                        'formats': ['<u4', '<u2', '<u2', '<u4', '<u4', '<u4', '<i4', '<u8', '<u8', '<u8'],
+                        'offsets': [0, 4, 6, 8, 12, 16, 20, 24, 32, 40], 'itemsize': 64})
+recordDtype = np.dtype([('seq', '<u8'), ('time', '<i8'), ('open', '<f8'), ('high', '<f8'),
+                        ('low', '<f8'), ('close', '<f8'), ('volume', '<f8')])
+##Columns of the bars handed to the model, the same as BackTestData.csv, the volume is kept in the records only
+barColumns = ['open', 'high', 'low', 'close']
+
+def getRecordArrays(records):
+    """
+        Returns the bar times (int64 nanoseconds) and the open, high, low, close matrix of ring records.
+    """
+    bars = np.empty((len(records), len(barColumns)))
+    for position, column in enumerate(barColumns):
+        bars[:, position] = records[column]
+    return records['time'].astype(np.int64)*10**9, bars
+
+class SharedBarRing:
+    def __init__(self, path, capacity=1024, create=False, spin=None, maxInterval=0.01):
+        """
+            Binary transport between the MT5 EA and Python over a memory-mapped file, replacing
+            BackTestData.csv and Strat.txt. The EA writes every new bar once as a fixed size record
+            in a ring, then asks for a direction by setting requestSeq to the number of bars written.
+            Python answers in the response slot and sets responseSeq to the same number.
+            No file is opened or parsed per bar, a round trip costs a few memory reads and writes
+            plus the wake up time of the waiting side.
+            Every record carries its sequence number, written after the bar, so a reader detects a
+            record the EA overwrote while it was read or that was never written.
+
+            Parameters:
+                path (str): the shared file.
+                capacity (int): bars kept in the ring, only used when creating it.
+                create (bool): create the file with an empty ring (Python side), otherwise open the existing one (EA side).
+                spin (float): seconds a wait checks the header without sleeping, for answers that arrive within microseconds,
+                              by default 200 microseconds with more than one CPU and none with one (the spin would
+                              hold the CPU the other side needs to answer).
+                maxInterval (float): longest sleep between two checks of a wait, the sleep doubles from 10 microseconds.
+        """
+        self.path = path
+        self.capacity = capacity
+        self.spin = spin if spin != None else (0.0002 if (os.cpu_count() or 1) > 1 else 0.0)
+        self.maxInterval = maxInterval
+        if create:
+            with open(path, 'wb') as ringFile:
+                ringFile.truncate(headerDtype.itemsize + capacity*recordDtype.itemsize)
+        self.file = open(path, 'r+b')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        except (ValueError, OSError):
+            self.map = None
+        if self.map is None or len(self.map) < headerDtype.itemsize:
+            self.file.close()
+            raise ValueError("Not a shared bar ring: "+path)
+        self.header = np.ndarray((), headerDtype, buffer=self.map)
+        if create:
+            self.header['capacity'] = capacity
+            self.header['recordSize'] = recordDtype.itemsize
+            self.header['version'] = ringVersion
+            self.header['magic'] = ringMagic
+        elif (self.header['magic'] != ringMagic or self.header['version'] != ringVersion
+              or len(self.map) < headerDtype.itemsize + self.header['capacity']*recordDtype.itemsize):
+            self.close()
+            raise ValueError("Not a shared bar ring: "+path)
+        self.capacity = int(self.header['capacity'])
+        self.records = np.ndarray((self.capacity,), recordDtype, buffer=self.map, offset=headerDtype.itemsize)
+        self.requests = 0       # requests answered (Python side) or sent (EA side)
+        self.wakeups = 0        # sleeps of the waits
+        self.overruns = 0       # reads of bars the EA already overwrote
+
+    def waitFor(self, condition, timeout=None):
+        """
+            Checks condition() without sleeping for spin seconds, then with sleeps doubling up to maxInterval.
+            Returns true if the condition was met, false on timeout.
+        """
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.spin:
+            if condition():
+                return True
+        sleep = 0.00001
+        while not condition():
+            if timeout != None and time.perf_counter() - start >= timeout:
+                return False
+            time.sleep(sleep)
+            self.wakeups += 1
+            sleep = min(sleep*2, self.maxInterval)
+        return True
+
+    #### Python side ####
+    def setReady(self, ready=True):
+        self.header['ready'] = int(ready)
+
+    def isDone(self):
+        return bool(self.header['done'])
+
+    def getWriteSeq(self):
+        return int(self.header['writeSeq'])
+
+    def waitRequest(self, timeout=None):
+        """
+            Waits for the EA to ask for a direction.
+
+            Returns:
+                seq (int): number of bars written when the EA asked, None on timeout or when the EA is done.
+        """
+        if not self.waitFor(lambda: self.header['requestSeq'] != self.header['responseSeq'] or self.header['done'], timeout):
+            return None
+        seq = int(self.header['requestSeq'])
+        return None if seq == self.header['responseSeq'] else seq
+
+    def respond(self, seq, direction):
+        """
+            Answers request seq with a direction (0, 1 or 2).
+        """
+        self.header['response'] = int(direction)
+        self.header['responseSeq'] = seq      # written last, the EA reads the response after seeing it
+        self.requests += 1
+
+    def getRecords(self, start, end):
+        """
+            Copies the records of bars start to end-1 (0 is the first bar the EA wrote).
+
+            Returns:
+                records (array): the records, None if some were overwritten by the EA (more than capacity bars behind).
+        """
+        if end - start > self.capacity or start < 0:
+            self.overruns += 1
+            return None
+        slots = np.arange(start, end) % self.capacity
+        records = self.records[slots]
+        expected = np.arange(start + 1, end + 1, dtype=np.uint64)
+        # the sequence numbers are checked again after the copy, a record the EA rewrote during the copy has changed
+        if not ((records['seq'] == expected).all() and (self.records['seq'][slots] == expected).all()):
+            self.overruns += 1
+            return None
+        return records
+
+    def getBars(self, end=None, count=None):
+        """
+            Returns the last bars before bar number end as a DataFrame like DataHandler.getFullData.
+
+            Parameters:
+                end (int): number of bars written, e.g. the seq of a request, by default all bars written.
+                count (int): number of bars, by default all bars still in the ring.
+
+            Returns:
+                StockData (DataFrame): bars indexed by DateTime, None if they were overwritten.
+        """
+        end = self.getWriteSeq() if end == None else end
+        count = min(end, self.capacity) if count == None else min(count, end)
+        records = self.getRecords(end - count, end)
+        if records is None:
+            return None
+        times, bars = getRecordArrays(records)
+        return pd.DataFrame(bars, index=pd.DatetimeIndex(times.astype('datetime64[ns]'), name='DateTime'), columns=barColumns)
+
+    #### EA side ####
+    def isReady(self):
+        return bool(self.header['ready'])
+
+    def writeBar(self, barTime, openVal, high, low, close, volume=0.0):
+        """
+            Appends a bar to the ring, barTime is a Timestamp or seconds since 1970.
+        """
+        seq = self.getWriteSeq()
+        record = self.records[seq % self.capacity]
+        record['seq'] = 0     # the slot is invalid while it is written
+        record['time'] = int(barTime) if isinstance(barTime, (int, np.integer)) else pd.Timestamp(barTime).value//10**9
+        record['open'], record['high'], record['low'], record['close'], record['volume'] = openVal, high, low, close, volume
+        record['seq'] = seq + 1
+        self.header['writeSeq'] = seq + 1
+
+    def request(self, timeout=None):
+        """
+            Asks for the direction of the last bar written and waits for the answer.
+
+            Returns:
+                direction (int): the response, None on timeout.
+        """
+        seq = self.getWriteSeq()
+        self.header['requestSeq'] = seq
+        self.requests += 1
+        if not self.waitFor(lambda: self.header['responseSeq'] == seq, timeout):
+            return None
+        return int(self.header['response'])
+
+    def setDone(self, done=True):
+        self.header['done'] = int(done)
+
+    def getStats(self):
+        return {'requests': self.requests, 'ringWakeups': self.wakeups, 'overruns': self.overruns}
+
+    def close(self):
+        self.header = self.records = None
+        self.map.close()
+        self.file.close()
+
+class EASimulator:
+    def __init__(self, path, data, history=159):
+        """
+            Plays the EA side of a SharedBarRing in pure Python: it sends the first history bars of data
+            like OnInit, then every other bar followed by a request for its direction like OnTick.
+
+            Parameters:
+                path (str): the shared file created by the Python side.
+                data (DataFrame): bars indexed by DateTime with open, high, low, close and optional volume columns.
+                history (int): bars sent before the first request.
+        """
+        self.path = path
+        self.data = data
+        self.history = history
+        self.times = data.index.values.astype('datetime64[s]').astype(np.int64)
+        self.bars = data.reindex(columns=barColumns+['volume'], fill_value=0.0).to_numpy(dtype=np.float64)
+        self.directions = []        # answer of every request
+        self.roundTrips = []        # seconds from writing a bar to reading its direction
+
+    def sendBar(self, ring, position):
+        ring.writeBar(self.times[position], *self.bars[position])
+
+    def run(self, timeout=10.0):
+        """
+            Waits for the Python side to be ready, sends the bars and sets the done flag.
+
+            Returns:
+                directions (list): the direction received for every bar after the history.
+        """
+        ring = SharedBarRing(self.path)
+        try:
+            if not ring.waitFor(ring.isReady, timeout):
+                raise TimeoutError("The Python side is not ready")
+            for position in range(min(self.history, len(self.data))):
+                self.sendBar(ring, position)
+            for position in range(self.history, len(self.data)):
+                start = time.perf_counter()
+                self.sendBar(ring, position)
+                direction = ring.request(timeout)
+                self.roundTrips.append(time.perf_counter() - start)
+                if direction == None:
+                    raise TimeoutError("No direction for bar "+str(position))
+                self.directions.append(direction)
+            ring.setDone()
+        finally:
+            ring.close()
+        return self.directions
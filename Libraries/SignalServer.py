@@ -0,0 +1,434 @@
+##Import libraries
+from Libraries.ConnectMT5 import StrategyConnectMT5
+from Libraries.Inference import BatchSession, getArchitecture
+import numpy as np
+import os, glob, json, time, queue, socket, socketserver, threading
+from collections import deque
+
+##Line protocol of a connection, one channel (PAIR_TF, e.g. EURUSD_15Min) per connection:
+##  HELLO <channel>   -> OK <bars>           opens the channel, bars is the history the client should send first
+##  BARS <n>          -> DIR <direction>     followed by n lines "time,open,high,low,close" (time in seconds since 1970):
+##                       RESYNC <bars>       the last bar already sent (anchor) and the new ones, or the history;
+##                                           RESYNC asks for the history again (gap, or too few bars for the indicators)
+##  STATS             -> STATS <json>        counters of the server
+##  BYE                                      closes the connection
+##Any other line or a failure is answered with ERR <message>
+
+class PendingPrediction:
+    def __init__(self, channel, window):
+        """
+            A window waiting in the queue of the batching thread for its direction.
+        """
+        self.channel = channel
+        self.window = window
+        self.direction = None
+        self.error = None
+        self.done = threading.Event()
+
+class SignalChannel:
+    def __init__(self, name, strategy):
+        """
+            The state of one channel: its StrategyConnectMT5 (model, scaler and BarHistory) and a lock,
+            the bars of a channel are taken in order even when several connections use it.
+        """
+        self.name = name
+        self.strategy = strategy
+        self.lock = threading.Lock()
+        self.group = None       # architecture the channel's model is batched with
+        self.position = None    # position of the model in the BatchSession of its group
+        self.session = None     # the InferenceSession the group was built from, to see the model was reloaded
+        self.requests = 0
+        self.resyncs = 0
+
+class SignalHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        channel = None
+        for line in self.rfile:
+            command = line.split()
+            try:
+                if not command:
+                    continue
+                elif command[0] == b'HELLO' and len(command) == 2:
+                    channel = self.server.signals.getChannel(command[1].decode())
+                    self.reply('OK '+str(self.server.signals.historySize))
+                elif command[0] == b'BARS' and len(command) == 2:
+                    lines = [self.rfile.readline() for _ in range(int(command[1]))]
+                    if channel is None:
+                        raise ValueError("No channel, send HELLO first")
+                    direction = self.server.signals.getDirection(channel, lines)
+                    self.reply('RESYNC '+str(self.server.signals.historySize) if direction is None else 'DIR '+str(direction))
+                elif command[0] == b'STATS':
+                    self.reply('STATS '+json.dumps(self.server.signals.getStats()))
+                elif command[0] == b'BYE':
+                    return
+                else:
+                    raise ValueError("Unknown command "+line.decode(errors='replace').strip())
+            except Exception as error:
+                self.reply('ERR '+str(error).replace('\n', ' '))
+
+    def reply(self, text):
+        self.wfile.write(text.encode()+b'\n')
+
+class SignalTCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class SignalUnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    SignalUnixServer = None
+
+class SignalServer:
+    def __init__(self, address=('127.0.0.1', 0), backend="keras", batchWindow=0.0, maxBatch=1, historySize=300):
+        """
+            One process serving the directions of many models (one per pair and time frame, e.g. one
+            chart of the EA each) instead of one StrategyConnectMT5 process per model, whose shared
+            files (Strat.txt, Ready.txt) collide when several run in the same MT5 folder.
+            Every client connects to a channel, PAIR_TF, which names the model and keeps the bars and
+            indicator state of that chart, so the channels do not share any file or state.
+            The bars arrive as deltas (see BarHistory). A connection thread computes the indicators and
+            the scaled window and queues it. One inference thread takes the queued windows and, with maxBatch
+            above 1, runs the windows of the models that share an architecture in one BatchSession call:
+            the windows queued while the previous call ran, and with batchWindow the ones other connections
+            are still preparing, waiting at most batchWindow seconds after the first window.
+            Batching is opt-in: with maxBatch 1, the default, every window is predicted on its own.
+
+            Parameters:
+                address (tuple or str): (host, port) for local TCP, port 0 picks a free port,
+                                        or a path for a Unix socket.
+                backend (str): "keras" batches the models, "tflite" predicts every window on its TFLiteSession.
+                batchWindow (float): longest time a batch waits for the windows being prepared after its first one.
+                maxBatch (int): most windows in a batch, 1 (the default) turns batching off, e.g. 64 turns it on.
+                historySize (int): bars a client sends first and after a RESYNC.
+        """
+        self.backend = backend
+        self.batchWindow = batchWindow
+        self.maxBatch = maxBatch
+        self.historySize = historySize
+        self.channels = {}          # name -> SignalChannel
+        self.groups = {}            # architecture -> (BatchSession, channels)
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.preparing = 0          # connections computing a window, the batching thread waits for them
+        self.running = False
+        self.batcher = None
+        self.batches = 0            # inference calls of the batching thread
+        self.predictions = 0        # windows predicted
+        self.latencies = deque(maxlen=10000)     # seconds from queueing a window to its direction, of the last windows
+        if isinstance(address, str):
+            if SignalUnixServer is None:
+                raise ValueError("Unix sockets are not available, use a (host, port) address")
+            if os.path.exists(address):
+                os.remove(address)
+            self.server = SignalUnixServer(address, SignalHandler)
+        else:
+            self.server = SignalTCPServer(address, SignalHandler)
+        self.server.signals = self
+        self.address = self.server.server_address
+
+    def getChannelNames(self):
+        """
+            Returns the channels of the models in Models/ (<PAIR>_<TF>.h5, or .tflite with the tflite backend).
+        """
+        extension = ".tflite" if self.backend == "tflite" else ".h5"
+        names = [os.path.basename(path)[:-len(extension)] for path in glob.glob('Models/*'+extension)]
+        return sorted(name for name in names if name.count('_') == 1 and ' ' not in name)
+
+    def getChannel(self, name):
+        """
+            Returns a channel, loading its model the first time it is asked for.
+        """
+        with self.lock:
+            if name not in self.channels:
+                if name not in self.getChannelNames():
+                    raise ValueError("Unknown channel "+name)
+                pair, timeFrame = name.split('_')
+                channel = SignalChannel(name, StrategyConnectMT5(pair, timeFrame, backend=self.backend))
+                self.channels[name] = channel
+                if self.backend == "keras":
+                    self.addToGroup(channel)
+            return self.channels[name]
+
+    def addToGroup(self, channel):
+        """
+            Puts the model of a channel in the BatchSession of its architecture, the session is built again
+            with every model of the group. Called with the server lock held.
+        """
+        channel.session = channel.strategy.session
+        group = getArchitecture(channel.session.model)
+        if channel.group is not None and channel.group != group:
+            self.groups[channel.group][1].remove(channel)
+            self.buildGroup(channel.group)
+        if group not in self.groups:
+            self.groups[group] = (None, [])
+        if channel not in self.groups[group][1]:
+            self.groups[group][1].append(channel)
+        channel.group = group
+        self.buildGroup(group)
+
+    def buildGroup(self, group):
+        channels = self.groups[group][1]
+        if not channels:
+            del self.groups[group]
+            return
+        for position, channel in enumerate(channels):
+            channel.position = position
+        self.groups[group] = (BatchSession([channel.session.model for channel in channels], channels[0].strategy.dataHandler.dtype), channels)
+
+    def loadChannels(self, names=None):
+        """
+            Loads the models of some channels (all of the model folder by default) before the clients connect.
+
+            Returns:
+                errors (dict): the channels that could not be loaded and why.
+        """
+        errors = {}
+        for name in self.getChannelNames() if names == None else names:
+            try:
+                self.getChannel(name)
+            except Exception as error:
+                errors[name] = str(error)
+        return errors
+
+    def getDirection(self, channel, lines):
+        """
+            Feeds the bars of a BARS message to the channel and returns the direction of its last bar.
+
+            Parameters:
+                channel (SignalChannel): the channel of the connection.
+                lines (list): the "time,open,high,low,close" lines of the message.
+
+            Returns:
+                direction (int): the direction, None if the history has to be sent again.
+        """
+        values = np.array(b','.join(line.strip() for line in lines).split(b','), dtype=np.float64).reshape(len(lines), 5)
+        times = values[:, 0].astype(np.int64)*10**9
+        strategy = channel.strategy
+        with self.lock:
+            self.preparing += 1
+        try:
+            with channel.lock:
+                channel.requests += 1
+                history = strategy.getHistory()
+                if history.update(times, values[:, 1:]) == None:
+                    if len(times) < self.historySize:       # a delta that does not continue the history
+                        channel.resyncs += 1
+                        return None
+                    history.seed(times, values[:, 1:])
+                df = history.getFeatures(strategy.lookBack, strategy.features)
+                if len(df) < strategy.lookBack:
+                    channel.resyncs += 1
+                    return None
+                window = strategy.getWindow(df)
+        finally:
+            with self.lock:
+                self.preparing -= 1
+        return self.predict(channel, window)
+
+    def predict(self, channel, window):
+        """
+            Queues a window for the batching thread and waits for its direction.
+        """
+        pending = PendingPrediction(channel, window)
+        start = time.perf_counter()
+        self.queue.put(pending)
+        pending.done.wait()
+        self.latencies.append(time.perf_counter() - start)
+        if pending.error is not None:
+            raise pending.error
+        return pending.direction
+
+    def getBatch(self):
+        """
+            Returns the next windows to predict: the first queued one, the ones queued since, and the ones
+            queued while other connections are preparing a window, until batchWindow seconds passed or
+            maxBatch windows were taken. None when stopped.
+        """
+        batch = []
+        while self.running and not batch:
+            try:
+                batch.append(self.queue.get(timeout=0.1))
+            except queue.Empty:
+                pass
+        deadline = time.perf_counter() + self.batchWindow
+        while batch and len(batch) < self.maxBatch:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self.preparing:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=min(remaining, 0.0005)))
+                except queue.Empty:
+                    pass
+        return batch or None
+
+    def runBatch(self, batch):
+        """
+            Predicts a batch, one BatchSession call per architecture (one session call per window with tflite).
+        """
+        groups = {}
+        for pending in batch:
+            strategy = pending.channel.strategy
+            strategy.session = strategy.getSession()
+            if self.backend == "keras" and strategy.session is not pending.channel.session:    # the model file changed
+                with self.lock:
+                    self.addToGroup(pending.channel)
+            groups.setdefault(pending.channel.group, []).append(pending)
+
+        for group, members in groups.items():
+            try:
+                if self.backend == "keras":
+                    session = self.groups[group][0]
+                    predictions = session.predict([pending.window for pending in members], [pending.channel.position for pending in members])
+                else:
+                    predictions = [pending.channel.strategy.session.predict(pending.window) for pending in members]
+                for pending, prediction in zip(members, predictions):
+                    pending.direction = int(pending.channel.strategy.predictionThreshold(prediction))
+            except Exception as error:
+                for pending in members:
+                    pending.error = error
+            self.batches += 1
+            self.predictions += len(members)
+        for pending in batch:
+            pending.done.set()
+
+    def runBatcher(self):
+        while self.running:
+            batch = self.getBatch()
+            if batch:
+                self.runBatch(batch)
+
+    def start(self):
+        """
+            Starts the batching thread and the listener in background threads.
+        """
+        self.running = True
+        self.batcher = threading.Thread(target=self.runBatcher, daemon=True)
+        self.batcher.start()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def serve(self):
+        """
+            Serves until interrupted (Ctrl+C).
+        """
+        self.start()
+        try:
+            while self.running:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        self.stop()
+
+    def stop(self):
+        self.running = False
+        self.server.shutdown()
+        self.server.server_close()
+        if self.batcher is not None:
+            self.batcher.join()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def getStats(self):
+        """
+            Returns:
+                stats (dict): windows predicted, inference calls, mean batch size, mean and largest
+                              seconds a window waited for its direction (over the last 10000 windows),
+                              and the requests and resyncs of every channel.
+        """
+        latencies = list(self.latencies) or [0.0]
+        return {'predictions': self.predictions, 'batches': self.batches,
+                'meanBatch': self.predictions/self.batches if self.batches else 0.0,
+                'meanLatency': sum(latencies)/len(latencies), 'maxLatency': max(latencies),
+                'groups': len(self.groups),
+                'channels': {name: {'requests': channel.requests, 'resyncs': channel.resyncs}
+                             for name, channel in list(self.channels.items())}}
+
+class SignalClient:
+    def __init__(self, address, channel, timeout=30.0):
+        """
+            Client of a SignalServer for one channel, it plays the EA side of a chart (in tests and benchmarks):
+            it sends the history of the chart once, then every new bar with the bar before it as anchor.
+
+            Parameters:
+                address (tuple or str): address of the server, see SignalServer.
+                channel (str): the channel, PAIR_TF.
+                timeout (float): seconds to wait for an answer.
+        """
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(address)
+        if family == socket.AF_INET:
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile('rb')
+        self.historySize = int(self.command('HELLO '+channel, ['OK'])[1])
+        self.directions = []        # answer of every bar after the history
+        self.roundTrips = []        # seconds from sending a bar to reading its direction
+        self.resyncs = 0
+
+    def command(self, text, expected):
+        """
+            Sends a command and returns the first word of the reply, one of expected, and the rest of it.
+        """
+        self.socket.sendall(text.encode()+b'\n')
+        reply = self.file.readline().decode().strip()
+        word, _, value = reply.partition(' ')
+        if word == 'ERR' or not reply:
+            raise RuntimeError("Signal server: "+(value or "connection closed"))
+        if word not in expected:
+            raise RuntimeError("Signal server: unexpected reply "+reply)
+        return word, value
+
+    def sendBars(self, times, bars):
+        """
+            Sends bars and returns the direction of the last one, None if the server asks for the history.
+
+            Parameters:
+                times (array): bar times in seconds since 1970.
+                bars (array): open, high, low, close of every bar.
+        """
+        lines = ['BARS '+str(len(times))] + [str(int(barTime))+','+','.join(repr(float(value)) for value in bar) for barTime, bar in zip(times, bars)]
+        word, value = self.command('\n'.join(lines), ['DIR', 'RESYNC'])
+        if word == 'RESYNC':
+            self.historySize = int(value)
+            return None
+        return int(value)
+
+    def run(self, data, start=None):
+        """
+            Sends the bars of data like the EA: the history before start, then every other bar.
+
+            Parameters:
+                data (DataFrame): bars indexed by DateTime with open, high, low and close columns.
+                start (int): first bar a direction is asked for, historySize by default.
+
+            Returns:
+                directions (list): the direction of every bar from start, None where the server asked for the history.
+        """
+        times = data.index.values.astype('datetime64[s]').astype(np.int64)
+        bars = data[['open', 'high', 'low', 'close']].to_numpy(dtype=np.float64)
+        start = self.historySize if start == None else start
+        resync = True
+        for position in range(start, len(data)):
+            first = max(position + 1 - self.historySize, 0) if resync else position - 1
+            begin = time.perf_counter()
+            direction = self.sendBars(times[first:position+1], bars[first:position+1])
+            self.roundTrips.append(time.perf_counter() - begin)
+            self.directions.append(direction)
+            resync = direction == None
+            self.resyncs += resync
+        return self.directions
+
+    def getStats(self):
+        return json.loads(self.command('STATS', ['STATS'])[1])
+
+    def close(self):
+        try:
+            self.socket.sendall(b'BYE\n')
+        except OSError:
+            pass
+        self.file.close()
+        self.socket.close()
@@ -0,0 +1,942 @@
+##Import libraries
+import numpy as np
+import pandas as pd
+import talib
+from talib import abstract
+from collections import deque
+from Libraries.ForexMonkey import candleNames, encodeCandleSignals
+
+nan = float('nan')
+
+##############################################################
+#### RECURSIVE INDICATORS, O(1) PER BAR WITH ROLLING STATE ####
+##############################################################
+## Every indicator follows the TA-Lib algorithm (seeding included) so feeding the
+## bars one at a time from the first bar gives the same values as the batch functions.
+## update() returns nan until the indicator has enough bars, like TA-Lib's lookback.
+
+class Window:
+    def __init__(self, size):
+        """
+            Fixed size window of the last values with a running sum.
+        """
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.sum = 0.0
+
+    def add(self, x):
+        if len(self.values) == self.size:
+            self.sum -= self.values[0]
+        self.values.append(x)
+        self.sum += x
+
+    def isFull(self):
+        return len(self.values) == self.size
+
+class SMA:
+    def __init__(self, period):
+        self.window = Window(period)
+
+    def update(self, x):
+        if x != x: return nan   # nan input while a chained indicator warms up
+        self.window.add(x)
+        if not self.window.isFull(): return nan
+        return sum(self.window.values)/self.window.size
+
+class EMA:
+    def __init__(self, period):
+        self.period = period
+        self.k = 2.0/(period+1)
+        self.count = 0
+        self.seed = 0.0
+        self.value = nan
+
+    def update(self, x):
+        if x != x: return nan
+        self.count += 1
+        if self.count < self.period:
+            self.seed += x
+            return nan
+        if self.count == self.period:   # TA-Lib seeds the EMA with the SMA of the first period values
+            self.value = (self.seed + x)/self.period
+        else:
+            self.value = ((x-self.value)*self.k) + self.value
+        return self.value
+
+class DEMA:
+    def __init__(self, period):
+        self.ema1, self.ema2 = EMA(period), EMA(period)
+
+    def update(self, x):
+        e1 = self.ema1.update(x)
+        e2 = self.ema2.update(e1)
+        return (2.0*e1) - e2
+
+class TEMA:
+    def __init__(self, period):
+        self.ema1, self.ema2, self.ema3 = EMA(period), EMA(period), EMA(period)
+
+    def update(self, x):
+        e1 = self.ema1.update(x)
+        e2 = self.ema2.update(e1)
+        e3 = self.ema3.update(e2)
+        return (3.0*e1) - (3.0*e2) + e3
+
+class WeightedMA:
+    def __init__(self, weights):
+        """
+            Moving average with fixed weights, oldest value first.
+        """
+        self.weights = np.array(weights, dtype=np.float64)
+        self.divider = self.weights.sum()
+        self.window = Window(len(weights))
+
+    def update(self, x):
+        self.window.add(x)
+        if not self.window.isFull(): return nan
+        return float(np.dot(self.weights, self.window.values))/self.divider
+
+def WMA(period):
+    return WeightedMA(range(1, period+1))
+
+def TRIMA(period):
+    half = (period+1)//2 if period % 2 else period//2
+    weights = list(range(1, half+1)) + list(range(period-half, 0, -1))
+    return WeightedMA(weights)
+
+class BBANDS:
+    def __init__(self, period=5, deviation=2):
+        self.window = Window(period)
+        self.deviation = deviation
+
+    def update(self, x):
+        self.window.add(x)
+        if not self.window.isFull(): return nan, nan, nan
+        values = np.array(self.window.values)
+        mean = values.sum()/self.window.size
+        variance = (values*values).sum()/self.window.size - mean*mean
+        deviation = np.sqrt(variance) if variance > 0 else 0.0
+        return mean + self.deviation*deviation, mean, mean - self.deviation*deviation
+
+class KAMA:
+    def __init__(self, period=14):
+        self.window = Window(period+1)
+        self.fast = 2.0/(2+1)
+        self.slow = 2.0/(30+1)
+        self.value = nan
+
+    def update(self, x):
+        self.window.add(x)
+        if not self.window.isFull(): return nan
+        values = np.array(self.window.values)
+        if self.value != self.value:
+            self.value = values[-2]     # TA-Lib starts from the previous close
+        periodROC = values[-1] - values[0]
+        sumROC1 = np.abs(np.diff(values)).sum()
+        if sumROC1 <= periodROC or sumROC1 == 0:
+            efficiency = 1.0
+        else:
+            efficiency = abs(periodROC/sumROC1)
+        constant = (efficiency*(self.fast - self.slow)) + self.slow
+        constant *= constant
+        self.value = ((x-self.value)*constant) + self.value
+        return self.value
+
+class MOM:
+    def __init__(self, period=10):
+        self.window = Window(period+1)
+
+    def update(self, x):
+        self.window.add(x)
+        if not self.window.isFull(): return nan
+        return x - self.window.values[0]
+
+class ROC:
+    def __init__(self, period=1):
+        self.window = Window(period+1)
+
+    def update(self, x):
+        self.window.add(x)
+        if not self.window.isFull(): return nan
+        previous = self.window.values[0]
+        if previous == 0: return 0.0
+        return ((x/previous)-1.0)*100.0
+
+class WilderGainLoss:
+    def __init__(self, period):
+        """
+            Wilder smoothed average gain and loss shared by RSI and CMO.
+        """
+        self.period = period
+        self.previous = nan
+        self.count = 0
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def update(self, x):
+        """
+            Returns True once the averages are ready.
+        """
+        if x != x: return False
+        if self.previous != self.previous:
+            self.previous = x
+            return False
+        change = x - self.previous
+        self.previous = x
+        self.count += 1
+        if self.count <= self.period:
+            if change < 0: self.loss -= change
+            else: self.gain += change
+            if self.count == self.period:
+                self.gain /= self.period
+                self.loss /= self.period
+                return True
+            return False
+        self.gain *= (self.period-1)
+        self.loss *= (self.period-1)
+        if change < 0: self.loss -= change
+        else: self.gain += change
+        self.gain /= self.period
+        self.loss /= self.period
+        return True
+
+class RSI:
+    def __init__(self, period=14):
+        self.averages = WilderGainLoss(period)
+
+    def update(self, x):
+        if not self.averages.update(x): return nan
+        total = self.averages.gain + self.averages.loss
+        if total == 0: return 0.0
+        return 100.0*(self.averages.gain/total)
+
+class CMO:
+    def __init__(self, period=14):
+        self.averages = WilderGainLoss(period)
+
+    def update(self, x):
+        if not self.averages.update(x): return nan
+        total = self.averages.gain + self.averages.loss
+        if total == 0: return 0.0
+        return 100.0*((self.averages.gain-self.averages.loss)/total)
+
+class MACD:
+    def __init__(self, fast=12, slow=26, signal=9):
+        if slow < fast: fast, slow = slow, fast
+        self.skip = slow - fast     # TA-Lib seeds the fast EMA so that it lines up with the slow one
+        self.fast, self.slow, self.signal = EMA(fast), EMA(slow), EMA(signal)
+        self.count = 0
+
+    def update(self, x):
+        self.count += 1
+        fast = self.fast.update(x) if self.count > self.skip else nan
+        macd = fast - self.slow.update(x)
+        signal = self.signal.update(macd)
+        if signal != signal: return nan, nan, nan
+        return macd, signal, macd - signal
+
+class PPO:
+    def __init__(self, fast=12, slow=26):
+        self.fast, self.slow = SMA(fast), SMA(slow)
+
+    def update(self, x):
+        fast, slow = self.fast.update(x), self.slow.update(x)
+        if slow != slow: return nan
+        if slow == 0: return 0.0
+        return ((fast-slow)/slow)*100.0
+
+class TrueRange:
+    def __init__(self):
+        self.previousClose = nan
+
+    def update(self, high, low, close):
+        """
+            Returns the true range, nan for the first bar.
+        """
+        previous = self.previousClose
+        self.previousClose = close
+        if previous != previous: return nan
+        return max(high-low, abs(high-previous), abs(low-previous))
+
+class ATR:
+    def __init__(self, period=14):
+        self.period = period
+        self.trueRange = TrueRange()
+        self.count = 0
+        self.value = 0.0
+
+    def update(self, high, low, close):
+        tr = self.trueRange.update(high, low, close)
+        if tr != tr: return nan
+        self.count += 1
+        if self.count < self.period:
+            self.value += tr
+            return nan
+        if self.count == self.period:
+            self.value = (self.value + tr)/self.period
+        else:
+            self.value = ((self.value*(self.period-1)) + tr)/self.period
+        return self.value
+
+class DirectionalMovement:
+    def __init__(self, period=14):
+        """
+            Wilder smoothed +DM, -DM and true range shared by the DM, DI, DX, ADX and ADXR indicators.
+        """
+        self.period = period
+        self.previousHigh = nan
+        self.previousLow = nan
+        self.trueRange = TrueRange()
+        self.count = 0
+        self.plusDM = 0.0
+        self.minusDM = 0.0
+        self.tr = 0.0
+
+    def update(self, high, low, close):
+        """
+            Returns the number of bars processed after the first one.
+        """
+        tr = self.trueRange.update(high, low, close)
+        previousHigh, previousLow = self.previousHigh, self.previousLow
+        self.previousHigh, self.previousLow = high, low
+        if previousHigh != previousHigh: return 0
+
+        diffP = high - previousHigh
+        diffM = previousLow - low
+        plusDM = diffP if diffP > 0 and diffP > diffM else 0.0
+        minusDM = diffM if diffM > 0 and diffP < diffM else 0.0
+
+        self.count += 1
+        if self.count < self.period:    # Plain sums over the first period-1 bars
+            self.plusDM += plusDM
+            self.minusDM += minusDM
+            self.tr += tr
+        else:
+            self.plusDM = self.plusDM - (self.plusDM/self.period) + plusDM
+            self.minusDM = self.minusDM - (self.minusDM/self.period) + minusDM
+            self.tr = self.tr - (self.tr/self.period) + tr
+        return self.count
+
+    def getDI(self):
+        if self.tr == 0: return 0.0, 0.0
+        return 100.0*(self.plusDM/self.tr), 100.0*(self.minusDM/self.tr)
+
+    def getDX(self):
+        plusDI, minusDI = self.getDI()
+        total = plusDI + minusDI
+        if total == 0: return 0.0
+        return 100.0*(abs(minusDI-plusDI)/total)
+
+class DM:
+    def __init__(self, period=14, plus=True):
+        """
+            Smoothed +DM (plus=True) or -DM.
+        """
+        self.movement = DirectionalMovement(period)
+        self.plus = plus
+
+    def update(self, high, low, close):
+        if self.movement.update(high, low, close) < self.movement.period-1: return nan
+        return self.movement.plusDM if self.plus else self.movement.minusDM
+
+class DI:
+    def __init__(self, period=14, plus=True):
+        """
+            +DI (plus=True) or -DI.
+        """
+        self.movement = DirectionalMovement(period)
+        self.plus = plus
+
+    def update(self, high, low, close):
+        if self.movement.update(high, low, close) < self.movement.period: return nan
+        plusDI, minusDI = self.movement.getDI()
+        return plusDI if self.plus else minusDI
+
+class DX:
+    def __init__(self, period=14):
+        self.movement = DirectionalMovement(period)
+
+    def update(self, high, low, close):
+        if self.movement.update(high, low, close) < self.movement.period: return nan
+        return self.movement.getDX()
+
+class ADXR:
+    def __init__(self, period=14):
+        self.period = period
+        self.movement = DirectionalMovement(period)
+        self.sumDX = 0.0
+        self.adx = nan
+        self.history = Window(period)     # ADX values, ADXR averages the current one with the one period-1 bars ago
+
+    def update(self, high, low, close):
+        count = self.movement.update(high, low, close)
+        if count < self.period: return nan
+        dx = self.movement.getDX()
+        if count < 2*self.period:   # ADX is seeded with the average of the first period DX values
+            self.sumDX += dx
+            if count < 2*self.period-1: return nan
+            self.adx = self.sumDX/self.period
+        else:
+            self.adx = ((self.adx*(self.period-1)) + dx)/self.period
+        self.history.add(self.adx)
+        if not self.history.isFull(): return nan
+        return (self.adx + self.history.values[0])/2.0
+
+class AROONOSC:
+    def __init__(self, period=14):
+        self.period = period
+        self.highs = Window(period+1)
+        self.lows = Window(period+1)
+
+    def update(self, high, low):
+        self.highs.add(high)
+        self.lows.add(low)
+        if not self.highs.isFull(): return nan
+        highs, lows = np.array(self.highs.values), np.array(self.lows.values)
+        highestIdx = self.period - np.argmax(highs[::-1])   # ties go to the most recent bar
+        lowestIdx = self.period - np.argmin(lows[::-1])
+        return (100.0/self.period)*(highestIdx - lowestIdx)
+
+def BOP(openVal, high, low, close):
+    if high - low <= 0: return 0.0
+    return (close-openVal)/(high-low)
+
+class CCI:
+    def __init__(self, period=14):
+        self.window = Window(period)
+
+    def update(self, high, low, close):
+        self.window.add((high+low+close)/3)
+        if not self.window.isFull(): return nan
+        values = np.array(self.window.values)
+        average = values.sum()/self.window.size
+        meanDeviation = np.abs(values-average).sum()/self.window.size
+        diff = values[-1] - average
+        if diff == 0 or meanDeviation == 0: return 0.0
+        return diff/(0.015*meanDeviation)
+
+class FastStochastic:
+    def __init__(self, period):
+        """
+            Raw %K, the position of close in the range of the last period bars.
+        """
+        self.highs = Window(period)
+        self.lows = Window(period)
+
+    def update(self, high, low, close):
+        if close != close: return nan
+        self.highs.add(high)
+        self.lows.add(low)
+        if not self.highs.isFull(): return nan
+        lowest = min(self.lows.values)
+        diff = (max(self.highs.values) - lowest)/100.0
+        if diff == 0: return 0.0
+        return (close-lowest)/diff
+
+class STOCH:
+    def __init__(self, fastk=5, slowk=3, slowd=3):
+        self.fastK = FastStochastic(fastk)
+        self.slowK, self.slowD = SMA(slowk), SMA(slowd)
+
+    def update(self, high, low, close):
+        slowK = self.slowK.update(self.fastK.update(high, low, close))
+        slowD = self.slowD.update(slowK)
+        if slowD != slowD: return nan, nan
+        return slowK, slowD
+
+class STOCHRSI:
+    def __init__(self, period=14, fastk=5, fastd=3):
+        self.rsi = RSI(period)
+        self.fastK = FastStochastic(fastk)
+        self.fastD = SMA(fastd)
+
+    def update(self, x):
+        rsi = self.rsi.update(x)
+        fastK = self.fastK.update(rsi, rsi, rsi)
+        fastD = self.fastD.update(fastK)
+        if fastD != fastD: return nan, nan
+        return fastK, fastD
+
+class ULTOSC:
+    def __init__(self, value1=7, value2=14, value3=28):
+        self.periods = sorted([value1, value2, value3])
+        self.weights = [4.0, 2.0, 1.0]
+        self.buyingPressure = [Window(p) for p in self.periods]
+        self.trueRange = [Window(p) for p in self.periods]
+        self.previousClose = nan
+
+    def update(self, high, low, close):
+        previous = self.previousClose
+        self.previousClose = close
+        if previous != previous: return nan
+        trueLow = min(low, previous)
+        for i in range(3):
+            self.buyingPressure[i].add(close - trueLow)
+            self.trueRange[i].add(max(high, previous) - trueLow)
+        if not self.trueRange[2].isFull(): return nan
+        output = 0.0
+        for i in range(3):
+            total = sum(self.trueRange[i].values)
+            if total != 0:
+                output += self.weights[i]*(sum(self.buyingPressure[i].values)/total)
+        return 100.0*(output/7.0)
+
+class WILLR:
+    def __init__(self, period=14):
+        self.highs = Window(period)
+        self.lows = Window(period)
+
+    def update(self, high, low, close):
+        self.highs.add(high)
+        self.lows.add(low)
+        if not self.highs.isFull(): return nan
+        highest = max(self.highs.values)
+        diff = (highest - min(self.lows.values))/(-100.0)
+        if diff == 0: return 0.0
+        return (highest-close)/diff
+
+class SAR:
+    def __init__(self, acceleration=0.02, maximum=0.2):
+        """
+            Parabolic SAR, the direction of the first bar is found like TA-Lib with the -DM of the first two bars.
+        """
+        self.acceleration = min(acceleration, maximum)
+        self.maximum = maximum
+        self.af = self.acceleration
+        self.isLong = None
+        self.sar = nan
+        self.ep = nan
+        self.high = nan     # high and low of the previous bar
+        self.low = nan
+
+    def update(self, high, low):
+        previousHigh, previousLow = self.high, self.low
+        self.high, self.low = high, low
+        if previousHigh != previousHigh: return nan
+        if self.isLong is None:
+            diffP, diffM = high - previousHigh, previousLow - low
+            self.isLong = not (diffM > 0 and diffP < diffM)
+            self.ep, self.sar = (high, previousLow) if self.isLong else (low, previousHigh)
+            previousHigh, previousLow = high, low   # TA-Lib uses the first bar as its own previous bar
+
+        if self.isLong:
+            if low <= self.sar:     # switch to short, the SAR restarts from the extreme point
+                self.isLong = False
+                output = max(self.ep, previousHigh, high)
+                self.af = self.acceleration
+                self.ep = low
+                self.sar = max(output + self.af*(self.ep - output), previousHigh, high)
+                return output
+            output = self.sar
+            if high > self.ep:
+                self.ep = high
+                self.af = min(self.af + self.acceleration, self.maximum)
+            self.sar = min(self.sar + self.af*(self.ep - self.sar), previousLow, low)
+            return output
+        if high >= self.sar:        # switch to long
+            self.isLong = True
+            output = min(self.ep, previousLow, low)
+            self.af = self.acceleration
+            self.ep = high
+            self.sar = min(output + self.af*(self.ep - output), previousLow, low)
+            return output
+        output = self.sar
+        if low < self.ep:
+            self.ep = low
+            self.af = min(self.af + self.acceleration, self.maximum)
+        self.sar = max(self.sar + self.af*(self.ep - self.sar), previousHigh, high)
+        return output
+
+class HilbertFilter:
+    def __init__(self):
+        """
+            One Hilbert transform FIR of TA-Lib, it keeps separate state for the odd and even bars.
+        """
+        self.values = [[0.0]*3, [0.0]*3]    # by parity of the bar
+        self.previous = [0.0, 0.0]
+        self.previousInput = [0.0, 0.0]
+        self.value = 0.0
+
+    def update(self, x, parity, index, adjustedPeriod):
+        scaled = 0.0962*x
+        value = scaled - self.values[parity][index] - self.previous[parity]
+        self.values[parity][index] = scaled
+        self.previous[parity] = 0.5769*self.previousInput[parity]
+        self.previousInput[parity] = x
+        self.value = (value + self.previous[parity])*adjustedPeriod
+        return self.value
+
+class HilbertCycle:
+    def __init__(self, warmup, lookback, phase=False, trend=False):
+        """
+            The Hilbert transform cycle measurement (J. Ehlers) of TA-Lib shared by MAMA and the HT_* indicators:
+            a 4 bar weighted average of the price, its in phase and quadrature components, the dominant
+            cycle period and optionally its phase and the trend mode. The state is updated once per bar
+            in the order of the TA-Lib loop, so the values match the batch functions on the same bars.
+
+            Parameters:
+                warmup (int): bars only fed to the price average before the transform starts (9 or 34 in TA-Lib).
+                lookback (int): bars before the first output, the TA-Lib lookback of the function.
+                phase (bool): compute the dominant cycle phase and the sine wave (HT_DCPHASE, HT_SINE).
+                trend (bool): also compute the trend mode (HT_TRENDMODE).
+        """
+        self.warmup = warmup
+        self.lookback = lookback
+        self.phase = phase or trend
+        self.trend = trend
+        self.count = 0
+        self.prices = deque(maxlen=50 if trend else 4)
+        self.wmaSub = 0.0
+        self.wmaSum = 0.0
+        self.trailing = 0.0
+        self.filters = [HilbertFilter() for _ in range(4)]     # detrender, Q1, jI, jQ
+        self.hilbertIndex = 0
+        self.period = 0.0
+        self.smoothPeriod = 0.0
+        self.prevI2 = self.prevQ2 = self.re = self.im = 0.0
+        self.i1Prev2 = [0.0, 0.0]       # detrender of 2 and 3 bars of the same parity ago, by parity
+        self.i1Prev3 = [0.0, 0.0]
+        self.inPhase = self.quadrature = 0.0
+        self.phaseAngle = 0.0           # atan(Q1/I1), the phase MAMA measures its alpha from
+        self.smoothPrices = deque(maxlen=50)
+        self.dcPhase = self.sine = self.leadSine = 0.0
+        self.trends = [0.0, 0.0, 0.0]
+        self.daysInTrend = 0
+        self.trendMode = 1
+
+    def update(self, x):
+        """
+            Returns True when the bar has an output (its index reached the lookback).
+        """
+        if x != x: return False
+        today = self.count
+        self.count += 1
+        self.prices.append(x)
+        if today < 3:       # the price average starts as a plain weighted sum of the first 3 bars
+            self.wmaSub += x
+            self.wmaSum += x*(today+1)
+            return False
+        self.wmaSub += x - self.trailing
+        self.wmaSum += x*4.0
+        self.trailing = self.prices[-4]
+        smoothed = self.wmaSum*0.1
+        self.wmaSum -= self.wmaSub
+        if today < 3 + self.warmup:
+            return False
+
+        adjustedPeriod = 0.075*self.period + 0.54
+        if self.phase:
+            self.smoothPrices.append(smoothed)
+        parity = today % 2
+        detrender, q1, jI, jQ = self.filters
+        index = self.hilbertIndex
+        detrender.update(smoothed, parity, index, adjustedPeriod)
+        q1.update(detrender.value, parity, index, adjustedPeriod)
+        i1 = self.i1Prev3[parity]
+        self.inPhase, self.quadrature = i1, q1.value
+        jI.update(i1, parity, index, adjustedPeriod)
+        jQ.update(q1.value, parity, index, adjustedPeriod)
+        if parity == 0:
+            self.hilbertIndex = (index + 1) % 3
+        q2 = 0.2*(q1.value + jI.value) + 0.8*self.prevQ2
+        i2 = 0.2*(i1 - jQ.value) + 0.8*self.prevI2
+        self.i1Prev3[1-parity] = self.i1Prev2[1-parity]     # the detrender is used 3 bars later by the other parity
+        self.i1Prev2[1-parity] = detrender.value
+        self.phaseAngle = np.arctan(q1.value/i1)*(180.0/np.pi) if i1 != 0.0 else 0.0
+
+        self.re = 0.2*(i2*self.prevI2 + q2*self.prevQ2) + 0.8*self.re
+        self.im = 0.2*(i2*self.prevQ2 - q2*self.prevI2) + 0.8*self.im
+        self.prevQ2, self.prevI2 = q2, i2
+        previous = self.period
+        if self.im != 0.0 and self.re != 0.0:
+            self.period = 360.0/(np.arctan(self.im/self.re)*(180.0/np.pi))
+        self.period = min(max(self.period, 0.67*previous), 1.5*previous)
+        self.period = min(max(self.period, 6.0), 50.0)
+        self.period = 0.2*self.period + 0.8*previous
+        self.smoothPeriod = 0.33*self.period + 0.67*self.smoothPeriod
+        if self.phase:
+            self.updatePhase()
+        return today >= self.lookback
+
+    def updatePhase(self):
+        previousPhase = self.dcPhase
+        periodInt = int(self.smoothPeriod + 0.5)
+        prices = np.array(self.smoothPrices)[::-1][:periodInt]     # newest first
+        angles = np.arange(len(prices))*(2.0*np.pi)/periodInt if periodInt else prices
+        realPart = float(np.dot(np.sin(angles), prices))
+        imagPart = float(np.dot(np.cos(angles), prices))
+        if abs(imagPart) > 0.0:
+            self.dcPhase = np.arctan(realPart/imagPart)*(180.0/np.pi)
+        elif realPart < 0.0:
+            self.dcPhase -= 90.0
+        elif realPart > 0.0:
+            self.dcPhase += 90.0
+        self.dcPhase += 90.0 + 360.0/self.smoothPeriod     # compensates the one bar lag of the price average
+        if imagPart < 0.0:
+            self.dcPhase += 180.0
+        if self.dcPhase > 315.0:
+            self.dcPhase -= 360.0
+        previousSine, previousLeadSine = self.sine, self.leadSine
+        self.sine = np.sin(self.dcPhase*(np.pi/180.0))
+        self.leadSine = np.sin((self.dcPhase + 45.0)*(np.pi/180.0))
+        if not self.trend:
+            return
+
+        average = sum(list(self.prices)[-periodInt:])/periodInt if periodInt > 0 else 0.0
+        trendline = (4.0*average + 3.0*self.trends[0] + 2.0*self.trends[1] + self.trends[2])/10.0
+        self.trends = [average] + self.trends[:2]
+        trend = 1
+        if ((self.sine > self.leadSine and previousSine <= previousLeadSine) or
+            (self.sine < self.leadSine and previousSine >= previousLeadSine)):     # the sine wave lines crossed
+            self.daysInTrend = 0
+            trend = 0
+        self.daysInTrend += 1
+        if self.daysInTrend < 0.5*self.smoothPeriod:
+            trend = 0
+        change = self.dcPhase - previousPhase
+        if self.smoothPeriod != 0.0 and 0.67*360.0/self.smoothPeriod < change < 1.5*360.0/self.smoothPeriod:
+            trend = 0
+        if trendline != 0.0 and abs((self.smoothPrices[-1] - trendline)/trendline) >= 0.015:
+            trend = 1
+        self.trendMode = trend
+
+class HT_DCPERIOD:
+    def __init__(self):
+        self.cycle = HilbertCycle(9, 32)
+
+    def update(self, x):
+        return self.cycle.smoothPeriod if self.cycle.update(x) else nan
+
+class HT_PHASOR:
+    def __init__(self):
+        self.cycle = HilbertCycle(9, 32)
+
+    def update(self, x):
+        if not self.cycle.update(x): return nan, nan
+        return self.cycle.inPhase, self.cycle.quadrature
+
+class HT_DCPHASE:
+    def __init__(self):
+        self.cycle = HilbertCycle(34, 63, phase=True)
+
+    def update(self, x):
+        return self.cycle.dcPhase if self.cycle.update(x) else nan
+
+class HT_SINE:
+    def __init__(self):
+        self.cycle = HilbertCycle(34, 63, phase=True)
+
+    def update(self, x):
+        if not self.cycle.update(x): return nan, nan
+        return self.cycle.sine, self.cycle.leadSine
+
+class HT_TRENDMODE:
+    def __init__(self):
+        self.cycle = HilbertCycle(34, 63, trend=True)
+
+    def update(self, x):
+        """
+            Returns 1 in a trend and 0 in a cycle, 0 before the lookback like TA-Lib's integer output.
+        """
+        return float(self.cycle.trendMode) if self.cycle.update(x) else 0.0
+
+class MAMA:
+    def __init__(self, fastLimit=0.5, slowLimit=0.05):
+        """
+            MESA adaptive moving average (MAMA) and its following average (FAMA), the alpha adapts
+            to the rate of change of the Hilbert transform phase.
+        """
+        self.cycle = HilbertCycle(9, 32)
+        self.fastLimit = fastLimit
+        self.slowLimit = slowLimit
+        self.previousPhase = 0.0
+        self.mama = 0.0
+        self.fama = 0.0
+
+    def update(self, x):
+        ready = self.cycle.update(x)
+        if self.cycle.count <= 3 + self.cycle.warmup: return nan, nan
+        deltaPhase = max(self.previousPhase - self.cycle.phaseAngle, 1.0)
+        self.previousPhase = self.cycle.phaseAngle
+        alpha = max(self.fastLimit/deltaPhase, self.slowLimit) if deltaPhase > 1.0 else self.fastLimit
+        self.mama = alpha*x + (1 - alpha)*self.mama
+        self.fama = 0.5*alpha*self.mama + (1 - 0.5*alpha)*self.fama
+        if not ready: return nan, nan
+        return self.mama, self.fama
+
+####################################################################
+#### WINDOWED INDICATORS, RECOMPUTED ON A FIXED NUMBER OF LAST BARS ####
+####################################################################
+class CandlePatterns:
+    def __init__(self):
+        """
+            The encoded best candle pattern of the last bar, see ForexMonkey.Data.candlePatterns.
+            A TA-Lib candle pattern only reads its lookback bars before the bar (the pattern and the
+            trailing averages of the candle settings, 14 bars at most), so running every pattern on
+            its last lookback+1 bars gives the same value as running it on the whole history, at a
+            cost per bar that does not grow with the history. Only the signals of the last bar are ranked.
+        """
+        self.patterns = [(getattr(talib, candle), abstract.Function(candle).lookback + 1) for candle in candleNames]
+        self.bars = deque(maxlen=max(size for _, size in self.patterns))
+
+    def update(self, bar):
+        self.bars.append((bar['o'], bar['h'], bar['l'], bar['c']))
+        o, h, l, c = np.ascontiguousarray(np.array(self.bars).T)
+        signals = np.array([[function(o[-size:], h[-size:], l[-size:], c[-size:])[-1] for function, size in self.patterns]])
+        return float(encodeCandleSignals(np.sign(signals).astype(np.int8))[0])
+
+##################################
+#### ENGINE FOR THE LIVE PATH ####
+##################################
+class IndicatorEngine:
+    def __init__(self, historySize=256, features=None):
+        """
+            Keeps the rolling state of every indicator added by DataHandler.addAllIndicators
+            so each new bar costs one update per indicator instead of recomputing all of
+            them on the whole window. The feature rows of the last historySize bars are kept.
+            Every indicator but the candle patterns is a recursion, its values match the batch
+            function run on all the bars fed since the engine was created.
+            The rows are written into a preallocated float64 array of twice historySize rows,
+            when the end is reached the last rows are moved to the start (like BarHistory),
+            so a bar allocates nothing and the kept rows are always one contiguous slice.
+
+            Parameters:
+                historySize (int): number of feature rows kept for getFeatures.
+                features (list): optional feature names, indicators with none of their
+                                 outputs in features are not kept up to date.
+        """
+        # (column names, indicator, inputs) in the column order of DataHandler.addAllIndicators
+        self.indicators = [
+            (['BBANDS UB 5_2', 'BBANDS 5_2', 'BBANDS Lb 5_2'], BBANDS(5, 2), 'c'),
+            (['DEMA 14'], DEMA(14), 'c'),
+            (['EMA 14'], EMA(14), 'c'),
+            (['KAMA 14'], KAMA(14), 'c'),
+            (['MAMA 0.5_0.05', 'FAMA 0.5_0.05'], MAMA(0.5, 0.05), 'c'),
+            (['SAR 0.02_0.2'], SAR(0.02, 0.2), 'hl'),
+            (['SMA 14'], SMA(14), 'c'),
+            (['TEMA 14'], TEMA(14), 'c'),
+            (['TRIMA 14'], TRIMA(14), 'c'),
+            (['WMA 14'], WMA(14), 'c'),
+            (['ADXR 14'], ADXR(14), 'hlc'),
+            (['AROONOSC 14'], AROONOSC(14), 'hl'),
+            (['BOP'], None, 'ohlc'),
+            (['CCI 14'], CCI(14), 'hlc'),
+            (['CMO 14'], CMO(14), 'c'),
+            (['DX 14'], DX(14), 'hlc'),
+            (['MACD 12_26_9', 'MACD Signal 12_26_9', 'MACD Hist12_26_9'], MACD(12, 26, 9), 'c'),
+            (['MINUS_DI 14'], DI(14, False), 'hlc'),
+            (['MINUS_DM 14'], DM(14, False), 'hlc'),
+            (['MOM 10'], MOM(10), 'c'),
+            (['PLUS_DI 14'], DI(14), 'hlc'),
+            (['PLUS_DM 14'], DM(14), 'hlc'),
+            (['PPO 12_26'], PPO(12, 26), 'c'),
+            (['ROC 1'], ROC(1), 'c'),
+            (['RSI 14'], RSI(14), 'c'),
+            (['Slow_K', 'Slow_D'], STOCH(5, 3, 3), 'hlc'),
+            (['Fast_K', 'Fast_D'], STOCHRSI(14, 5, 3), 'c'),
+            (['ULTOSC 7_14_28'], ULTOSC(7, 14, 28), 'hlc'),
+            (['WILLR 14'], WILLR(14), 'hlc'),
+            (['HT_DCPERIOD'], HT_DCPERIOD(), 'c'),
+            (['HT_DCPHASE'], HT_DCPHASE(), 'c'),
+            (['HT_PHASOR_inPhase', 'HT_PHASOR_quadrature'], HT_PHASOR(), 'c'),
+            (['HT_SINE', 'HT_SINE_lead'], HT_SINE(), 'c'),
+            (['HT_TRENDMODE'], HT_TRENDMODE(), 'c'),
+            (['ATR Label'], ATR(20), 'hlc'),
+            (['pattern_name_encoded'], CandlePatterns(), 'bar'),
+        ]
+        if features is not None:
+            self.indicators = [indicator for indicator in self.indicators if any(name in features for name in indicator[0])]
+        self.columns = ['open', 'high', 'low', 'close'] + [name for names, _, _ in self.indicators for name in names]
+        self.historySize = historySize
+        self.rows = np.full((2*historySize, len(self.columns)), nan)
+        self.times = np.zeros(2*historySize, dtype='datetime64[ns]')
+        self.start = 0          # the kept rows are rows[start:end]
+        self.end = 0
+        self.bars = 0           # bars fed
+        self.warm = 0           # bars fed up to the last row with a nan, the rows after it are complete
+        self.positions = {}     # column positions of the feature lists passed to getFeatures
+
+    def update(self, time, openVal, high, low, close):
+        """
+            Adds a new bar and returns its feature row, nan where an indicator is still warming up.
+            The row is a view of the history, it is overwritten historySize bars later.
+        """
+        if self.end == len(self.rows):      # move the last rows to the start
+            keep = self.historySize - 1
+            self.rows[:keep] = self.rows[self.end-keep:self.end]
+            self.times[:keep] = self.times[self.end-keep:self.end]
+            self.start, self.end = 0, keep
+
+        bar = {'o': openVal, 'h': high, 'l': low, 'c': close}
+        row = self.rows[self.end]
+        row[:4] = openVal, high, low, close
+        position = 4
+        for names, indicator, inputs in self.indicators:
+            if indicator is None: value = BOP(openVal, high, low, close)
+            elif inputs == 'c': value = indicator.update(close)
+            elif inputs == 'hl': value = indicator.update(high, low)
+            elif inputs == 'hlc': value = indicator.update(high, low, close)
+            else: value = indicator.update(bar)
+
+            if len(names) == 1: row[position] = value
+            else: row[position:position+len(names)] = value
+            position += len(names)
+
+        self.times[self.end] = time
+        self.end += 1
+        self.start = max(self.start, self.end - self.historySize)
+        self.bars += 1
+        if np.isnan(row).any():
+            self.warm = self.bars
+        return row
+
+    def seed(self, data):
+        """
+            Feeds every bar of a DataFrame with open, high, low and close columns.
+        """
+        for time, o, h, l, c in zip(data.index, data.open.values, data.high.values, data.low.values, data.close.values):
+            self.update(time, o, h, l, c)
+
+    def getLastTime(self):
+        return pd.Timestamp(self.times[self.end-1]) if self.end > self.start else None
+
+    def getSlice(self, rows=None):
+        """
+            Returns the positions of the last rows complete feature rows, rows where an indicator
+            is still warming up (or gave a nan) and the rows before them are left out.
+        """
+        count = min(self.end - self.start, self.bars - self.warm)
+        if rows is not None:
+            count = min(count, rows)
+        return slice(self.end - count, self.end)
+
+    def getFeatures(self, rows=None, columns=None):
+        """
+            Returns the feature rows of the last bars, in the column order of self.columns
+            (the order of DataHandler.addAllIndicators). Nothing is copied: the rows are a read only
+            view of the history, valid until the next update, copy them to keep them longer.
+
+            Parameters:
+                rows (int): number of most recent bars, None for all the kept bars.
+                columns (list): only return these columns, in this order (e.g. the model features).
+                                This gives a small array of rows x len(columns) instead of a view.
+
+            Returns:
+                features (array): one row per bar, at most rows rows.
+        """
+        features = self.rows[self.getSlice(rows)]
+        if columns is not None:
+            key = tuple(columns)
+            if key not in self.positions:
+                self.positions[key] = [self.columns.index(name) for name in columns]
+            return features[:, self.positions[key]]
+        features.flags.writeable = False
+        return features
+
+    def getFeatureFrame(self, rows=None):
+        """
+            Returns a copy of the feature rows of the last bars as a DataFrame like DataHandler.addAllIndicators.
+        """
+        positions = self.getSlice(rows)
+        index = pd.DatetimeIndex(self.times[positions].copy(), name='DateTime')
+        return pd.DataFrame(self.rows[positions].copy(), index=index, columns=self.columns)
@@ -1,23 +1,38 @@
 # import libraries
 import Libraries.ForexMonkey as fm
+from Libraries.Datasets import WindowDataset
+from Libraries.Artifacts import sharedArtifactCache, ScalerTransform, loadPickle
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import MinMaxScaler
-from pickle import dump, load
+from pickle import dump
 import pandas as pd
-import random, math, os
+import os, itertools
+
+##Columns the models are not trained on, see DataHandler.featureSelection
+dropColumns = ['HT_TRENDMODE', 'open', 'high', 'low', 'BBANDS 5_2', 'close', 'DEMA 14', 'TEMA 14',
+               'BBANDS UB 5_2', 'EMA 14', 'WMA 14', 'BBANDS Lb 5_2', 'TRIMA 14', 'SMA 14', 'MAMA 0.5_0.05',
+               'FAMA 0.5_0.05', 'KAMA 14', 'SAR 0.02_0.2', 'Fast_K']
+##Integer columns of TA-Lib and the candle pattern encoding, computed as floats in the indicator matrix
+intColumns = {'HT_TRENDMODE': np.int32, 'pattern_name_encoded': np.int64}
     
 class DataHandler:
-    def __init__(self, isMT5=False, isTickData=False, verbose=1):
+    def __init__(self, isMT5=False, isTickData=False, verbose=1, useStore=False, workers=1, dtype=np.float32):
         """
             This class handles all the data manipulation and file manipulation
             It is used for adding technical indicators to data which are the features of the NN
             It also has helper functions used in running the ConnectMT5 class.
         """
         self.verbose = verbose          # if verbose is true then it will print while executing
-        self.dataMonkey = fm.Data()     # Forex monkey class has useful lower level functions
+        self.dataMonkey = fm.Data(workers=workers)     # Forex monkey class has useful lower level functions
         self.isMT5 = isMT5              # is it an mt5 connection or training the models from csv 
         self.isTickData = isTickData    # is the data required tickdata
+        self.useStore = useStore        # read the csv data through the memory-mapped OHLC store
+        self.dtype = dtype              # float type of the scaled features, the windows and the model input
+        self.dataStamp = None           # size and modification time of the shared data file when it was last checked
+        self.lastBarTime = None         # time of the last bar of the shared data file when it was last parsed
+        self.dataChecks = 0             # calls of getNewData
+        self.dataParses = 0             # calls of getNewData that parsed the shared data file
     
     ########################################################
     #### HELPER FUNCTION USED FOR PYTHON-MT5 CONNECTION ####
@@ -71,6 +86,16 @@ class DataHandler:
         path = self.dataMonkey.mt5Path +'Done.txt'
         return path
 
+    def getRingPath(self):
+        """
+            Returns the path of the shared memory ring used by the "shared" transport of StrategyConnectMT5.
+
+            Returns: 
+                path (str): path to file
+        """
+        path = self.dataMonkey.mt5Path +'LazyEA.ring'
+        return path
+
     def getReadyPath(self):
         """
             Returns the path of done file which lets us know when the Python Code is Ready to connect.
@@ -92,15 +117,18 @@ class DataHandler:
         """
         pathFile = self.getDonePath()
         if os.path.exists(pathFile):
-            file1 = open(pathFile,"r")
-            read = file1.read()
-            if int(read) == 1: return True
+            with open(pathFile,"r") as file1:
+                read = file1.read()
+            try:
+                if int(read) == 1: return True
+            except ValueError:  # the EA may still be writing the file, it is read again when it changes
+                pass
         return False
 
     #####################################################
     #### FUNCTIONS FOR GETTING AND MANIPULATING DATA ####
     #####################################################
-    def getFullData(self, market, timeFrame=None):
+    def getFullData(self, market, timeFrame=None, start=None, end=None):
         """
             Returns the data from either csv file or mt5 and formates it in a
             pandas data frame.
@@ -110,6 +138,7 @@ class DataHandler:
             Parameters:
                 market (str): The currency pair you are trying to read.
                 timeFrame (str): The time frame you want to resample your data to.
+                start, end: Optional date range, only used when reading from the OHLC store.
 
             Returns: 
                 Stockdata (DataFrame): a pandas data frame with the currency pair raw data.
@@ -118,134 +147,244 @@ class DataHandler:
             print("Getting Data.")
 
         if self.isMT5: StockData = self.dataMonkey.getBackTestData(market)
+        elif self.useStore:
+            self.dataMonkey.updateStore(market, timeFrame, self.isTickData)     # only reads the csv rows after the last stored bar
+            StockData=self.dataMonkey.getDataStore(market, timeFrame, False, self.isTickData, start, end)
         else: StockData=self.dataMonkey.getDataCSV(market, timeFrame, False, self.isTickData)
 
         if self.verbose:
             print("Number of data points:", len(StockData))
         return StockData
 
-    def addAllIndicators(self, StockData):
+    def getNewData(self, market):
+        """
+            Returns the bars of the shared data file written by the MT5 EA, only if a new bar arrived
+            since the last call. The file is only parsed when its size or modification time changed and
+            the time of its last bar, read from the end of the file, is not the last bar already parsed.
+
+            Parameters:
+                market (str): The currency pair you are trying to read.
+
+            Returns:
+                StockData (DataFrame): the bars, None if no new bar arrived.
+        """
+        self.dataChecks += 1
+        try:
+            stat = os.stat(self.getMT5DataPath())
+        except OSError:
+            return None
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if stamp == self.dataStamp:
+            return None
+        lastTime = self.dataMonkey.getBackTestLastTime()
+        if lastTime == None:    # no bars yet or the EA is still writing, checked again when the file changes
+            return None
+        self.dataStamp = stamp
+        if lastTime == self.lastBarTime:
+            return None
+
+        StockData = self.getFullData(market)
+        self.dataParses += 1
+        if len(StockData) == 0:
+            self.dataStamp = None
+            return None
+        self.lastBarTime = lastTime
+        return StockData
+
+    def addAllIndicators(self, StockData, features=None):
         """
             This function adds a variety of technical indicators to the data using the
             ForexMonkey Library.
+            All the indicators (see ForexMonkey.indicatorRegistry) and the candle patterns
+            are written into one preallocated array, its columns are then added to StockData
+            in place and the rows with empty cells are dropped.
             Parameters:
                 StockData (DataFrame): The raw data frame you want to add indicators to.
+                features (list): Optional feature names (e.g. getModelFeatures()), only the
+                                 indicators needed for them are computed.
             Returns:
-                StockData (DataFrame): The dataframe with indicators included.
+                StockData (DataFrame): The same dataframe, with indicators included.
         """
         if self.verbose:
             print("Adding Indicators.")
 
-        self.dataMonkey.BBANDS(StockData)
-        self.dataMonkey.DEMA(StockData)
-        self.dataMonkey.EMA(StockData)
-        self.dataMonkey.KAMA(StockData)
-        self.dataMonkey.MAMA(StockData)
-        self.dataMonkey.SAR(StockData)
-        self.dataMonkey.SMA(StockData)
-        self.dataMonkey.TEMA(StockData)
-        self.dataMonkey.TRIMA(StockData)
-        self.dataMonkey.WMA(StockData)
-        self.dataMonkey.ADXR(StockData)
-        self.dataMonkey.AROONOSC(StockData)
-        self.dataMonkey.BOP(StockData)
-        self.dataMonkey.CCI(StockData)
-        self.dataMonkey.CMO(StockData)
-        self.dataMonkey.DX(StockData)
-        self.dataMonkey.MACD(StockData)
-        self.dataMonkey.MINUS_DI(StockData)
-        self.dataMonkey.MINUS_DM(StockData)
-        self.dataMonkey.MOM(StockData)
-        self.dataMonkey.PLUS_DI(StockData)
-        self.dataMonkey.PLUS_DM(StockData)
-        self.dataMonkey.PPO(StockData)
-        self.dataMonkey.ROC(StockData)
-        self.dataMonkey.RSI(StockData)
-        self.dataMonkey.STOCH(StockData)
-        self.dataMonkey.STOCHRSI(StockData)
-        self.dataMonkey.ULTOSC(StockData)
-        self.dataMonkey.WILLR(StockData)
-
-        self.dataMonkey.HT_DCPERIOD(StockData)
-        self.dataMonkey.HT_DCPHASE(StockData)
-        self.dataMonkey.HT_PHASOR(StockData)
-        self.dataMonkey.HT_SINE(StockData)
-        self.dataMonkey.HT_TRENDMODE(StockData)
-        self.dataMonkey.ATRLabel(StockData)
-
-        self.dataMonkey.candlePatterns(StockData)
-        
-        ##Get rid of rows that have empty cells 
+        openVal, high, low, close = [StockData[col].values.astype(np.float64) for col in ['open', 'high', 'low', 'close']]
+        names = self.dataMonkey.getIndicatorNames(features=features)
+        patterns = features is None or 'pattern_name_encoded' in features
+        # column major so every indicator is written to contiguous memory
+        matrix = np.empty((len(StockData), len(names)+int(patterns)), dtype=np.float64, order='F')
+
+        self.dataMonkey.getIndicatorMatrix(openVal, high, low, close, out=matrix[:, :len(names)], features=features)
+        columns = list(names)
+        if patterns:
+            matrix[:, -1] = self.dataMonkey.getCandlePatternCodes(openVal, high, low, close)
+            columns.append('pattern_name_encoded')
+
+        StockData[columns] = pd.DataFrame(matrix, index=StockData.index, columns=columns, copy=False)
+
+        ##Get rid of rows that have empty cells
         StockData.dropna(inplace = True)
+        for col, dtype in intColumns.items():
+            if col in columns:
+                StockData[col] = StockData[col].values.astype(dtype)
+        return StockData
+
+    def matrixToDataFrame(self, matrix, index, columns):
+        """
+            Wraps a feature matrix in a DataFrame dropping the rows that have empty cells.
+            Indicators only have empty cells in their first rows, so the rows kept are
+            usually a slice of the matrix and are not copied.
+        """
+        valid = ~np.isnan(matrix).any(axis=1)
+        first = int(np.argmax(valid)) if valid.any() else len(valid)
+        if valid[first:].all():
+            return pd.DataFrame(matrix[first:], index=index[first:], columns=columns, copy=False)
+        return pd.DataFrame(matrix[valid], index=index[valid], columns=columns)
 
-    def addLabels(self, df, maxTradeCandles):
+    def addLabels(self, df, maxTradeCandles, slMultiple=2, tpMultiple=3):
+        """
+            Adds the trade labels, see getLabels, as the "Actual Direction" and "Direction" columns.
+
+            Parameters:
+                df (DataFrame): data with high, low, close and "ATR Label" columns.
+                maxTradeCandles (int): number of bars a trade can last.
+                slMultiple (float): stop loss distance in "ATR Label" multiples.
+                tpMultiple (float): take profit distance in "ATR Label" multiples.
+        """
         if self.verbose:
             print("Adding Labels.")
-        df["Buy_SL"] = df["close"] - df["ATR Label"]*2
-        df["Buy_TP"] = df["close"] + df["ATR Label"]*3
-        df["Sell_SL"] = df["close"] + df["ATR Label"]*2
-        df["Sell_TP"] = df["close"] - df["ATR Label"]*3
-
-        dfLen = len(df)
-        labels = []
-        acc_dir = []
-        highVal = df.high.values
-        lowVal = df.low.values
-        closeVal = df.close.values
-        buySlVal = df["Buy_SL"].values
-        sellSlVal = df["Sell_SL"].values
-        buyTpVal = df["Buy_TP"].values
-        sellTpVal = df["Sell_TP"].values
-        for currentCandle in range(dfLen):
-            direction = 2
-            accDirection = 2
-            buySlHit = False
-            sellSlHit = False
-            for forwardCandle in range(min(currentCandle+1, dfLen-1), min(currentCandle+maxTradeCandles+1, dfLen-1)):
-                # Do not take consecutive trades
-                if labels[-maxTradeCandles:].count(0) > 0 or labels[-maxTradeCandles:].count(1) > 0:
-                    break
-                # Both SL have been hit so no valid trade
-                if buySlHit and sellSlHit:
-                    break
-                # Buy SL Hit
-                if lowVal[forwardCandle] <= buySlVal[currentCandle]:
-                    buySlHit = True
-                # Sell SL Hit
-                if highVal[forwardCandle] >= sellSlVal[currentCandle]:
-                    sellSlHit = True
-                # Buy TP Hit
-                if highVal[forwardCandle] >= buyTpVal[currentCandle] and not buySlHit:
-                    direction = 1
-                    break
-                # Sell TP Hit
-                if lowVal[forwardCandle] <= sellTpVal[currentCandle] and not sellSlHit:
-                    direction = 0
-                    break
-
-            
-            if direction==2:
-                futureCandle = currentCandle+maxTradeCandles
-                if futureCandle<dfLen:
-                    if closeVal[futureCandle] > closeVal[currentCandle]:
-                        accDirection = 1
-                    elif closeVal[futureCandle] < closeVal[currentCandle]:
-                        accDirection = 0
-            else:
-                accDirection = direction     
-            labels.append(direction)
-            acc_dir.append(accDirection)
-
-
-        df.drop(columns=['Buy_SL', 'Buy_TP', 'Sell_SL', 'Sell_TP'], inplace=True)
+        labels, acc_dir = self.getLabels(df.high.values, df.low.values, df.close.values, df["ATR Label"].values,
+                                         maxTradeCandles, slMultiple, tpMultiple)
         df["Actual Direction"] = acc_dir
         df["Direction"] = labels
 
+    def getLabels(self, high, low, close, atr, maxTradeCandles, slMultiple=2, tpMultiple=3):
+        """
+            Labels every bar with the trade that would have won:
+            1 (buy) or 0 (sell) if its take profit (tpMultiple ATR) is hit in the next maxTradeCandles bars
+            before its stop loss (slMultiple ATR), 2 (hold) otherwise. No trade is labeled within
+            maxTradeCandles bars after another one.
+            The actual direction is the label for trades, for holds it is the direction
+            the close moved after maxTradeCandles bars (2 if it did not move).
+
+            Parameters:
+                high, low, close, atr (array): price and ATR arrays.
+                maxTradeCandles (int): number of bars a trade can last.
+                slMultiple (float): stop loss distance in ATR multiples.
+                tpMultiple (float): take profit distance in ATR multiples.
+
+            Returns:
+                labels (array): 0, 1 or 2 for every bar.
+                acc_dir (array): 0, 1 or 2 for every bar.
+        """
+        dfLen = len(close)
+        labels = self.getLabelMatrix(high, low, close, atr, [(slMultiple, tpMultiple, maxTradeCandles)])[:, 0].astype(np.int64)
+
+        acc_dir = labels.copy()
+        future = np.arange(dfLen) + maxTradeCandles
+        holds = np.flatnonzero((labels == 2) & (future < dfLen))
+        moved = close[holds + maxTradeCandles] - close[holds]
+        acc_dir[holds] = np.where(moved > 0, 1, np.where(moved < 0, 0, 2))
+        return labels, acc_dir
+
+    def labelSweep(self, df, slMultiples, tpMultiples, maxTradeCandles):
+        """
+            Computes the "Direction" labels of every combination of the given stop loss multiples,
+            take profit multiples and trade lengths in one pass over the data, see getLabelMatrix.
+
+            Parameters:
+                df (DataFrame): data with high, low, close and "ATR Label" columns.
+                slMultiples (list): stop loss distances in "ATR Label" multiples.
+                tpMultiples (list): take profit distances in "ATR Label" multiples.
+                maxTradeCandles (list): trade lengths in bars.
+
+            Returns:
+                labels (array): uint8 matrix of 0, 1 or 2 with one row per bar and one column per combination.
+                combos (list): (slMultiple, tpMultiple, maxTradeCandles) of every column.
+        """
+        combos = list(itertools.product(slMultiples, tpMultiples, maxTradeCandles))
+        labels = self.getLabelMatrix(df.high.values, df.low.values, df.close.values, df["ATR Label"].values, combos)
+        return labels, combos
+
+    def getLabelMatrix(self, high, low, close, atr, combos, blockSize=1000000):
+        """
+            Labels every bar like getLabels for several (slMultiple, tpMultiple, maxTradeCandles) combinations.
+            The forward bars are checked one offset at a time for all bars and all stop loss and
+            take profit pairs at once, the trade lengths only decide after which offset a pair's
+            labels are taken, so the whole grid costs max(maxTradeCandles) vectorized steps over
+            the price arrays instead of one labeling run per combination.
+            Only the rule against consecutive trades loops, over the trades taken in each column.
+
+            Parameters:
+                high, low, close, atr (array): price and ATR arrays.
+                combos (list): (slMultiple, tpMultiple, maxTradeCandles) tuples, one per column.
+                blockSize (int): number of label cells worked on at once, bounds the memory used.
+
+            Returns:
+                labels (array): uint8 matrix of 0, 1 or 2 with shape (bars, combinations).
+        """
+        dfLen = len(close)
+        pairs = list(dict.fromkeys((sl, tp) for sl, tp, _ in combos))
+        pairIndex = np.array([pairs.index((sl, tp)) for sl, tp, _ in combos])
+        tradeLength = np.array([maxTrade for _, _, maxTrade in combos])
+        slMultiple, tpMultiple = (np.array(values, dtype=float) for values in zip(*pairs))
+        labels = np.full((dfLen, len(combos)), 2, dtype=np.uint8)
+        rows = max(blockSize//len(pairs), 1)
+        for first in range(0, dfLen, rows):
+            # Forward bars of the block are read up to the longest trade past its end
+            last = min(first+rows, dfLen)
+            price, distance = close[first:last, None], atr[first:last, None]
+            buySl = price - distance*slMultiple
+            buyTp = price + distance*tpMultiple
+            sellSl = price + distance*slMultiple
+            sellTp = price - distance*tpMultiple
+            pairLabels = np.full((last-first, len(pairs)), 2, dtype=np.uint8)
+            pending = np.ones(pairLabels.shape, dtype=bool)   # no take profit hit and not both stop losses
+            buySlHit = np.zeros_like(pending)
+            sellSlHit = np.zeros_like(pending)
+            for offset in range(1, tradeLength.max()+1):
+                # Bars still looking for a take profit, the last bar is never looked at as a forward bar
+                count = min(last, max(dfLen-1-offset, 0)) - first
+                if count > 0:
+                    active = pending[:count]
+                    forwardHigh = high[first+offset:first+offset+count, None]
+                    forwardLow = low[first+offset:first+offset+count, None]
+                    buySlHit[:count] |= active & (forwardLow <= buySl[:count])
+                    sellSlHit[:count] |= active & (forwardHigh >= sellSl[:count])
+                    buy = active & (forwardHigh >= buyTp[:count]) & ~buySlHit[:count]
+                    sell = active & ~buy & (forwardLow <= sellTp[:count]) & ~sellSlHit[:count]
+                    pairLabels[:count][buy] = 1
+                    pairLabels[:count][sell] = 0
+                    active &= ~(buy | sell) & ~(buySlHit[:count] & sellSlHit[:count])
+                cols = np.flatnonzero(tradeLength == offset)
+                labels[first:last, cols] = pairLabels[:, pairIndex[cols]]
+
+        # Do not take consecutive trades, only the trades that are taken are walked:
+        # after taking a trade the next one is the first trade more than maxTrade bars later
+        for col, maxTrade in enumerate(tradeLength.tolist()):
+            trades = np.flatnonzero(labels[:, col] != 2)
+            following = np.searchsorted(trades, trades + maxTrade, side='right').tolist()
+            taken = np.zeros(len(trades), dtype=bool)
+            current = 0
+            while current < len(trades):
+                taken[current] = True
+                current = following[current]
+            labels[trades[~taken], col] = 2
+        return labels
+
     def featureSelection(self, df):
-        dropCols = ['HT_TRENDMODE', 'open', 'high', 'low', 'BBANDS 5_2', 'close', 'DEMA 14', 'TEMA 14',
-                    'BBANDS UB 5_2', 'EMA 14', 'WMA 14', 'BBANDS Lb 5_2', 'TRIMA 14', 'SMA 14', 'MAMA 0.5_0.05',
-                    'FAMA 0.5_0.05', 'KAMA 14', 'SAR 0.02_0.2', 'Fast_K']
-        df.drop(columns=dropCols, inplace=True)
+        """
+            Drops the columns the models are not trained on, columns that were never computed are ignored.
+        """
+        df.drop(columns=dropColumns, inplace=True, errors='ignore')
+
+    def getModelFeatures(self):
+        """
+            Returns the names of the indicator columns the models are trained on, in column order.
+            Passing them to addAllIndicators skips every indicator featureSelection would drop.
+        """
+        names = self.dataMonkey.getIndicatorNames() + ['pattern_name_encoded']
+        return [name for name in names if name not in dropColumns]
 
     def printDirectionAmount(self, stockData):
         """
@@ -265,96 +404,73 @@ class DataHandler:
             print("Splitting Training And Testing Data")
 
         #split df to test and train data
-        times = sorted(StockData.index.values)
-        testDays = times[-int(splitNo*len(times))]
-
-        validation_df=StockData[(StockData.index>=testDays)]
-        main_df=StockData[(StockData.index<testDays)]
+        if not StockData.index.is_monotonic_increasing:
+            times = np.sort(StockData.index.values)
+            testDays = times[-int(splitNo*len(times))]
+            return StockData[(StockData.index<testDays)], StockData[(StockData.index>=testDays)]
+
+        # bars are in time order (csv or OHLC store), so the split is found with a binary search like OHLCStore.getSlice
+        testDays = StockData.index[-int(splitNo*len(StockData))]
+        split = StockData.index.searchsorted(testDays, side='left')
+        main_df=StockData.iloc[:split]
+        validation_df=StockData.iloc[split:]
         return main_df, validation_df
     
-    def preprocess_df(self, df, pair, timeFrame, lookBack=None, isBool=False, raw=True):
+    def preprocess_df(self, df, pair, timeFrame, lookBack=None, isBool=False, raw=True, windowed=False):
+        """
+            Scales the features and turns them into the LSTM look back windows.
+            Without lookBack the saved scaler of the pair is used to scale df for a prediction.
+
+            Parameters:
+                df (DataFrame): features followed by the "Actual Direction" and "Direction" columns.
+                pair, timeFrame (str): name the scaler is saved under.
+                lookBack (int): number of bars in a window.
+                isBool (bool): only use the buy and sell samples, not the holds.
+                raw (bool): keep the class imbalance, otherwise oversample every class to the largest one.
+                windowed (bool): return a WindowDataset over the scaled features instead of the windows,
+                    its epochIndices balance the classes like raw does.
+
+            Returns:
+                x, y, acc_dir (array): shuffled windows (in the DataHandler dtype), labels and actual directions,
+                or a WindowDataset if windowed is true.
+        """
         if lookBack==None:
-            scaler = load(open('Scalers/'+pair+'_'+timeFrame+'.pkl', 'rb'))
-            x = scaler.transform(df.values)
-            return x
+            return self.getScaler(pair, timeFrame).transform(df.to_numpy(dtype=self.dtype))
 
         if self.verbose:
             print("Preprocessing your pandas dataframe:")
             print("\tReshapping Data To Numpy Arrays For Model.")
             print("\tScaling dataset.")
-        scaler = MinMaxScaler()
-        x_data = scaler.fit_transform(df[df.columns[:-2]].values)
+        # The features are copied once into the feature dtype and scaled in place
+        scaler = MinMaxScaler(copy=False)
+        x_data = scaler.fit_transform(df[df.columns[:-2]].to_numpy(dtype=self.dtype))
         y_data = df[df.columns[-1]].values
         acc_dir = df[df.columns[-2]].values
-        dump(scaler, open('Scalers/'+pair+'_'+timeFrame+'.pkl', 'wb'))
+        with open('Scalers/'+pair+'_'+timeFrame+'.pkl', 'wb') as scalerFile:
+            dump(scaler, scalerFile)
         
         if self.verbose:
             print("\tAdding LSTM look back period.")
-        sequential_data = []
-        dataLen = x_data.shape[0]
-        # Loop of the entire data set
-        for i in range(dataLen):
-            end_ix = i + lookBack
-            if end_ix >= dataLen:
-                break
-            # Append the list with sequencies
-            sequential_data.append([x_data[i:end_ix], acc_dir[end_ix], y_data[end_ix]])
-        
+        dataset = WindowDataset(x_data, y_data, acc_dir, lookBack, isBool, None if raw else "over", scaler)
+        if windowed:
+            return dataset
         
         if self.verbose:
             print("\tOversampling to balance dataset.")
-        calls = []
-        puts = []
-        holds = []
-        
-        for seq, acc_dir, target in sequential_data:
-            if target==1:
-                calls.append([seq, acc_dir, target])
-            elif target==0:
-                puts.append([seq, acc_dir, target])
-            elif target==2 and not isBool:
-                holds.append([seq, acc_dir, target])
-        
-        random.shuffle(calls)
-        random.shuffle(puts)
-        if not isBool:
-            random.shuffle(holds)
-        
-        if not isBool:
-            high = max(len(calls), len(puts), len(holds))
-        else:
-            high = max(len(calls), len(puts))
-
-        if not raw:
-            calls = calls*(math.ceil(high/len(calls)))
-            puts = puts*(math.ceil(high/len(puts)))
-            if not isBool:
-                holds = holds*(math.ceil(high/len(holds)))
-
-            calls = calls[:high]
-            puts = puts[:high]
-            if not isBool:
-                holds = holds[:high]
+        indices = dataset.epochIndices()
         
         if self.verbose:
-            print("\tSaving to numpy arrays. (RAM Intensive)")
-        
-        if not isBool:
-            sequential_data = calls+puts+holds
-        else:
-            sequential_data = calls+puts
-        random.shuffle(sequential_data)
-    
-        x = []
-        y = []
-        acc_dirRet = []
-        for seq, acc_dir, target in sequential_data:
-            x.append(seq)
-            acc_dirRet.append(acc_dir)
-            y.append(target)
-
-        return np.array(x, dtype=np.float64), np.array(y, dtype=np.uint8), np.array(acc_dirRet, dtype=np.uint8)
+            print("\tSaving to numpy arrays.")
+        return dataset.getArrays(indices, self.dtype)
     
+    def getScaler(self, pair, timeFrame):
+        """
+            Returns the saved scaler of a pair as a ScalerTransform, through the process wide artifact
+            cache so the file is only read again when it changes.
+        """
+        path = 'Scalers/'+pair+'_'+timeFrame+'.pkl'
+        return sharedArtifactCache.get(path, lambda path: ScalerTransform(loadPickle(path), self.dtype), (path, np.dtype(self.dtype).name))
+
     def oneHotEncode(self, a):
         """
             Turns a array of labels into a one hot encoded format
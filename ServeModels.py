@@ -0,0 +1,15 @@
+#import libraries
+import os
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # or any {'0', '1', '2'}
+
+##Costume Library serving the models to the charts of the EA
+from Libraries.SignalServer import SignalServer
+
+
+if __name__ == "__main__":
+    address = ("127.0.0.1", 5555)   # or a path for a Unix socket
+    server = SignalServer(address, backend="keras")     # maxBatch=64 batches the models, see benchmarkSignalServer
+    for name, error in server.loadChannels().items():
+        print(name, "not served:", error)
+    print("Serving", sorted(server.channels), "on", server.address)
+    server.serve()
@@ -1,11 +1,13 @@
 #import libraries
 import numpy as np
-import os
+import os, json, hashlib
+from pickle import dump
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # or any {'0', '1', '2'}
 
 ##Costume Library to manipulate data and add indicators
 from Libraries.Utils import DataHandler
 from Libraries.KerasCustom import *
+from Libraries.Datasets import WindowDataset, saveShards, loadShards
 
 ##Artificial Intelligence Library
 from tensorflow.keras.models import Sequential, load_model
@@ -24,6 +26,8 @@ class ForexModels:
         self.pair = pair          #['GBPUSD','EURUSD','USDCHF','USDJPY']
 
         self.trade_length = 3
+        self.sl_multiple = 2       # stop loss and take profit in "ATR Label" multiples
+        self.tp_multiple = 3
         self.look_back = 96
 
         self.batch_size = 64
@@ -31,6 +35,9 @@ class ForexModels:
         self.epochs = 10
 
         self.loadModel = False
+        self.streamData = False   # feed the model from a WindowPipeline instead of materialized windows
+        self.useShards = False    # with streamData, save the windows to Shards/ and reuse them while the data and settings are unchanged
+        self.shardDtype = None    # e.g. np.float16 to store the shards in half the space
 
     def countUnique(self, a, oneHot = True):
         retStr = ""
@@ -86,16 +93,23 @@ class ForexModels:
         return callbacks
 
     def trainModel(self, model, train_x, train_y, validation_x=None, validation_y=None, callbacks=None, classWeights=None):
+        # Stream WindowDatasets through an input pipeline
+        batchSize = self.batch_size
+        if isinstance(train_x, WindowDataset):
+            pipeline = WindowPipeline(train_x, self.batch_size)
+            train_x, train_y = pipeline.getDataset(), None
+            batchSize = None        # the tf.data.Dataset is already batched, Keras does not take a batch_size with it
+            callbacks = (callbacks or []) + [ThroughputCallback(pipeline)]
+        if isinstance(validation_x, WindowDataset):
+            validation_x = WindowPipeline(validation_x, self.batch_size).getDataset()
+
         # Train model
         val = (validation_x, validation_y)
-        try:
-            if validation_x==None:
-                val = None
-        except:
-            pass
+        if validation_y is None:
+            val = validation_x
         history = model.fit(
             train_x, train_y,
-            batch_size=self.batch_size,
+            batch_size=batchSize,
             epochs=self.epochs,
             validation_data=val,
             callbacks=callbacks,
@@ -104,10 +118,16 @@ class ForexModels:
         return history, model
 
     def collectData(self):
+        # Reuse the windows of an earlier run
+        if self.streamData and self.useShards:
+            datasets = self.loadShards()
+            if datasets != None:
+                return self.describeWindows(*datasets)
+
         # Get Data And Add Labels
         stockData = self.dataHandler.getFullData(self.pair, self.timeFrame)
-        self.dataHandler.addAllIndicators(stockData)
-        self.dataHandler.addLabels(stockData, self.trade_length)
+        stockData = self.dataHandler.addAllIndicators(stockData, self.dataHandler.getModelFeatures())
+        self.dataHandler.addLabels(stockData, self.trade_length, self.sl_multiple, self.tp_multiple)
         self.dataHandler.featureSelection(stockData)
         self.dataHandler.printDirectionAmount(stockData)
 
@@ -117,6 +137,8 @@ class ForexModels:
             print("Train Start:", df_train.index[0], "Train End:", df_train.index[-1])
             print("Test Start:", df_test.index[0], "Test End:", df_test.index[-1])
             print()
+            if self.streamData:
+                return self.collectWindows(df_train, df_test)
             X_train, y_train, acc_dir_train =  self.dataHandler.preprocess_df(df_train, self.pair, self.timeFrame, self.look_back)
             X_test, y_test, acc_dir_test = self.dataHandler.preprocess_df(df_test, self.pair, self.timeFrame, self.look_back)
             classWeights = self.dataHandler.getLabelWeights(y_train)
@@ -131,6 +153,8 @@ class ForexModels:
             df_train = stockData
             print("Train Start:", df_train.index[0], "Train End:", df_train.index[-1])
             print()
+            if self.streamData:
+                return self.collectWindows(df_train)
             X_train, y_train, acc_dir_train =  self.dataHandler.preprocess_df(df_train, self.pair, self.timeFrame, self.look_back)
             X_test, y_test, acc_dir_test = None, None, None
             classWeights = self.dataHandler.getLabelWeights(y_train)
@@ -142,6 +166,57 @@ class ForexModels:
         
         return X_train, y_train, acc_dir_train, X_test, y_test, acc_dir_test, classWeights
 
+    def collectWindows(self, df_train, df_test=None):
+        # Keep the windows as WindowDatasets, trainModel streams them to the model
+        train = self.dataHandler.preprocess_df(df_train, self.pair, self.timeFrame, self.look_back, windowed=True)
+        test = None
+        if df_test is not None:
+            test = self.dataHandler.preprocess_df(df_test, self.pair, self.timeFrame, self.look_back, windowed=True)
+
+        if self.useShards:
+            fingerprint = self.getFingerprint()
+            for name, dataset in [("train", train), ("test", test)]:
+                if dataset is not None:
+                    saveShards(self.getShardPath(name), dataset, df_train.columns[:-2], fingerprint,
+                               storageDtype=self.shardDtype, pair=self.pair, timeFrame=self.timeFrame)
+        return self.describeWindows(train, test)
+
+    def describeWindows(self, train, test=None):
+        classWeights = self.dataHandler.getLabelWeights(train.y[train.indices])
+        print()
+        print("Class Weights:", classWeights)
+        print("X_train:", train.shape, " Class distribution:", self.countUnique(train.y[train.indices], False))
+        if test is None:
+            return train, None, train.acc_dir[train.indices], None, None, None, classWeights
+
+        print("X_test:", test.shape, " Class distribution:", self.countUnique(test.y[test.indices], False))
+        return train, None, train.acc_dir[train.indices], test, None, test.acc_dir[test.indices], classWeights
+
+    def getShardPath(self, name):
+        return "Shards/"+self.pair+"_"+self.timeFrame+"/"+name+"/"
+
+    def getFingerprint(self):
+        # The source csv and every setting the windows depend on
+        source = self.dataHandler.dataMonkey.getSourceFingerprint(self.pair, self.dataHandler.isTickData)
+        settings = [self.timeFrame, self.look_back, self.trade_length, self.sl_multiple, self.tp_multiple,
+                    self.testSplitPCT, self.dataHandler.getModelFeatures(), self.dataHandler.dtype, self.shardDtype]
+        return hashlib.sha1(json.dumps([source, settings], default=str).encode()).hexdigest()
+
+    def loadShards(self):
+        # Opens the windows saved by an earlier run, None if they are missing or out of date
+        fingerprint = self.getFingerprint()
+        datasets = [loadShards(self.getShardPath("train"), fingerprint)]
+        if self.testSplitPCT>0:
+            datasets.append(loadShards(self.getShardPath("test"), fingerprint))
+        if None in datasets:
+            return None
+
+        print("Using the saved windows in", "Shards/"+self.pair+"_"+self.timeFrame)
+        # the live path scales with the scaler fitted on the training windows
+        with open('Scalers/'+self.pair+'_'+self.timeFrame+'.pkl', 'wb') as scalerFile:
+            dump(datasets[0].getScaler(), scalerFile)
+        return datasets
+
     def runModel(self, X_train, y_train, acc_dir_train, X_test, y_test, acc_dir_test, classWeights):
         # Run Model
         if self.loadModel:
@@ -0,0 +1,3 @@
+##The tests import the Libraries and tests.helpers from the root of the repository
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,135 @@
+##Synthetic market data for the tests and Benchmarks.py, and the previous implementations
+##of the optimized code that the tests compare against
+import numpy as np
+import pandas as pd
+import talib
+from Libraries.ForexMonkey import candleNames, singleColumn
+
+def makeMinuteData(rows, start='2010-01-01'):
+    """
+        Creates a synthetic random walk of 1 minute OHLCV bars.
+
+        Parameters:
+            rows (int): number of bars.
+            start (str): time of the first bar.
+
+        Returns:
+            data (DataFrame): bars indexed by DateTime with open, high, low, close and volume columns.
+    """
+    rng = np.random.default_rng(0)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0002, rows))
+    openVal = np.concatenate([[close[0]], close[:-1]])
+    high = np.maximum(openVal, close) + rng.random(rows)*0.0003
+    low = np.minimum(openVal, close) - rng.random(rows)*0.0003
+    volume = rng.integers(1, 500, rows)
+    index = pd.date_range(start, periods=rows, freq='1min', name='DateTime')
+    return pd.DataFrame({'Open': openVal, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def makeTickData(rows, start='2010-01-01'):
+    """
+        Creates synthetic ticks, irregularly spaced a few seconds apart.
+
+        Returns:
+            data (DataFrame): ticks indexed by DateTime with Bid and Volume columns.
+    """
+    rng = np.random.default_rng(0)
+    seconds = np.cumsum(rng.integers(1, 8, rows))
+    index = pd.DatetimeIndex(pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s'), name='DateTime')
+    bid = 1.1 + np.cumsum(rng.normal(0, 0.00005, rows))
+    volume = rng.integers(1, 10, rows)
+    return pd.DataFrame({'Bid': bid, 'Volume': volume}, index=index)
+
+
+def addIndicatorsNoDrop(dataHandler, data, patterns=True):
+    """
+        Adds every indicator of DataHandler.addAllIndicators one DataFrame column at a time,
+        the way it used to be done, without dropping the warm up rows.
+    """
+    dataMonkey = dataHandler.dataMonkey
+    for name in ['BBANDS', 'DEMA', 'EMA', 'KAMA', 'MAMA', 'SAR', 'SMA', 'TEMA', 'TRIMA', 'WMA', 'ADXR', 'AROONOSC',
+                 'BOP', 'CCI', 'CMO', 'DX', 'MACD', 'MINUS_DI', 'MINUS_DM', 'MOM', 'PLUS_DI', 'PLUS_DM', 'PPO', 'ROC',
+                 'RSI', 'STOCH', 'STOCHRSI', 'ULTOSC', 'WILLR', 'HT_DCPERIOD', 'HT_DCPHASE', 'HT_PHASOR', 'HT_SINE',
+                 'HT_TRENDMODE', 'ATRLabel']:
+        getattr(dataMonkey, name)(data)
+    if patterns:
+        dataMonkey.candlePatterns(data)
+
+
+def candlePatternsRowWise(openVal, high, low, close):
+    """
+        The previous candle pattern encoding, singleColumn applied to every row.
+    """
+    patternDF = pd.DataFrame(index=range(len(close)))
+    for candle in candleNames:
+        patternDF[candle] = getattr(talib, candle)(openVal, high, low, close)
+    return patternDF.apply(lambda row: singleColumn(row, patternDF.columns, True), axis=1).values
+
+
+def getLabelsLoop(high, low, close, atr, maxTradeCandles):
+    """
+        The previous DataHandler.addLabels, a Python loop over every bar and its forward bars.
+    """
+    buySlVal, buyTpVal = close - atr*2, close + atr*3
+    sellSlVal, sellTpVal = close + atr*2, close - atr*3
+    dfLen = len(close)
+    labels = []
+    acc_dir = []
+    for currentCandle in range(dfLen):
+        direction = 2
+        accDirection = 2
+        buySlHit = False
+        sellSlHit = False
+        for forwardCandle in range(min(currentCandle+1, dfLen-1), min(currentCandle+maxTradeCandles+1, dfLen-1)):
+            if labels[-maxTradeCandles:].count(0) > 0 or labels[-maxTradeCandles:].count(1) > 0:
+                break
+            if buySlHit and sellSlHit:
+                break
+            if low[forwardCandle] <= buySlVal[currentCandle]:
+                buySlHit = True
+            if high[forwardCandle] >= sellSlVal[currentCandle]:
+                sellSlHit = True
+            if high[forwardCandle] >= buyTpVal[currentCandle] and not buySlHit:
+                direction = 1
+                break
+            if low[forwardCandle] <= sellTpVal[currentCandle] and not sellSlHit:
+                direction = 0
+                break
+        if direction==2:
+            futureCandle = currentCandle+maxTradeCandles
+            if futureCandle<dfLen:
+                if close[futureCandle] > close[currentCandle]:
+                    accDirection = 1
+                elif close[futureCandle] < close[currentCandle]:
+                    accDirection = 0
+        else:
+            accDirection = direction
+        labels.append(direction)
+        acc_dir.append(accDirection)
+    return np.array(labels), np.array(acc_dir)
+
+
+def windowsLoop(x_data, y_data, acc_dir, lookBack):
+    """
+        The previous DataHandler.preprocess_df windowing, a list of window slices turned into one array.
+    """
+    sequential_data = []
+    dataLen = x_data.shape[0]
+    for i in range(dataLen):
+        end_ix = i + lookBack
+        if end_ix >= dataLen:
+            break
+        sequential_data.append([x_data[i:end_ix], acc_dir[end_ix], y_data[end_ix]])
+    x = np.array([seq for seq, _, _ in sequential_data], dtype=np.float64)
+    return x, np.array([target for _, _, target in sequential_data], dtype=np.uint8), np.array([acc for _, acc, _ in sequential_data], dtype=np.uint8)
+
+
+def makeLSTMModel(lookBack=96, features=30):
+    """
+        Creates the LSTM of ForexModels.createAIModel with random weights.
+    """
+    import tensorflow as tf
+    tf.keras.utils.set_random_seed(0)
+    return tf.keras.Sequential([tf.keras.layers.LSTM(100, input_shape=(lookBack, features), return_sequences=True),
+                                tf.keras.layers.Dropout(0.1), tf.keras.layers.LSTM(30), tf.keras.layers.Dropout(0.1),
+                                tf.keras.layers.Dense(3, activation="softmax")])
@@ -0,0 +1,21 @@
+import numpy as np
+
+from Libraries.StreamingIndicators import IndicatorEngine
+from Libraries.BarHistory import BarHistory, getBarArrays
+from tests.helpers import makeMinuteData
+
+def test_deltas_give_the_features_of_a_full_seed():
+    data = makeMinuteData(600)
+    data.columns = data.columns.str.lower()
+    data = data[['open', 'high', 'low', 'close']]
+    times, values = getBarArrays(data)
+    barHistory = BarHistory(512)
+    barHistory.seed(times[:300], values[:300])
+    for position in range(300, len(data)):
+        assert barHistory.update(times[position-1:position+1], values[position-1:position+1]) == 1
+    reference = IndicatorEngine()
+    reference.seed(data)
+    assert np.array_equal(barHistory.getFeatures(96), reference.getFeatures(96))
+    assert barHistory.engine.getFeatureFrame(96).equals(reference.getFeatureFrame(96))
+    assert barHistory.update(times[-3:], values[-3:]) == 0          # bars already seen
+    assert barHistory.update(times[5:7], values[5:7]) == None       # bars that do not continue the history
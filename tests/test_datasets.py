@@ -0,0 +1,33 @@
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+from Libraries.Datasets import WindowDataset, saveShards, loadShards
+
+def makeDataset(rows=5000, features=8, lookBack=96, **kwargs):
+    rng = np.random.default_rng(0)
+    y = rng.choice(3, rows, p=[0.1, 0.15, 0.75])
+    return WindowDataset(rng.random((rows, features)), y, y, lookBack, **kwargs)
+
+def test_epochs_are_balanced():
+    dataset = makeDataset(balance="over")
+    largest = max(len(indices) for indices in dataset.classIndices)
+    smallest = min(len(indices) for indices in dataset.classIndices)
+    for _ in range(3):
+        assert (np.bincount(dataset.y[dataset.epochIndices()]) == largest).all()
+        assert (np.bincount(dataset.y[dataset.epochIndices("under")]) == smallest).all()
+
+def test_shards_give_the_same_batches(tmp_path):
+    rng = np.random.default_rng(0)
+    raw = rng.random((5000, 8))
+    scaler = MinMaxScaler()
+    y = rng.choice(3, len(raw), p=[0.1, 0.15, 0.75])
+    dataset = WindowDataset(scaler.fit_transform(raw), y, y, 96, scaler=scaler)
+    saveShards(str(tmp_path), dataset, ["f%d" % i for i in range(8)], "source", 1000, pair='EURUSD')
+    shards = loadShards(str(tmp_path), "source")
+    assert loadShards(str(tmp_path), "changed") is None
+
+    edges = np.array([0, 999, 1000, len(dataset.y)-1])       # windows at the shard edges
+    for indices in [edges, dataset.getIndices()[:640]]:
+        for value, result in zip(dataset.getBatch(indices), shards.getBatch(indices)):
+            assert np.array_equal(value, result)
+    assert np.array_equal(shards.getScaler().transform(raw[:1000]), dataset.x[:1000])
@@ -0,0 +1,17 @@
+import threading
+
+from Libraries.FileWatcher import FileWatcher
+
+def test_watcher_reports_a_write_once(tmp_path):
+    path = str(tmp_path / 'BackTestData.csv')
+    for useEvents in [False, True]:
+        watcher = FileWatcher([path], useEvents=useEvents)
+        try:
+            assert watcher.wait(0.05) == []
+            writer = threading.Timer(0.05, lambda: open(path, 'a').write("bar\n"))
+            writer.start()
+            assert watcher.wait(5) == [path]
+            writer.join()
+            assert watcher.wait(0.05) == []         # the change was reported already
+        finally:
+            watcher.stop()
@@ -0,0 +1,97 @@
+import os
+import numpy as np
+import pandas as pd
+
+from Libraries.ForexMonkey import Data, FrameCache, indicatorRegistry
+from Libraries.Utils import DataHandler
+from tests.helpers import makeMinuteData, makeTickData, addIndicatorsNoDrop, candlePatternsRowWise
+
+def test_csv_cache_round_trip(tmp_path):
+    csvPath = str(tmp_path / 'EURUSD.csv')
+    makeMinuteData(5000).to_csv(csvPath)
+    expected = pd.read_csv(csvPath, index_col=['DateTime'], parse_dates=['DateTime'])
+    dataMonkey = Data()
+    assert expected.equals(dataMonkey.readCSVCached(csvPath))     # parses the csv and writes the cache
+    assert expected.equals(dataMonkey.readCSVCached(csvPath))     # reads the cache
+
+def test_store_update_reads_only_the_csv_tail(tmp_path, monkeypatch):
+    os.makedirs(tmp_path / 'Data' / 'Minute')
+    os.mkdir(tmp_path / 'run')
+    monkeypatch.chdir(tmp_path / 'run')
+    csvPath = '../Data/Minute/EURUSD.csv'
+    data = makeMinuteData(5000)
+    data.iloc[:3000].to_csv(csvPath)
+    dataHandler = DataHandler(verbose=0, useStore=True)
+    dataHandler.getFullData('EURUSD', '7Min')           # 7Min bins do not restart at midnight
+    data.iloc[3000:].to_csv(csvPath, mode='a', header=False)
+    stored = dataHandler.getFullData('EURUSD', '7Min')
+    assert stored.equals(Data().getDataCSV('EURUSD', '7Min').astype(np.float64))
+
+    expected = pd.read_csv(csvPath, index_col=['DateTime'], parse_dates=['DateTime']).iloc[4321:]
+    assert Data().readCSVTail(csvPath, data.index[4321], blockSize=100).equals(expected)
+
+def test_frame_cache_evicts_the_least_recently_used_frame():
+    frames = [makeMinuteData(1000, start) for start in ['2010-01-01', '2011-01-01', '2012-01-01']]
+    size = int(frames[0].memory_usage(index=True).sum())
+    frameCache = FrameCache(maxBytes=2*size)
+    frameCache.put('a', frames[0])
+    frameCache.put('b', frames[1])
+    assert frameCache.get('a') is frames[0]        # 'b' is now the least recently used
+    frameCache.put('c', frames[2])
+    assert frameCache.get('b') is None and frameCache.get('a') is frames[0] and frameCache.get('c') is frames[2]
+    assert frameCache.getStats()['evictions'] == 1 and frameCache.bytes == 2*size
+    frameCache.put('d', makeMinuteData(3000))      # larger than the whole budget, not cached
+    assert frameCache.get('d') is None and frameCache.getStats()['frames'] == 2
+
+def test_tick_chunks_stitch_into_the_same_bars(tmp_path):
+    makeTickData(50000).to_csv(tmp_path / 'EURUSD.csv')
+    ticks = pd.read_csv(tmp_path / 'EURUSD.csv', index_col=['DateTime'], parse_dates=['DateTime'])
+    expected = ticks.resample('5Min').agg({'Bid': 'ohlc', 'Volume': 'sum'})
+    expected.columns = expected.columns.droplevel()
+    expected = expected.dropna()
+    streamed = pd.concat(list(Data().streamTickBars('EURUSD', '5Min', 1000, str(tmp_path)+'/')))    # bars cut by most chunks
+    assert np.array_equal(expected.values, streamed.values) and expected.index.equals(streamed.index)
+
+def test_multi_time_frame_matches_one_resample_each():
+    timeFrames = ('1Min', '5Min', '15Min', '1H', '1D')
+    raw = makeMinuteData(20000)
+    raw.columns = raw.columns.str.lower()
+    separate = Data(frameCache=FrameCache())
+    separate.frameCache.put(('EURUSD', None, False), raw)
+    together = Data(frameCache=FrameCache())
+    together.frameCache.put(('EURUSD', None, False), raw)
+    bars = together.getMultiTimeFrameData('EURUSD', timeFrames, True)
+    for timeFrame in timeFrames:
+        assert separate.getDataCSV('EURUSD', timeFrame, True).equals(bars[timeFrame])
+
+def test_indicator_matrix_matches_dataframe_columns():
+    data = makeMinuteData(3000)
+    data.columns = data.columns.str.lower()
+    data = data[['open', 'high', 'low', 'close']]
+    dataHandler = DataHandler(verbose=0)
+    names = [name for columns, _, _, _ in indicatorRegistry for name in columns]
+    expected = data.copy()
+    addIndicatorsNoDrop(dataHandler, expected, False)
+    expected.dropna(inplace=True)
+
+    values = np.empty((len(data), 4+len(names)), dtype=np.float64, order='F')
+    values[:, :4] = data.values
+    dataHandler.dataMonkey.getIndicatorMatrix(*[data[col].values for col in data.columns], out=values[:, 4:])
+    result = dataHandler.matrixToDataFrame(values, data.index, list(data.columns)+names)
+    assert list(expected.columns) == list(result.columns) and expected.index.equals(result.index)
+    assert np.array_equal(expected.values, result.values)     # HT_TRENDMODE is an int column in the old path so compare values
+
+def test_candle_pattern_codes_match_row_wise_encoding():
+    data = makeMinuteData(3000)
+    prices = [data[col].values for col in ['Open', 'High', 'Low', 'Close']]
+    assert np.array_equal(candlePatternsRowWise(*prices), Data().getCandlePatternCodes(*prices))
+
+def test_parallel_indicators_are_identical():
+    data = makeMinuteData(20000)
+    prices = [data[col].values for col in ['Open', 'High', 'Low', 'Close']]
+    outputs = []
+    for workers in [1, 3]:
+        dataMonkey = Data(workers=workers)
+        matrix, _ = dataMonkey.getIndicatorMatrix(*prices)
+        outputs.append((matrix.tobytes(), dataMonkey.getCandlePatternCodes(*prices).tobytes()))
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,58 @@
+import os
+import numpy as np
+
+from Libraries.Utils import DataHandler
+from Libraries.Datasets import saveShards, loadShards
+from Libraries.Inference import InferenceSession, BatchSession
+from tests.helpers import makeMinuteData, makeLSTMModel
+
+def getWindows(count, lookBack=96, features=30):
+    return np.random.default_rng(0).random((count, lookBack, features)).astype(np.float32)
+
+def test_float32_and_float16_features_predict_like_float64(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("Scalers")
+    data = makeMinuteData(5000)
+    data.columns = [col.lower() for col in data.columns]
+    features = {}
+    for dtype in [np.float64, np.float32]:
+        dataHandler = DataHandler(verbose=0, dtype=dtype)
+        df = dataHandler.addAllIndicators(data[['open', 'high', 'low', 'close']], dataHandler.getModelFeatures())
+        dataHandler.addLabels(df, 3)
+        dataHandler.featureSelection(df)
+        features[dtype] = dataHandler.preprocess_df(df, 'EURUSD', '1Min', 96, windowed=True)
+    saveShards("Shards", features[np.float32], df.columns[:-2], storageDtype=np.float16)
+    features[np.float16] = loadShards("Shards")
+
+    indices = features[np.float64].getIndices()[:500]
+    expected = features[np.float64].getBatch(indices)[0]
+    model = makeLSTMModel(*expected.shape[1:])
+    reference = model.predict(expected, verbose=0)
+    for dtype in [np.float32, np.float16]:
+        prediction = model.predict(features[dtype].getBatch(indices)[0], verbose=0)
+        assert np.abs(prediction - reference).max() < 0.001
+
+def test_session_predicts_like_the_model():
+    model = makeLSTMModel()
+    session = InferenceSession(model)
+    for x in getWindows(5):
+        assert np.allclose(model.predict(x[np.newaxis], verbose=0)[0], session.predict(x), atol=1e-6)
+
+def test_tflite_export_predicts_like_keras(tmp_path):
+    import ExportModels
+    path = str(tmp_path / "EURUSD_1Min.h5")
+    makeLSTMModel().save(path)
+    error, agreement = ExportModels.exportModel(path, samples=50)
+    assert error < 1e-4 and agreement == 1
+    error, agreement = ExportModels.exportModel(path, "int8", samples=50)
+    assert agreement > 0.95
+
+def test_batch_session_predicts_like_every_model():
+    models = [makeLSTMModel() for _ in range(3)]
+    for position, model in enumerate(models):
+        model.set_weights([weight*(1 + 0.05*position) for weight in model.get_weights()])
+    session = BatchSession(models)
+    windows = getWindows(7)
+    positions = [2, 0, 1, 1, 0, 2, 2]
+    expected = [models[position].predict(x[np.newaxis], verbose=0)[0] for x, position in zip(windows, positions)]
+    assert np.allclose(session.predict(windows, positions), expected, atol=1e-5)
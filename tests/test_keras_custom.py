@@ -0,0 +1,19 @@
+import numpy as np
+
+from Libraries.Datasets import WindowDataset
+from Libraries.KerasCustom import WindowPipeline
+
+def test_pipeline_batches_are_the_dataset_windows():
+    rng = np.random.default_rng(0)
+    y = rng.choice(3, 5000, p=[0.1, 0.15, 0.75])
+    dataset = WindowDataset(rng.random((5000, 8)), y, y, 96, balance="over")
+    pipeline = WindowPipeline(dataset, 64)
+    indices = dataset.indices[:64]
+    x, oneHot = pipeline.loadBatch(indices)
+    assert np.array_equal(x, dataset.getArrays(indices)[0])
+    assert np.array_equal(oneHot.argmax(axis=1), dataset.y[indices])
+    assert len(pipeline.readyTimes) == 1
+
+    batches = list(pipeline.getDataset())
+    assert len(batches) == len(pipeline)
+    assert sum(len(x) for x, _ in batches) == pipeline.epochSize
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from Libraries.OHLCStore import OHLCStore
+from tests.helpers import makeMinuteData
+
+def getBars(rows):
+    data = makeMinuteData(rows)
+    data.columns = data.columns.str.lower()
+    return data.astype(np.float64)      # the store keeps the volume as a float
+
+def test_append_refreshes_the_last_bar_and_adds_the_new_ones(tmp_path):
+    data = getBars(200)
+    store = OHLCStore(str(tmp_path / 'EURUSD_1Min.ohlc'))
+    first = data.iloc[:100].copy()
+    first.iloc[-1, first.columns.get_loc('close')] += 0.01     # the last bar was still forming when stored
+    assert store.append(first) == 100
+    assert store.append(data.iloc[90:150]) == 50                  # overlaps the stored bars
+    assert store.append(data.iloc[:150]) == 0
+    assert store.getLastTime() == data.index[149]
+    assert store.getDataFrame(volume_in=True).equals(data.iloc[:150])
+    frame = store.getDataFrame()
+    assert np.shares_memory(frame.values, store.records)       # a view of the mapped file
+    with pytest.raises(ValueError):
+        frame.iloc[0, 0] = 1.0
+
+    reopened = OHLCStore(store.path)
+    assert len(reopened) == 150
+    assert reopened.getDataFrame(data.index[10], data.index[20]).equals(data.iloc[10:21, :4])
+    assert np.array_equal(reopened.getRecords()['close'], data['close'].values[:150])
@@ -0,0 +1,36 @@
+import threading
+import numpy as np
+import pandas as pd
+
+from Libraries.SharedMemory import SharedBarRing, EASimulator
+from tests.helpers import makeMinuteData
+
+def getBars(rows):
+    data = makeMinuteData(rows)
+    data.columns = data.columns.str.lower()
+    return data.astype(np.float64)
+
+def test_ring_round_trip(tmp_path):
+    path = str(tmp_path / 'LazyEA.ring')
+    data = getBars(100)
+    ring = SharedBarRing(path, capacity=64, create=True)
+    received = []
+
+    def respond():
+        ring.setReady()
+        while not ring.isDone():
+            seq = ring.waitRequest(0.25)
+            if seq != None:
+                received.append(ring.getBars(seq, 1))
+                ring.respond(seq, seq % 3)
+
+    responder = threading.Thread(target=respond)
+    responder.start()
+    directions = EASimulator(path, data, history=40).run(timeout=10)
+    responder.join()
+
+    assert directions == [seq % 3 for seq in range(41, 101)]
+    assert pd.concat(received).equals(data.iloc[40:, :4])    # the bar of every request
+    assert ring.getBars(100, 10).equals(data.iloc[90:, :4])
+    assert ring.getRecords(0, 10) is None           # overwritten, the ring keeps the last 64 bars
+    ring.close()
@@ -0,0 +1,42 @@
+import os, threading
+import numpy as np
+from pickle import dump
+from sklearn.preprocessing import MinMaxScaler
+
+from Libraries.SignalServer import SignalServer, SignalClient
+from tests.helpers import makeMinuteData, makeLSTMModel
+
+def test_batched_and_unbatched_servers_give_the_same_directions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("Models")
+    os.mkdir("Scalers")
+    pairs = ['EURUSD', 'GBPUSD', 'USDJPY']
+    rng = np.random.default_rng(0)
+    for position, pair in enumerate(pairs):
+        model = makeLSTMModel()
+        model.set_weights([weight*(1 + 0.05*position) for weight in model.get_weights()])
+        model.save(os.path.join("Models", pair+"_1Min.h5"))
+        with open(os.path.join("Scalers", pair+"_1Min.pkl"), 'wb') as scalerFile:
+            dump(MinMaxScaler().fit(rng.random((1000, 30))*100), scalerFile)
+    data = makeMinuteData(330)
+    data.columns = [column.lower() for column in data.columns]
+
+    results = []
+    for maxBatch, batchWindow in [(1, 0.0), (64, 0.005)]:
+        server = SignalServer(maxBatch=maxBatch, batchWindow=batchWindow)
+        assert not server.loadChannels()
+        server.start()
+        try:
+            clients = [SignalClient(server.address, pair+"_1Min") for pair in pairs]
+            threads = [threading.Thread(target=client.run, args=(data,)) for client in clients]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            results.append([client.directions for client in clients])
+            for client in clients:
+                client.close()
+        finally:
+            server.stop()
+        assert all(len(directions) == 30 and None not in directions for directions in results[-1])
+    assert results[0] == results[1]
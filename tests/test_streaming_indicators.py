@@ -0,0 +1,52 @@
+import numpy as np
+
+from Libraries.StreamingIndicators import IndicatorEngine
+from Libraries.Utils import DataHandler
+from tests.helpers import makeMinuteData, addIndicatorsNoDrop
+
+def getBars(rows):
+    data = makeMinuteData(rows)
+    data.columns = data.columns.str.lower()
+    return data[['open', 'high', 'low', 'close']]
+
+def maxError(engine, bars):
+    """
+        Largest relative difference between the rows of the engine and the batch TA-Lib indicators of bars.
+    """
+    incremental = engine.rows[engine.start:engine.end]
+    batch = bars.copy()
+    addIndicatorsNoDrop(DataHandler(verbose=0), batch)
+    assert list(batch.columns) == engine.columns
+    batch = batch.values[-len(incremental):]
+    assert np.array_equal(np.isnan(incremental), np.isnan(batch))
+    valid = ~np.isnan(batch)
+    return (np.abs(incremental[valid]-batch[valid])/np.maximum(1, np.abs(batch[valid]))).max()
+
+def test_engine_matches_talib_on_the_whole_series():
+    data = getBars(1000)
+    engine = IndicatorEngine(historySize=len(data))
+    engine.seed(data)
+    assert maxError(engine, data) < 1e-8
+
+def test_engine_matches_talib_when_seeded_with_the_ea_window():
+    data = getBars(459)
+    engine = IndicatorEngine(historySize=300)
+    engine.seed(data.iloc[:159])
+    for i in range(159, len(data)):
+        engine.update(data.index[i], *data.iloc[i].values)
+    assert maxError(engine, data) < 1e-8
+
+def test_features_are_the_last_complete_rows():
+    data = getBars(700)
+    engine = IndicatorEngine(historySize=150)       # the rows are moved to the start of the array several times
+    engine.seed(data)
+    batch = data.copy()
+    addIndicatorsNoDrop(DataHandler(verbose=0), batch)
+    frame = engine.getFeatureFrame(96)
+    assert frame.index.equals(data.index[-96:])
+    assert np.allclose(frame.values, batch.values[-96:], rtol=1e-8, atol=1e-8)
+    assert np.array_equal(engine.getFeatures(96, ['RSI 14', 'close']), frame[['RSI 14', 'close']].values)
+    assert len(engine.getFeatures()) == 150 and not engine.getFeatures().flags.writeable
+    warming = IndicatorEngine()
+    warming.seed(data.iloc[:50])
+    assert len(warming.getFeatures()) == 0
@@ -0,0 +1,113 @@
+import os, time
+import numpy as np
+import pandas as pd
+import talib
+from pickle import dump
+from sklearn.preprocessing import MinMaxScaler
+
+from Libraries.Utils import DataHandler
+from Libraries.Artifacts import sharedArtifactCache
+from tests.helpers import makeMinuteData, addIndicatorsNoDrop, getLabelsLoop, windowsLoop
+
+def getBars(rows):
+    data = makeMinuteData(rows)
+    data.columns = data.columns.str.lower()
+    return data
+
+def test_model_features_give_the_columns_of_every_indicator():
+    data = getBars(3000)
+    dataHandler = DataHandler(verbose=0)
+    everything = dataHandler.addAllIndicators(data.copy())
+    pruned = dataHandler.addAllIndicators(data.copy(), dataHandler.getModelFeatures())
+    dataHandler.featureSelection(everything)
+    dataHandler.featureSelection(pruned)
+    assert list(pruned.columns) == ['volume'] + dataHandler.getModelFeatures()
+    assert everything.equals(pruned)
+
+def test_indicators_are_added_in_place_like_the_columns_path():
+    data = getBars(3000)
+    expected = data.copy()
+    addIndicatorsNoDrop(DataHandler(verbose=0), expected)
+    expected.dropna(inplace=True)
+    assert DataHandler(verbose=0).addAllIndicators(data) is data
+    assert data.equals(expected)        # the same values and dtypes, HT_TRENDMODE and the pattern codes are ints
+
+def test_split_gives_the_last_bars_to_validation():
+    data = getBars(1000)
+    dataHandler = DataHandler(verbose=0)
+    main, validation = dataHandler.splitDataFrame(data, 0.25)
+    assert main.equals(data.iloc[:750]) and validation.equals(data.iloc[750:])
+    shuffled = data.sample(frac=1, random_state=0)
+    main, validation = dataHandler.splitDataFrame(shuffled, 0.25)
+    assert main.sort_index().equals(data.iloc[:750]) and validation.sort_index().equals(data.iloc[750:])
+
+def test_labels_match_the_loop():
+    data = getBars(20000)
+    prices = [data[col].values for col in ['high', 'low', 'close']]
+    atr = talib.ATR(*prices, timeperiod=20)
+    expected = getLabelsLoop(*prices, atr, 3)
+    labels = DataHandler(verbose=0).getLabels(*prices, atr, 3)
+    assert np.array_equal(expected[0], labels[0]) and np.array_equal(expected[1], labels[1])
+
+def test_label_sweep_matches_one_run_per_combination():
+    data = getBars(20000)
+    data["ATR Label"] = talib.ATR(data.high.values, data.low.values, data.close.values, timeperiod=20)
+    dataHandler = DataHandler(verbose=0)
+    labels, combos = dataHandler.labelSweep(data, (1, 2, 3), (1.5, 3), (3, 6))
+    for col, (slMultiple, tpMultiple, tradeLength) in enumerate(combos):
+        expected = dataHandler.getLabels(data.high.values, data.low.values, data.close.values,
+                                         data["ATR Label"].values, tradeLength, slMultiple, tpMultiple)[0]
+        assert np.array_equal(expected, labels[:, col])
+    expected = getLabelsLoop(data.high.values, data.low.values, data.close.values, data["ATR Label"].values, 3)[0]
+    assert np.array_equal(expected, labels[:, combos.index((2, 3, 3))])
+
+def test_preprocess_windows_match_the_loop(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("Scalers")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((2000, 10)), columns=["f%d" % i for i in range(10)])
+    df["Actual Direction"] = rng.integers(0, 3, len(df))
+    df["Direction"] = rng.integers(0, 3, len(df))
+    dataHandler = DataHandler(verbose=0)
+    dataset = dataHandler.preprocess_df(df, 'EURUSD', '1Min', 96, windowed=True)
+    x, y, _ = dataHandler.preprocess_df(df, 'EURUSD', '1Min', 96)
+    expected = windowsLoop(dataset.x, df["Direction"].values, df["Actual Direction"].values, 96)
+    for value, result in zip(expected, dataset.getArrays()):
+        assert np.array_equal(value, result)
+    assert x.shape == expected[0].shape and np.array_equal(np.sort(y), np.sort(expected[1]))
+
+def test_scaler_cache_reloads_a_changed_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("Scalers")
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((96, 30)))
+    dataHandler = DataHandler(verbose=0)
+    sharedArtifactCache.clear()
+    before = sharedArtifactCache.getStats()
+    for scale in [2, 1]:
+        scaler = MinMaxScaler().fit(rng.random((1000, 30)).astype(np.float32)*scale)
+        with open('Scalers/EURUSD_1Min.pkl', 'wb') as scalerFile:
+            dump(scaler, scalerFile)
+        os.utime('Scalers/EURUSD_1Min.pkl', ns=(0, time.time_ns() + scale*10**9))
+        time.sleep(sharedArtifactCache.checkInterval)
+        for _ in range(3):
+            assert np.array_equal(scaler.transform(df.to_numpy(dtype=np.float32)), dataHandler.preprocess_df(df, 'EURUSD', '1Min'))
+    stats = sharedArtifactCache.getStats()
+    assert stats['loads'] - before['loads'] == 2 and stats['reloads'] - before['reloads'] == 1     # loaded once per file version
+
+def test_new_data_only_when_a_new_bar_arrived(tmp_path):
+    dataHandler = DataHandler(isMT5=True, verbose=0)
+    dataHandler.dataMonkey.mt5Path = str(tmp_path) + os.sep
+    data = getBars(301)
+
+    def write(rows):
+        data.iloc[:rows].to_csv(dataHandler.getMT5DataPath(), sep='\t', encoding='utf-16')
+
+    write(300)
+    assert len(dataHandler.getNewData('EURUSD')) == 300
+    assert dataHandler.getNewData('EURUSD') is None     # unchanged file
+    write(300)
+    assert dataHandler.getNewData('EURUSD') is None     # the same bars written again
+    write(301)
+    assert len(dataHandler.getNewData('EURUSD')) == 301
+    assert dataHandler.dataParses == 2